@@ -1,7 +1,14 @@
+import os
+
 import streamlit as st
 import pandas as pd
 
-from utils import get_course_data
+import hot_reload
+import instrumentation
+import session_memory
+import state
+from components.plan_panel import plan_panel, restore_from_query_params
+from utils import get_course_data, BRANCH_CATALOGS, DEFAULT_BRANCH
 import modes.semester_mode as semester_mode
 import modes.free_mode as free_mode
 import modes.cgpa_mode as cgpa_mode
@@ -9,6 +16,13 @@ import modes.grade_prediction_mode as grade_prediction_mode
 
 st.set_page_config(page_title="CGPA Calculator", page_icon="🎓", layout="centered")
 
+instrumentation.start_run(st.query_params)
+if float(os.environ.get("GRADE_APP_RETRAIN_INTERVAL", "0")) > 0:
+    # Only then: retraining brings in XGBoost and scikit-learn through script.
+    import retraining
+    retraining.start()
+hot_reload.start()
+
 st.markdown("""
 <style>
     .stApp { font-size: 1.2em; }
@@ -27,38 +41,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def on_branch_change():
-    keys = [
-        # Semester Mode
-        "rows", "next_id",
-        # CGPA Mode
-        "semesters", "next_sem_id",
-        # Free Mode
-        "free_rows", "free_next_id",
-        # Timetable (if exists)
-        "timetable_rows", "timetable_next_id", "rerun_flag",
-    ]
-    for k in keys:
-        if k in st.session_state:
-            del st.session_state[k]
-
-    # Reset mode to default
+    # The previous branch's work is retained by state.switch_to; a new
+    # branch starts in Semester Mode.
     st.session_state.mode = "Semester Mode"
 
-def on_mode_change():
-    keys = [
-        # Semester Mode
-        "rows", "next_id",
-        # CGPA Mode
-        "semesters", "next_sem_id",
-        # Free Mode
-        "free_rows", "free_next_id",
-        # Timetable (if exists)
-        "timetable_rows", "timetable_next_id", "rerun_flag",
-    ]
-    for k in keys:
-        if k in st.session_state:
-            del st.session_state[k]
-
 def create_navbar(modes):
     cols = st.columns(len(modes))
     current_mode = st.session_state.get("mode", modes[0])
@@ -67,91 +53,76 @@ def create_navbar(modes):
         with cols[i]:
             if st.button(mode_name, key=f"nav_btn_{mode_name}", use_container_width=True):
 
-                if st.session_state.get("mode") != mode_name:
-                    on_mode_change()
-
                 st.session_state.mode = mode_name
                 current_mode = mode_name
 
     return current_mode
 
-if "mode" not in st.session_state:
-    st.session_state.mode = "Semester Mode"
+# finish_run also has to run when a mode calls st.stop() or st.rerun().
+try:
+    if "mode" not in st.session_state:
+        st.session_state.mode = "Semester Mode"
+
+    st.title("🎓 VIT CGPA & GPA Calculator")
+    st.write("Calculate your GPA and CGPA the right way!")
+
+    restore_from_query_params()
+
+    branch_options = list(BRANCH_CATALOGS)
+
+    branch = st.selectbox(
+        "Choose Branch",
+        branch_options,
+        key="branch_selector",
+        on_change=on_branch_change
+    )
+
+    with instrumentation.phase("branch_resolution"):
+        course_file_path, MAX_TOTAL_CREDITS = BRANCH_CATALOGS.get(branch, BRANCH_CATALOGS[DEFAULT_BRANCH])
+
+    with instrumentation.phase("get_course_data"):
+        courses_df = get_course_data(course_file_path)
+
+    modes = ["Semester Mode", "CGPA Mode", "Free Mode", "Grade Prediction Mode"]
+
+    with instrumentation.phase("create_navbar"):
+        mode = create_navbar(modes)
+
+    with instrumentation.phase("switch_state"):
+        state.switch_to(branch, mode)
+
+    with instrumentation.phase("session_memory"):
+        session_memory.collect()
+        _, within_budget = session_memory.enforce()
+    if not within_budget:
+        st.warning("This session holds more data than the server allows. Remove some rows or start a new session.")
+
+    if mode == "Semester Mode":
+        with instrumentation.phase("run.semester_mode"):
+            semester_mode.run(courses_df)
+
+    elif mode == "Free Mode":
+        with instrumentation.phase("run.free_mode"):
+            free_mode.run(MAX_TOTAL_CREDITS, courses_df)
+
+    elif mode == "CGPA Mode":
+        with instrumentation.phase("run.cgpa_mode"):
+            cgpa_mode.run(MAX_TOTAL_CREDITS, courses_df)
+
+    elif mode == "Grade Prediction Mode":
+        if courses_df is not None:
+            with instrumentation.phase("run.grade_prediction_mode"):
+                grade_prediction_mode.run(courses_df)
+        else:
+            st.error("Course data could not be loaded. Please check the data file.")
+
+    plan_panel(branch, mode, courses_df)
+
+    st.markdown("---")
+    st.markdown("Made with Streamlit")
+    st.markdown("© 2025 Rahul Dutta")
 
-st.title("🎓 VIT CGPA & GPA Calculator")
-st.write("Calculate your GPA and CGPA the right way!")
-
-branch_options = [
-    "CSE Core(BCE)",
-    "CSE with Specialization in Cyber Physical Systems(BPS)",
-    "CSE with Specialization in Artificial Intelligence and Machine Learning(BAI)",
-    "CSE with Specialization in Data Science(BDS)",
-    "CSE with Specialization in Artificial Intelligence and Robotics(BRS)",
-    "Mechatronics(BMH)",
-    "Electronics and Communication(BEC)",
-    "Electronics and Computer Engineering(BLC)",
-    "Electrical and Computer Science(BEL)"
-]
-
-branch = st.selectbox(
-    "Choose Branch",
-    branch_options,
-    key="branch_selector",
-    on_change=on_branch_change
-)
-
-if branch == "CSE Core(BCE)":
-    course_file_path = "data/courses_bce.csv"
-    MAX_TOTAL_CREDITS = 151.0
-elif branch == "CSE with Specialization in Cyber Physical Systems(BPS)":
-    course_file_path = "data/courses_bps.csv"
-    MAX_TOTAL_CREDITS = 151.0
-elif branch == "CSE with Specialization in Artificial Intelligence and Machine Learning(BAI)":
-    course_file_path = "data/courses_bai.csv"
-    MAX_TOTAL_CREDITS = 151.0
-elif branch == "CSE with Specialization in Data Science(BDS)":
-    course_file_path = "data/courses_bds.csv"
-    MAX_TOTAL_CREDITS = 151.0
-elif branch == "CSE with Specialization in Artificial Intelligence and Robotics(BRS)":
-    course_file_path = "data/courses_brs.csv"
-    MAX_TOTAL_CREDITS = 151.0
-elif branch == "Mechatronics(BMH)":
-    course_file_path = "data/courses_bmh.csv"
-    MAX_TOTAL_CREDITS = 154.0
-elif branch == "Electronics and Communication(BEC)":
-    course_file_path = "data/courses_bec.csv"
-    MAX_TOTAL_CREDITS = 151.0
-elif branch == "Electronics and Computer Engineering(BLC)":
-    course_file_path = "data/courses_blc.csv"
-    MAX_TOTAL_CREDITS = 153.0
-elif branch == "Electrical and Computer Science(BEL)":
-    course_file_path = "data/courses_bel.csv"
-    MAX_TOTAL_CREDITS = 151.0
-else:
-    course_file_path = "data/courses_bce.csv"
-    MAX_TOTAL_CREDITS = 151.0
-
-courses_df = get_course_data(course_file_path)
-
-modes = ["Semester Mode", "CGPA Mode", "Free Mode", "Grade Prediction Mode"]
-
-mode = create_navbar(modes)
-
-if mode == "Semester Mode":
-    semester_mode.run(courses_df)
-
-elif mode == "Free Mode":
-    free_mode.run(MAX_TOTAL_CREDITS, courses_df)
-
-elif mode == "CGPA Mode":
-    cgpa_mode.run(MAX_TOTAL_CREDITS)
-
-elif mode == "Grade Prediction Mode":
-    if courses_df is not None:
-        grade_prediction_mode.run(courses_df)
-    else:
-        st.error("Course data could not be loaded. Please check the data file.")
-
-st.markdown("---")
-st.markdown("Made with Streamlit")
-st.markdown("© 2025 Rahul Dutta")
+    if instrumentation.is_enabled():
+        session_memory.render_report()
+finally:
+    instrumentation.finish_run()
@@ -0,0 +1,111 @@
+"""
+Headless rerun benchmark for app.py.
+
+Drives scripted sessions through Streamlit's AppTest and reports rerun
+latency percentiles per action, plus a per-phase breakdown collected by
+``instrumentation``:
+
+    python -m benchmarks.bench_app_reruns --repeat 3 --json reruns.json
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+from streamlit.logger import set_log_level
+
+import instrumentation
+from benchmarks.harness import environment_info
+from benchmarks.sessions import SESSIONS, new_app
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def summarize(samples):
+    values = np.asarray(samples) * 1000
+    summary = {"count": len(values), "mean_ms": float(values.mean()), "max_ms": float(values.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(values, p))
+    return summary
+
+
+def cold_start():
+    """Times the first script run, which pays for imports and model loading."""
+    start = time.perf_counter()
+    new_app().run()
+    return time.perf_counter() - start
+
+
+def run_sessions(names, repeat):
+    """
+    Returns ({session: {action: [seconds, ...]}}, {session: phase snapshot})
+    over ``repeat`` fresh sessions each.
+    """
+    timings = {}
+    phases = {}
+    for name in names:
+        instrumentation.reset()
+        per_action = defaultdict(list)
+        for _ in range(repeat):
+            at = new_app()
+            SESSIONS[name](at, lambda action, seconds: per_action[action].append(seconds))
+            if at.exception:
+                raise RuntimeError(f"{name} session raised: {at.exception[0].message}")
+        timings[name] = per_action
+        phases[name] = {
+            phase: {"count": data["count"], "mean_ms": data["sum"] / data["count"] * 1000}
+            for phase, data in instrumentation.snapshot().items() if data["count"]
+        }
+    return timings, phases
+
+
+def print_report(report):
+    header = f"{'session':<12} {'action':<16} {'n':>4} " + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+    print(header)
+    for session, actions in report.items():
+        for action, summary in actions.items():
+            cells = " ".join(f"{summary[f'p{p}_ms']:>9.1f}" for p in PERCENTILES)
+            print(f"{session:<12} {action:<16} {summary['count']:>4} {cells}")
+
+
+def print_phases(phases):
+    print(f"{'session':<12} {'phase':<28} {'n':>5} {'mean ms':>9}")
+    for session, per_phase in phases.items():
+        for phase, data in sorted(per_phase.items(), key=lambda item: -item[1]["mean_ms"]):
+            print(f"{session:<12} {phase:<28} {data['count']:>5} {data['mean_ms']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", nargs="+", default=list(SESSIONS), choices=list(SESSIONS))
+    parser.add_argument("--repeat", type=int, default=1, help="fresh sessions per script")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    set_log_level("error")
+    instrumentation.enable()
+
+    cold_start_ms = cold_start() * 1000
+    timings, phases = run_sessions(args.sessions, args.repeat)
+    report = {}
+    for session, per_action in timings.items():
+        report[session] = {action: summarize(samples) for action, samples in per_action.items()}
+        report[session]["all"] = summarize([s for samples in per_action.values() for s in samples])
+
+    print(f"cold start: {cold_start_ms:.1f} ms")
+    print_report(report)
+    print()
+    print_phases(phases)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "environment": environment_info(),
+                "cold_start_ms": cold_start_ms,
+                "reruns": report,
+                "phases": phases,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Parity check and latency benchmark for the compiled tree backend.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compiled_trees
+"""
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from compiled_trees import compile_model
+
+MODEL_DIR = "modes"
+GRADES_PATH = os.path.join("data", "grades.csv")
+ROW_COUNTS = [1, 100, 10_000]
+REPEATS = 5
+
+# The compiled backend evaluates in float32 like XGBoost; sums may differ in the last bits.
+REGRESSION_TOLERANCE = 1e-3
+
+
+def load_feature_frames():
+    df = pd.read_csv(GRADES_PATH)
+    df.columns = df.columns.str.strip()
+    df["Overall Score"] = (
+        (df["Continuous Assessment I"] / 50) * 15 + (df["Continuous Assessment II"] / 50) * 15
+        + df["Digital Assignment I"] + df["Digital Assignment II"] + df["Digital Assignment III"]
+        + (df["Final Assessment Test"] / 100) * 40
+    )
+    return {
+        "class_avg_xgb": df[[
+            "Digital Assignment I", "Digital Assignment II", "Digital Assignment III",
+            "Continuous Assessment I", "Continuous Assessment II", "Final Assessment Test",
+            "Class Strength",
+        ]].to_numpy(dtype=np.float32),
+        "class_sd_xgb": df[["Overall Score", "Class Mean", "Class Strength"]].to_numpy(dtype=np.float32),
+        "grade_xgb_classifier": df[
+            ["Overall Score", "Class Mean", "Class SD", "Class Strength"]
+        ].to_numpy(dtype=np.float32),
+    }
+
+
+def time_call(fn, X):
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn(X)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    features = load_feature_frames()
+    rng = np.random.default_rng(42)
+    failed = False
+
+    for name, X in features.items():
+        model = joblib.load(os.path.join(MODEL_DIR, f"{name}.pkl"))
+        compiled = compile_model(model)
+
+        expected = model.predict(X)
+        actual = compiled.predict(X)
+        if name == "grade_xgb_classifier":
+            mismatches = int((expected != actual).sum())
+            ok = mismatches == 0
+            print(f"{name}: {mismatches} / {len(X)} class mismatches")
+        else:
+            max_err = float(np.abs(expected - actual).max())
+            ok = max_err <= REGRESSION_TOLERANCE
+            print(f"{name}: max abs error {max_err:.2e}")
+        failed |= not ok
+
+        print(f"  {'rows':>6}  {'xgboost ms':>11}  {'compiled ms':>11}")
+        for rows in ROW_COUNTS:
+            batch = X[rng.integers(0, len(X), rows)]
+            native_ms = time_call(model.predict, batch)
+            compiled_ms = time_call(compiled.predict, batch)
+            print(f"  {rows:>6}  {native_ms:>11.3f}  {compiled_ms:>11.3f}")
+
+    if failed:
+        print("Parity check FAILED")
+        sys.exit(1)
+    print("Parity check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures what fragment-scoped reruns save for a 25-row semester.
+
+AppTest always reruns the whole script, so this builds the semester, then
+edits grades and compares the full script-run time with the time spent in
+the ``semester_editor`` fragment, which is all a live fragment rerun
+re-executes:
+
+    python -m benchmarks.bench_fragments
+"""
+import argparse
+import time
+
+import numpy as np
+from streamlit.logger import set_log_level
+
+import instrumentation
+from benchmarks.sessions import new_app
+
+def build_semester(at, n_rows):
+    at.run()
+    while len(at.session_state["rows"]) < n_rows:
+        row_id = at.session_state["rows"][-1]["id"]
+        # Open electives (CFOC...M) have no L/P pair, so the row count stays exact.
+        at.text_input(key=f"course_select_{row_id}_query").input("CFOC").run()
+        course = at.selectbox(key=f"course_select_{row_id}")
+        course.select(course.options[0]).run()
+        if len(at.session_state["rows"]) < n_rows:
+            at.button(key=f"add_{at.session_state['rows'][-1]['id']}").click().run()
+
+
+def delta_mean(before, after, phase):
+    count = after[phase]["count"] - before.get(phase, {"count": 0})["count"]
+    total = after[phase]["sum"] - before.get(phase, {"sum": 0.0})["sum"]
+    return total / count if count else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=25)
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    set_log_level("error")
+    instrumentation.enable()
+
+    at = new_app()
+    build_semester(at, args.rows)
+
+    wall = []
+    before = instrumentation.snapshot()
+    for i in range(args.edits):
+        row = at.session_state["rows"][i % len(at.session_state["rows"])]
+        grade = at.selectbox(key=f"grade_{row['id']}")
+        # Non-graded rows only offer P/F.
+        grade = grade.select(grade.options[(i + 1) % len(grade.options)])
+        start = time.perf_counter()
+        grade.run()
+        wall.append(time.perf_counter() - start)
+    after = instrumentation.snapshot()
+
+    script_ms = delta_mean(before, after, "script_run") * 1000
+    fragment_ms = delta_mean(before, after, "fragment.semester_editor") * 1000
+    print(f"rows: {len(at.session_state['rows'])}, grade edits: {args.edits}")
+    print(f"AppTest full rerun (wall):   p50 {np.percentile(wall, 50) * 1000:8.1f} ms")
+    print(f"full script run:             mean {script_ms:7.1f} ms")
+    print(f"semester_editor fragment:    mean {fragment_ms:7.1f} ms")
+    print(f"work skipped by a fragment rerun: {script_ms - fragment_ms:.1f} ms "
+          f"({(1 - fragment_ms / script_ms) * 100:.0f}% of the script run)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Benchmarks for the calculator and prediction hot paths."""
+import glob
+import io
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from benchmarks.harness import benchmark
+from benchmarks.synthetic import DEFAULT_CATALOG, make_roster, make_semesters, make_transcript
+from cgpa_planner import plan_target_cgpa, remaining_courses
+from components import tables
+from course_search import CourseIndex, get_course_index
+from utils import calculate_cgpa, calculate_gpa, get_course_data, get_paired_course, load_course_data
+
+SCALES = [10, 100, 1000]
+BATCH_SCALES = [100, 1000, 10_000]
+
+
+def _prediction_module():
+    # Imported lazily: loading the models dominates import time.
+    import modes.grade_prediction_mode as grade_prediction_mode
+    return grade_prediction_mode
+
+
+@benchmark("catalog_load", scales=sorted(glob.glob("data/courses_*.csv"))[:3], rounds=10)
+def bench_catalog_load(path):
+    # get_course_data memoises per file; measure the parse itself.
+    load_course_data(path)
+
+
+def _lookup_setup(n):
+    courses_df = get_course_data(DEFAULT_CATALOG)
+    codes = courses_df["Course Code"].sample(n, replace=True, random_state=0).tolist()
+    return courses_df, codes
+
+
+@benchmark("course_lookup.paired", setup=_lookup_setup, scales=SCALES)
+def bench_paired_lookup(state):
+    courses_df, codes = state
+    for code in codes:
+        get_paired_course(code, courses_df)
+
+
+def _display_setup(n):
+    courses_df = get_course_data(DEFAULT_CATALOG)
+    return courses_df, courses_df["Display"].sample(n, replace=True, random_state=0).tolist()
+
+
+@benchmark("course_lookup.display", setup=_display_setup, scales=SCALES)
+def bench_display_lookup(state):
+    courses_df, displays = state
+    for display in displays:
+        courses_df[courses_df["Display"] == display].iloc[0]
+
+
+@benchmark("course_search.build", setup=lambda _: get_course_data(DEFAULT_CATALOG), rounds=5)
+def bench_search_build(courses_df):
+    CourseIndex(courses_df)
+
+
+def _search_setup(n):
+    index = get_course_index(get_course_data(DEFAULT_CATALOG))
+    queries = ["BCSE2", "calculus", "data struct", "pyhton", "CFOC", "machine learning"]
+    return index, [queries[i % len(queries)] for i in range(n)]
+
+
+@benchmark("course_search.query", setup=_search_setup, scales=SCALES)
+def bench_search_query(state):
+    index, queries = state
+    for query in queries:
+        index.search(query, limit=8)
+
+
+@benchmark("gpa", setup=lambda n: make_transcript(get_course_data(DEFAULT_CATALOG), n), scales=SCALES)
+def bench_gpa(subjects):
+    calculate_gpa(subjects)
+
+
+def _results_setup(n):
+    return make_transcript(get_course_data(DEFAULT_CATALOG), n)
+
+
+@benchmark("results_table.build", setup=_results_setup, scales=SCALES)
+def bench_results_table_build(subjects):
+    tables._tables.clear()
+    tables.build_results_table(subjects)
+
+
+@benchmark("results_table.cached", setup=_results_setup, scales=SCALES)
+def bench_results_table_cached(subjects):
+    tables.build_results_table(subjects)
+
+
+@benchmark("cgpa", setup=make_semesters, scales=[8, 80, 800])
+def bench_cgpa(semesters):
+    calculate_cgpa(semesters)
+
+
+def _planner_setup(n_courses):
+    courses_df = get_course_data(DEFAULT_CATALOG)
+    graded = courses_df[~courses_df["Type"].str.contains("Non-Graded")]
+    return remaining_courses(courses_df, graded["Display"].drop_duplicates().head(n_courses))
+
+
+# 45 courses is roughly a full program after the first semester.
+@benchmark("cgpa_planner", setup=_planner_setup, scales=[10, 45], rounds=20)
+def bench_cgpa_planner(courses):
+    plan_target_cgpa(8.75, 8.1 * 22, 22, courses, 7, 30.5, 160)
+
+
+def _single_setup(_):
+    gpm = _prediction_module()
+    return gpm, make_roster(1)
+
+
+@benchmark("predict.single", setup=_single_setup, rounds=50)
+def bench_single_prediction(state):
+    gpm, roster = state
+    gpm.ml_predict_final_grade(
+        roster["da1"][0], roster["da2"][0], roster["da3"][0],
+        roster["cat1"][0], roster["cat2"][0], roster["fat"][0],
+        0, 0, 0, 0, 0, 0,
+        roster["class_strength"][0],
+    )
+
+
+def _batch_setup(n):
+    gpm = _prediction_module()
+    return gpm, make_roster(n)
+
+
+@benchmark("predict.batch", setup=_batch_setup, scales=BATCH_SCALES, rounds=5)
+def bench_batch_prediction(state):
+    gpm, r = state
+    models = gpm.model_registry.current()
+    overall = gpm.calculate_weighted_marks(r["cat1"], r["cat2"], r["da1"], r["da2"], r["da3"], r["fat"])
+    class_mean = models.class_mean.predict(np.column_stack(
+        [r["da1"], r["da2"], r["da3"], r["cat1"], r["cat2"], r["fat"], r["class_strength"]]
+    ))
+    class_sd = models.class_sd.predict(np.column_stack([overall, class_mean, r["class_strength"]]))
+    models.grade.predict(np.column_stack([overall, class_mean, class_sd, r["class_strength"]]))
+
+
+def _sd_grade_setup(n, tables):
+    import joblib
+    import surrogate
+    gpm = _prediction_module()
+    r = make_roster(n)
+    overall = gpm.calculate_weighted_marks(r["cat1"], r["cat2"], r["da1"], r["da2"], r["da3"], r["fat"])
+    class_mean = gpm.model_registry.current().class_mean.predict(np.column_stack(
+        [r["da1"], r["da2"], r["da3"], r["cat1"], r["cat2"], r["fat"], r["class_strength"]]
+    ))
+    stages = []
+    for name in ("class_sd_xgb", "grade_xgb_classifier"):
+        path = f"{gpm.BASE_DIR}/{name}.pkl"
+        model = joblib.load(path)
+        if tables:
+            # Times the tables whether exact or approximate, unlike surrogate.wrap.
+            table = surrogate.load(path)
+            if table is None:
+                raise RuntimeError("No surrogate tables; run python -m surrogate build first.")
+            model = surrogate.SurrogateModel(table, model)
+        stages.append(model)
+    return stages, overall, class_mean, r["class_strength"]
+
+
+def _sd_grade(state):
+    (reg_sd, clf_grade), overall, class_mean, strength = state
+    class_sd = reg_sd.predict(np.column_stack([overall, class_mean, strength]))
+    clf_grade.predict(np.column_stack([overall, class_mean, class_sd, strength]))
+
+
+@benchmark("predict.sd_grade.model", setup=lambda n: _sd_grade_setup(n, False), scales=[1] + BATCH_SCALES, rounds=5)
+def bench_sd_grade_model(state):
+    _sd_grade(state)
+
+
+@benchmark("predict.sd_grade.surrogate", setup=lambda n: _sd_grade_setup(n, True), scales=[1] + BATCH_SCALES,
+           rounds=5)
+def bench_sd_grade_surrogate(state):
+    _sd_grade(state)
+
+
+@benchmark("chart.bell_curve", setup=lambda _: _prediction_module(), rounds=10)
+def bench_bell_curve(gpm):
+    fig = gpm.plot_bell_curve(72.0, 9.5, 81.0)
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
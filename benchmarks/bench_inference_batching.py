@@ -0,0 +1,108 @@
+"""
+Throughput benchmark for micro-batched grade prediction.
+
+Runs the same single-row prediction requests from 1, 10 and 100 concurrent
+callers (threads standing in for sessions), inline and through the
+inference executor with different collection windows, and reports
+throughput, latency percentiles and the mean batch size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_inference_batching
+    python -m benchmarks.bench_inference_batching --callers 100 --waits 0 2 5 10 --backend process
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import instrumentation
+from inference_executor import InferenceExecutor
+from modes.grade_prediction_mode import REQUEST_COLUMNS, ml_predict_batch
+
+DEFAULT_CALLERS = [1, 10, 100]
+DEFAULT_WAITS_MS = [0, 5]
+
+
+def make_requests(n, seed=0):
+    """Single-row prediction requests with no manual overrides."""
+    rng = np.random.default_rng(seed)
+    requests = np.zeros((n, len(REQUEST_COLUMNS)))
+    requests[:, 0:3] = rng.integers(0, 11, size=(n, 3))
+    requests[:, 3:5] = rng.integers(0, 51, size=(n, 2))
+    requests[:, 5] = rng.integers(0, 101, size=n)
+    requests[:, 12] = rng.integers(10, 121, size=n)
+    requests[:, 13:15] = np.nan
+    return requests
+
+
+def run_callers(predict, requests, n_callers):
+    """Splits ``requests`` across ``n_callers`` threads; returns (seconds, latencies)."""
+    latencies = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(n_callers + 1)
+
+    def caller(rows):
+        start_barrier.wait()
+        local = []
+        for row in rows:
+            t = time.perf_counter()
+            predict(row[None, :])
+            local.append(time.perf_counter() - t)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(chunk,))
+               for chunk in np.array_split(requests, n_callers)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def report(label, n_callers, seconds, latencies, batch_size=None):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    batch = f"  mean batch {batch_size:5.1f}" if batch_size is not None else ""
+    print(f"{n_callers:>4} callers  {label:<22} {len(latencies) / seconds:8.0f} pred/s"
+          f"  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms{batch}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, nargs="+", default=DEFAULT_CALLERS)
+    parser.add_argument("--waits", type=float, nargs="+", default=DEFAULT_WAITS_MS,
+                        help="Collection windows to try, in milliseconds.")
+    parser.add_argument("--requests", type=int, default=2000, help="Predictions per configuration.")
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests)
+    ml_predict_batch(requests[:1])
+
+    for n_callers in args.callers:
+        seconds, latencies = run_callers(ml_predict_batch, requests, n_callers)
+        report("inline", n_callers, seconds, latencies)
+
+        for wait_ms in args.waits:
+            executor = InferenceExecutor(ml_predict_batch, backend=args.backend, workers=args.workers,
+                                         max_queue=max(4 * n_callers, 64), max_batch=args.max_batch,
+                                         max_wait=wait_ms / 1000)
+            executor.predict(requests[:1], timeout=300)
+            instrumentation.reset()
+
+            seconds, latencies = run_callers(lambda row: executor.predict(row, timeout=60), requests, n_callers)
+            counts, _ = instrumentation.counters()
+            report(f"{args.backend} wait={wait_ms:g}ms", n_callers, seconds, latencies,
+                   counts["inference_requests"] / counts["inference_batches"])
+            executor.shutdown()
+        print()
+
+
+if __name__ == "__main__":
+    main()
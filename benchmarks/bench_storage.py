@@ -0,0 +1,75 @@
+"""
+Compares file size and load time of the CSV data files with their Parquet
+copies (see ``storage``), including a synthetic multi-year grade history.
+
+Files are copied to and converted in a temporary directory; ``data/`` is
+left untouched. Needs pyarrow. Run from the repository root:
+
+    python -m benchmarks.bench_storage --rows 1000000
+"""
+import argparse
+import glob
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+import script
+import storage
+from benchmarks.bench_training_memory import write_history
+
+
+def median_seconds(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def full_csv(path):
+    # The loading path before storage: every column, types inferred.
+    df = pd.read_csv(path, encoding=storage.CSV_ENCODING)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def compare(label, csv_path, columns, rounds):
+    csv_ms = median_seconds(lambda: full_csv(csv_path), rounds) * 1000
+    pruned_ms = median_seconds(lambda: storage.read_table(csv_path, columns), rounds) * 1000
+    # From here on read_table picks the (newer) Parquet copy.
+    parquet_path = storage.convert(csv_path)
+    parquet_ms = median_seconds(lambda: storage.read_table(csv_path, columns), rounds) * 1000
+
+    print(f"{label:<22} {os.path.getsize(csv_path) / 1024:10.0f} {os.path.getsize(parquet_path) / 1024:10.0f}"
+          f" {csv_ms:11.2f} {pruned_ms:11.2f} {parquet_ms:11.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the synthetic grade history.")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    if not storage.is_available():
+        raise SystemExit("bench_storage needs pyarrow (pip install pyarrow).")
+
+    with tempfile.TemporaryDirectory(prefix="grade-app-storage-") as tmp:
+        print(f"{'file':<22} {'CSV KiB':>10} {'Parquet KiB':>10} {'full CSV ms':>11} {'pruned CSV':>11} {'Parquet ms':>11}")
+        for path in sorted(glob.glob("data/courses_*.csv"))[:3]:
+            copy = shutil.copy(path, tmp)
+            compare(os.path.basename(path), copy, storage.CATALOG_COLUMNS, args.rounds)
+
+        copy = shutil.copy(script.DEFAULT_DATA, tmp)
+        compare("grades.csv", copy, script.SOURCE_COLUMNS, args.rounds)
+
+        history = os.path.join(tmp, "history.csv")
+        write_history(history, args.rows)
+        compare(f"history ({args.rows:,} rows)", history, script.SOURCE_COLUMNS, max(1, args.rounds // 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares peak RSS and wall time of in-memory and streamed (external-memory)
+training on a synthetic multi-year grade history.
+
+The history is generated by resampling ``data/grades.csv`` with jittered
+marks, and each training mode runs in its own ``script.py`` process so its
+peak RSS (``ru_maxrss``) is measured in isolation. Models are written to a
+temporary directory, never over the repository's ``.pkl`` files.
+
+Unix only. Run from the repository root:
+
+    python -m benchmarks.bench_training_memory --rows 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import script
+
+WRITE_CHUNK_ROWS = 200_000
+
+
+def write_history(path, n_rows, seed=0):
+    """Writes ``n_rows`` resampled, jittered grade records to ``path``."""
+    source = pd.read_csv(script.DEFAULT_DATA)
+    source.columns = source.columns.str.strip()
+    rng = np.random.default_rng(seed)
+
+    written = 0
+    while written < n_rows:
+        n = min(WRITE_CHUNK_ROWS, n_rows - written)
+        chunk = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+        for column in script.MARK_COLUMNS:
+            chunk[column] = (chunk[column] + rng.normal(0, 0.5, n)).clip(lower=0).round(1)
+        chunk.to_csv(path, mode="a" if written else "w", header=not written, index=False)
+        written += n
+
+
+def run_training(args):
+    """Runs script.py with ``args``; returns (seconds, peak RSS in MiB)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, script.__file__, *args], stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise SystemExit(f"script.py {' '.join(args)} failed with exit code {proc.returncode}")
+    # ru_maxrss is in KiB on Linux.
+    return time.perf_counter() - start, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=script.CHUNK_ROWS)
+    parser.add_argument("--data", help="Existing grade history to use instead of a synthetic one.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="grade-app-train-") as tmp:
+        data = args.data
+        if data is None:
+            data = os.path.join(tmp, "history.csv")
+            start = time.perf_counter()
+            write_history(data, args.rows)
+            print(f"synthetic history: {args.rows:,} rows, {os.path.getsize(data) / 2**20:.0f} MiB "
+                  f"({time.perf_counter() - start:.1f} s)\n")
+
+        common = ["--data", data, "--output-dir", os.path.join(tmp, "models"), "--no-cache"]
+        modes = {
+            "in-memory": [],
+            "streamed (QuantileDMatrix)": ["--external-memory", "--chunk-rows", str(args.chunk_rows)],
+            "streamed (ExtMemQuantileDMatrix)": ["--external-memory", "--chunk-rows", str(args.chunk_rows),
+                                                 "--cache-dir", os.path.join(tmp, "xgb-cache")],
+        }
+        print(f"{'mode':<34} {'time':>9} {'peak RSS':>12}")
+        for label, extra in modes.items():
+            seconds, peak_mib = run_training(common + extra)
+            print(f"{label:<34} {seconds:8.1f}s {peak_mib:9.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
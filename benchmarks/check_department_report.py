@@ -0,0 +1,72 @@
+"""
+Scaling check for the bulk department report.
+
+Writes synthetic rosters and transcripts (``benchmarks.synthetic``) of
+growing size and runs ``department_report`` over each in a fresh process,
+reporting throughput and the peak RSS of the job and of its workers. With
+the streaming pipeline the RSS should stay flat as the roster grows.
+
+Run from the repository root:
+
+    python -m benchmarks.check_department_report --students 1000 10000 --workers 2
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import DEFAULT_CATALOG, write_department
+from utils import load_course_data
+
+# Peak RSS (MiB) of the job itself and of its worker processes.
+MEASURE = """
+import resource, sys
+import department_report
+sys.argv = ["department_report"] + sys.argv[1:]
+try:
+    department_report.main()
+finally:
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"RSS {own:.0f} {workers:.0f}", file=sys.stderr)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    courses_df = load_course_data(DEFAULT_CATALOG)
+    print(f"{'students':>9} {'rows':>10} {'seconds':>8} {'students/s':>11} {'job RSS':>9} {'worker RSS':>11}")
+    for n_students in args.students:
+        tmp = tempfile.mkdtemp(prefix="grade-app-department-")
+        try:
+            roster, transcripts = os.path.join(tmp, "roster.csv"), os.path.join(tmp, "transcripts.csv")
+            write_department(courses_df, n_students, roster, transcripts)
+            with open(transcripts) as f:
+                rows = sum(1 for _ in f) - 1
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, "-c", MEASURE, "--roster", roster, "--transcripts", transcripts,
+                 "--output", os.path.join(tmp, "out"), "--workers", str(args.workers)],
+                capture_output=True, text=True,
+            )
+            elapsed = time.perf_counter() - start
+            if result.returncode:
+                print(result.stderr[-2000:])
+                return 1
+            own, workers = result.stderr.strip().splitlines()[-1].split()[1:]
+            print(f"{n_students:>9,} {rows:>10,} {elapsed:>8.1f} {n_students / elapsed:>11.0f} "
+                  f"{own:>5} MiB {workers:>7} MiB", flush=True)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Exercises catalog and model hot reload end to end.
+
+A copy of a catalog and of the shipped models is watched with a short
+interval while a reader thread keeps calling ``utils.get_course_data`` the
+way every rerun does, checking that each DataFrame it gets is exactly the
+old or the new catalog, never a mix or a partial one. Then:
+
+1. the catalog is rewritten slowly, in chunks (a copy in progress); the
+   change is only picked up once complete,
+2. a catalog with a negative credit value is written; it must be rejected
+   and the previous catalog kept,
+3. a model file is rewritten; the models are reloaded and swapped in.
+
+Reload durations come from the ``reload.catalog`` / ``reload.models``
+phases. The repository's files are not touched. Run from the repository
+root:
+
+    python -m benchmarks.check_hot_reload
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+INTERVAL = 0.2
+# Seconds to wait for the watcher before failing a step.
+TIMEOUT = 30
+
+
+def read_continuously(utils, path, stop, valid, seen, errors):
+    while not stop.is_set():
+        df = utils.get_course_data(path)
+        key = tuple(df["Display"])
+        if key not in valid:
+            errors.append(f"unexpected catalog of {len(df)} rows")
+        seen.add(key)
+
+
+def write_slowly(path, text, encoding, chunks=10, pause=INTERVAL / 2):
+    step = len(text) // chunks + 1
+    with open(path, "w", encoding=encoding) as f:
+        for i in range(0, len(text), step):
+            f.write(text[i:i + step])
+            f.flush()
+            time.sleep(pause)
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(INTERVAL / 4)
+    return True
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="grade-app-reload-")
+    os.environ["GRADE_APP_RELOAD_INTERVAL"] = str(INTERVAL)
+    os.environ["GRADE_APP_MODEL_REGISTRY"] = os.path.join(tmp, "registry")
+
+    import model_registry
+    models_dir = os.path.join(tmp, "models")
+    shutil.copytree(model_registry.BASE_DIR, models_dir, ignore=shutil.ignore_patterns("*.py", "__pycache__"))
+    model_registry.BASE_DIR = models_dir
+
+    import hot_reload
+    import instrumentation
+    import storage
+    import modes.grade_prediction_mode as gpm
+    import utils
+
+    source = utils.BRANCH_CATALOGS[utils.DEFAULT_BRANCH][0]
+    path = os.path.join(tmp, os.path.basename(source))
+    shutil.copy(source, path)
+    with open(source, encoding=storage.CSV_ENCODING) as f:
+        lines = f.read().splitlines(keepends=True)
+
+    old = utils.get_course_data(path)
+    # The new catalog drops the last course and adds one.
+    header = lines[0].rstrip("\r\n").split(",")
+    added = dict.fromkeys(header, "")
+    added.update({"Type": "Discipline Elective", "Course Code": "XYZ9999", "Course Name": "Reload Test", "Credits": "3"})
+    new_text = "".join(lines[:-1]) + ",".join(added[c] for c in header) + "\n"
+    new_displays = tuple(old["Display"].iloc[:-1]) + ("XYZ9999 - Reload Test",)
+    hot_reload.start()
+
+    stop, seen, errors = threading.Event(), set(), []
+    reader = threading.Thread(target=read_continuously,
+                              args=(utils, path, stop, {tuple(old["Display"]), new_displays}, seen, errors))
+    reader.start()
+    ok = True
+    try:
+        start = time.perf_counter()
+        write_slowly(path, new_text, storage.CSV_ENCODING)
+        written = time.perf_counter() - start
+        swapped = wait_for(lambda: tuple(utils.get_course_data(path)["Display"]) == new_displays)
+        print(f"slow rewrite ({written * 1000:.0f} ms to write): "
+              f"{'swapped in' if swapped else 'NOT swapped in'} {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"after the write started")
+        ok &= swapped
+
+        rejected = instrumentation.counters()[0].get("reload_rejected", 0)
+        with open(path, "w", encoding=storage.CSV_ENCODING) as f:
+            f.write("".join(lines[:-1]) + ",".join({**added, "Credits": "-3"}[c] for c in header) + "\n")
+        refused = wait_for(lambda: instrumentation.counters()[0].get("reload_rejected", 0) > rejected)
+        kept = tuple(utils.get_course_data(path)["Display"]) == new_displays
+        print(f"invalid catalog: {'rejected' if refused else 'NOT rejected'}, "
+              f"{'previous catalog kept' if kept else 'previous catalog NOT kept'}")
+        ok &= refused and kept
+
+        before = gpm.model_registry.current()
+        model_path = os.path.join(models_dir, "class_sd_xgb.pkl")
+        with open(model_path, "rb") as f:
+            model_bytes = f.read()
+        with open(model_path, "wb") as f:
+            f.write(model_bytes)
+        reloaded = wait_for(lambda: gpm.model_registry.current() is not before)
+        print(f"model rewrite: {'reloaded' if reloaded else 'NOT reloaded'}")
+        ok &= reloaded
+    finally:
+        stop.set()
+        reader.join()
+
+    print(f"reader: {len(seen)} distinct catalogs seen, {len(errors)} bad reads")
+    for error in errors[:5]:
+        print(f"  {error}")
+    ok &= not errors and len(seen) == 2
+
+    for phase, stats in instrumentation.snapshot().items():
+        if phase.startswith("reload."):
+            print(f"{phase}: {stats['count']} reloads, mean {stats['sum'] / stats['count'] * 1000:.1f} ms")
+    counters, _ = instrumentation.counters()
+    print("counters: " + ", ".join(f"{k} {v}" for k, v in sorted(counters.items()) if "reload" in k))
+    shutil.rmtree(tmp, ignore_errors=True)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
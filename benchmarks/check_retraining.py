@@ -0,0 +1,108 @@
+"""
+Exercises the feedback -> incremental retraining -> hot swap loop end to end.
+
+Replays rows of ``data/grades.csv`` as outcome reports (the actual grade and
+published class statistics come from the row), runs one retraining pass and
+shows each model's holdout and reference scores before and after and
+whether it was kept. When any model is kept, the new version must be
+published and swapped in. Which models improve depends on the holdout,
+which is chosen by the random report ids, so it differs between runs.
+Meanwhile a thread keeps predicting, and its latency is reported with and
+without the retraining running alongside. A temporary feedback log and model registry
+are used; the repository's models are not touched.
+
+Run from the repository root:
+
+    python -m benchmarks.check_retraining --reports 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def predict_continuously(gpm, stop, latencies, versions):
+    row = np.array([[8, 9, 7, 35, 38, 72, 0, 0, 0, 0, 0, 0, 60, np.nan, np.nan]], dtype=np.float64)
+    while not stop.is_set():
+        start = time.perf_counter()
+        gpm.ml_predict_batch(row)
+        latencies.append(time.perf_counter() - start)
+        versions.add(gpm.model_registry.current().version)
+
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=20, help="Boosting rounds added per retraining pass.")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="grade-app-retrain-")
+    os.environ["GRADE_APP_FEEDBACK_LOG"] = os.path.join(tmp, "feedback.jsonl")
+    os.environ["GRADE_APP_MODEL_REGISTRY"] = os.path.join(tmp, "registry")
+    os.environ["GRADE_APP_RETRAIN_ROUNDS"] = str(args.rounds)
+
+    import feedback
+    import modes.grade_prediction_mode as gpm
+    import retraining
+    import script
+
+    history = script.load_data(script.DEFAULT_DATA)
+    history = history.sample(args.reports, replace=len(history) < args.reports, random_state=0)
+    for _, row in history.iterrows():
+        request = {
+            "da1": row["Digital Assignment I"], "da2": row["Digital Assignment II"],
+            "da3": row["Digital Assignment III"], "cat1": row["Continuous Assessment I"],
+            "cat2": row["Continuous Assessment II"], "fat": row["Final Assessment Test"],
+            "class_strength": row["Class Strength"],
+        }
+        overall, class_mean, class_sd, grade = gpm.predict_request(request)
+        feedback.record_outcome(
+            "SYNTHETIC", request,
+            {"overall": overall, "class_mean": class_mean, "class_sd": class_sd, "grade": grade, "model_used": "ML"},
+            row["Final Grade"], row["Class Mean"], row["Class SD"], model_version=0,
+        )
+    print(f"recorded {args.reports} outcome reports in {feedback.FEEDBACK_LOG}")
+
+    for phase in ("idle", "retraining"):
+        stop, latencies, versions = threading.Event(), [], set()
+        predictor = threading.Thread(target=predict_continuously, args=(gpm, stop, latencies, versions))
+        predictor.start()
+        start = time.perf_counter()
+        if phase == "retraining":
+            summary = retraining.retrain_once()
+        else:
+            time.sleep(1.0)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        predictor.join()
+        print(f"\n{phase}: {elapsed * 1000:.0f} ms, {len(latencies)} predictions, "
+              f"p50 {percentile_ms(latencies, 50):.2f} ms, p99 {percentile_ms(latencies, 99):.2f} ms, "
+              f"max {max(latencies) * 1000:.2f} ms, versions served {sorted(versions)}")
+
+    print(f"\nretraining: {summary['status']} -> version {summary['version']}")
+    for name, score in summary.get("scores", {}).items():
+        kept = "kept" if name in summary.get("updated", ()) else "not kept"
+        print(f"  {name:<22} holdout {score['before']:+.4f} -> {score['after']:+.4f}, "
+              f"reference {score['reference_before']:+.4f} -> {score['reference_after']:+.4f} {kept:<8} "
+              f"({score['train_rows']} train / {score['holdout_rows']} holdout / "
+              f"{score['reference_rows']} reference rows)")
+
+    live = gpm.model_registry.current().version
+    again = retraining.retrain_once()
+    print(f"\nlive version: {live}; second pass without new reports: {again['status']}")
+    ok = summary["status"] in ("published", "rejected") and again["status"] == "skipped"
+    if summary["status"] == "published":
+        ok = ok and live == summary["version"]
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
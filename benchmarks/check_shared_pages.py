@@ -0,0 +1,147 @@
+"""
+Checks that worker processes share the memory-mapped model/catalog cache.
+
+Starts several local worker processes that each load the models and every
+catalog the way an app worker does, then reads ``/proc/self/smaps`` in each
+worker while all of them are still alive. With a working shared cache each
+worker's proportional share (Pss) of the cache mappings drops to about
+Rss / workers. The same workers are
+also run with the regular pickle/CSV loading for comparison.
+
+Linux only. Run from the repository root:
+
+    python -m benchmarks.check_shared_pages --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+SMAPS_FIELDS = ("Rss", "Pss")
+
+
+def read_status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def mapped_usage_kb(path_prefix):
+    """Sums smaps fields over every mapping of a file under ``path_prefix``."""
+    totals = dict.fromkeys(SMAPS_FIELDS, 0)
+    in_mapping = False
+    with open("/proc/self/smaps") as f:
+        for line in f:
+            parts = line.split()
+            if "-" in parts[0] and len(parts) >= 5:
+                in_mapping = len(parts) >= 6 and parts[5].startswith(path_prefix)
+            elif in_mapping and parts[0].rstrip(":") in totals:
+                totals[parts[0].rstrip(":")] += int(parts[1])
+    return totals
+
+
+def worker(shared, cache_root, build_dir, barrier, results):
+    import glob
+
+    import numpy as np
+
+    import shared_cache
+    from utils import load_course_data
+
+    # Libraries both paths need are imported before the baseline; XGBoost
+    # itself is only imported (by unpickling) on the pickle path.
+    shared_cache.SHARED_CACHE_DIR = cache_root if shared else None
+    baseline_kb = read_status_kb("VmRSS")
+    start = time.perf_counter()
+
+    if shared:
+        models = shared_cache.load_models()
+        # Touch every page so the mappings are resident.
+        for model in models.values():
+            for name in shared_cache.ENSEMBLE_ARRAYS:
+                float(np.asarray(getattr(model, name), dtype=np.float64).sum())
+    else:
+        import joblib
+        models = {
+            name: joblib.load(os.path.join(shared_cache.MODEL_DIR, f"{name}.pkl"))
+            for name in shared_cache.MODEL_NAMES
+        }
+    catalogs = [load_course_data(path) for path in sorted(glob.glob(shared_cache.CATALOG_GLOB))]
+    load_seconds = time.perf_counter() - start
+
+    rows = np.random.default_rng(0).uniform(0, 50, size=(64, 4)).astype(np.float32)
+    models["grade_xgb_classifier"].predict(rows)
+
+    # Read smaps only once every worker has mapped the cache.
+    barrier.wait()
+    usage = mapped_usage_kb(build_dir) if shared else dict.fromkeys(SMAPS_FIELDS, 0)
+    results.put({
+        "shared": shared,
+        "load_seconds": load_seconds,
+        "rss_growth_kb": read_status_kb("VmRSS") - baseline_kb,
+        "catalogs": len(catalogs),
+        **usage,
+    })
+    barrier.wait()
+
+
+def run_workers(shared, n_workers, cache_root, build_dir):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(shared, cache_root, build_dir, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    out = [results.get(timeout=300) for _ in procs]
+    for p in procs:
+        p.join()
+    return out
+
+
+def report(label, results):
+    n = len(results)
+    mean = lambda key: sum(r[key] for r in results) / n
+    print(f"{label}: {n} workers")
+    print(f"  load time            mean {mean('load_seconds') * 1000:8.1f} ms")
+    print(f"  RSS growth           mean {mean('rss_growth_kb') / 1024:8.1f} MiB")
+    if results[0]["shared"]:
+        print(f"  cache mappings Rss   mean {mean('Rss') / 1024:8.1f} MiB")
+        print(f"  cache mappings Pss   mean {mean('Pss') / 1024:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cache-dir", help="Existing cache directory (default: a temporary one).")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps"):
+        print("check_shared_pages needs /proc/self/smaps (Linux).")
+        return 2
+    if args.workers < 2:
+        parser.error("--workers must be at least 2 to observe sharing")
+
+    import shared_cache
+
+    cache_root = args.cache_dir or tempfile.mkdtemp(prefix="grade-app-cache-")
+    start = time.perf_counter()
+    build_dir = shared_cache.build(cache_root)
+    print(f"cache build: {build_dir} ({(time.perf_counter() - start) * 1000:.0f} ms, once per host)\n")
+
+    report("pickle/CSV loading", run_workers(False, args.workers, cache_root, build_dir))
+    shared = run_workers(True, args.workers, cache_root, build_dir)
+    report("shared cache", shared)
+
+    # Pss splits each page's size across the processes mapping it, so shared
+    # pages put every worker's Pss well below its Rss.
+    ok = all(r["Rss"] > 0 and r["Pss"] <= r["Rss"] / args.workers * 1.5 for r in shared)
+    print("\npages shared across workers:", "yes" if ok else "NO")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Minimal asv-style benchmark harness.
+
+Benchmarks register themselves with ``@benchmark``; each one is called once
+per scale with the object returned by its ``setup``. Results are written as
+JSON so runs from different commits can be compared with ``--compare``.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+
+REGISTRY = []
+
+
+@dataclass
+class Case:
+    name: str
+    fn: object
+    setup: object = None
+    scales: list = field(default_factory=lambda: [None])
+    rounds: int = 20
+
+
+def benchmark(name, setup=None, scales=None, rounds=20):
+    """Registers ``fn(state)`` as a benchmark, where ``state = setup(scale)``."""
+    def decorator(fn):
+        REGISTRY.append(Case(name, fn, setup, scales or [None], rounds))
+        return fn
+    return decorator
+
+
+def run_case(case, scale, min_time=0.2):
+    state = case.setup(scale) if case.setup else scale
+    case.fn(state)  # warm-up
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < case.rounds or (time.perf_counter() - started) < min_time:
+        t0 = time.perf_counter()
+        case.fn(state)
+        timings.append(time.perf_counter() - t0)
+        if len(timings) >= case.rounds * 50:
+            break
+
+    return {
+        "name": case.name,
+        "scale": scale,
+        "rounds": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def result_key(result):
+    return f"{result['name']}[{result['scale']}]" if result["scale"] is not None else result["name"]
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {}
+    for module in ("numpy", "pandas", "xgboost", "sklearn", "matplotlib", "streamlit"):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "versions": versions,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Prints median ratios between two result files.
+    Returns the keys that got slower than ``threshold``.
+    """
+    base = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"{'benchmark':<45} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for result in current["results"]:
+        key = result_key(result)
+        if key not in base:
+            continue
+        old, new = base[key]["median"], result["median"]
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{key:<45} {old * 1000:>10.3f} {new * 1000:>10.3f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def save_results(path, results):
+    with open(path, "w") as f:
+        json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,168 @@
+"""
+Local load test: N concurrent scripted users against app.py.
+
+Every simulated user is a worker process driving the app through
+``AppTest`` with the scripts in ``benchmarks.sessions`` (by default the
+``student`` visit: branch select, course entry with L/P pairing, CGPA target,
+grade predictions). ``AppTest`` keeps global state, so two sessions cannot
+share a process; each user is therefore a process of its own, and its
+caches (``st.cache_*``, models, catalogs) are not shared with the others the
+way they are between sessions of one server. Reported RSS is thus the cost
+of one app process serving one user, and its growth over the RSS after the
+cold start is what the visits themselves added.
+
+For each concurrency level the workers import the app and run it once
+(cold start, not measured), wait on a barrier, then each runs ``--visits``
+scripted visits. Reported per level:
+
+- throughput: reruns and visits per second of wall time,
+- rerun latency p50/p95/p99 over every rerun of every user,
+- peak RSS per worker process (mean and max) and its growth during the visits.
+
+Linux/macOS. Run from the repository root:
+
+    python -m benchmarks.load_test --concurrency 1 2 4 8
+    python -m benchmarks.load_test --concurrency 4 --scripts student prediction --visits 3 --json load.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import resource
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.harness import environment_info
+
+PERCENTILES = [50, 95, 99]
+# Seconds a level may take before its workers are abandoned.
+LEVEL_TIMEOUT = 1800
+
+
+def peak_rss_mib():
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def worker(index, scripts, visits, barrier, results):
+    from streamlit.logger import set_log_level
+    from benchmarks.sessions import SESSIONS, new_app
+
+    start = time.perf_counter()
+    new_app().run()
+    cold_start = time.perf_counter() - start
+    started_rss = peak_rss_mib()
+    # After the first run, which configures Streamlit's loggers.
+    set_log_level("error")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    reruns, errors = [], []
+    barrier.wait()
+    for visit in range(visits):
+        # Offset by worker so a mix of scripts runs side by side.
+        name = scripts[(index + visit) % len(scripts)]
+        at = new_app()
+        try:
+            SESSIONS[name](at, lambda action, seconds: reruns.append((name, action, seconds)))
+        except Exception as e:
+            errors.append(f"{name}: {e!r}")
+        errors.extend(f"{name}: {e.message}" for e in at.exception)
+
+    results.put({
+        "worker": index,
+        "cold_start": cold_start,
+        "reruns": reruns,
+        "errors": errors,
+        "started_rss_mib": started_rss,
+        "peak_rss_mib": peak_rss_mib(),
+    })
+
+
+def run_level(n_users, scripts, visits):
+    """Runs ``n_users`` concurrent workers; returns their results and the wall time."""
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_users + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, scripts, visits, barrier, results)) for i in range(n_users)]
+    for proc in procs:
+        proc.start()
+
+    barrier.wait(timeout=LEVEL_TIMEOUT)
+    start = time.perf_counter()
+    collected = [results.get(timeout=LEVEL_TIMEOUT) for _ in procs]
+    wall = time.perf_counter() - start
+    for proc in procs:
+        proc.join()
+    return collected, wall
+
+
+def summarize(n_users, visits, collected, wall):
+    latencies = np.array([seconds for r in collected for _, _, seconds in r["reruns"]]) * 1000
+    peaks = [r["peak_rss_mib"] for r in collected]
+    summary = {
+        "users": n_users,
+        "wall_s": wall,
+        "reruns": len(latencies),
+        "reruns_per_s": len(latencies) / wall,
+        "visits_per_s": n_users * visits / wall,
+        "cold_start_ms": float(np.mean([r["cold_start"] for r in collected])) * 1000,
+        "peak_rss_mib_mean": float(np.mean(peaks)),
+        "peak_rss_mib_max": float(np.max(peaks)),
+        "rss_growth_mib_mean": float(np.mean([r["peak_rss_mib"] - r["started_rss_mib"] for r in collected])),
+        "errors": [e for r in collected for e in r["errors"]],
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(latencies, p)) if len(latencies) else float("nan")
+    return summary
+
+
+def per_action(collected):
+    by_action = {}
+    for r in collected:
+        for name, action, seconds in r["reruns"]:
+            by_action.setdefault(f"{name}.{action}", []).append(seconds * 1000)
+    return {
+        key: {"count": len(values), **{f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES}}
+        for key, values in sorted(by_action.items())
+    }
+
+
+def main(argv=None):
+    from benchmarks.sessions import SESSIONS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Concurrent users per level.")
+    parser.add_argument("--scripts", nargs="+", default=["student"], choices=list(SESSIONS),
+                        help="Scripts the users cycle through.")
+    parser.add_argument("--visits", type=int, default=2, help="Scripted visits per user and level.")
+    parser.add_argument("--json", help="Write the report to this file.")
+    args = parser.parse_args(argv)
+
+    print(f"{'users':>5} {'reruns/s':>9} {'visits/s':>9} " + " ".join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+          + f" {'RSS mean':>9} {'RSS max':>9} {'growth':>9}")
+    levels = []
+    for n_users in args.concurrency:
+        collected, wall = run_level(n_users, args.scripts, args.visits)
+        summary = summarize(n_users, args.visits, collected, wall)
+        summary["actions"] = per_action(collected)
+        levels.append(summary)
+        cells = " ".join(f"{summary[f'p{p}_ms']:>9.1f}" for p in PERCENTILES)
+        print(f"{n_users:>5} {summary['reruns_per_s']:>9.1f} {summary['visits_per_s']:>9.2f} {cells} "
+              f"{summary['peak_rss_mib_mean']:>5.0f} MiB {summary['peak_rss_mib_max']:>5.0f} MiB "
+              f"{summary['rss_growth_mib_mean']:>5.0f} MiB", flush=True)
+        for error in summary["errors"][:5]:
+            print(f"      error: {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"environment": environment_info(), "scripts": args.scripts, "visits": args.visits,
+                       "levels": levels}, f, indent=2)
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
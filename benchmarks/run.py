@@ -0,0 +1,47 @@
+"""
+Runs the registered benchmarks and writes machine-readable results.
+
+    python -m benchmarks.run --json results.json
+    python -m benchmarks.run --filter predict --compare results.json
+"""
+import argparse
+import importlib
+import sys
+
+from benchmarks.harness import REGISTRY, compare, load_results, result_key, run_case, save_results
+
+SUITES = ["benchmarks.bench_hot_paths"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="compare against a previous results file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    for suite in SUITES:
+        importlib.import_module(suite)
+
+    results = []
+    for case in REGISTRY:
+        if args.filter not in case.name:
+            continue
+        for scale in case.scales:
+            result = run_case(case, scale)
+            results.append(result)
+            print(f"{result_key(result):<45} median {result['median'] * 1000:10.3f} ms  ({result['rounds']} rounds)")
+
+    if args.json:
+        save_results(args.json, results)
+
+    if args.compare:
+        print()
+        regressions = compare(load_results(args.compare), {"results": results}, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Scripted user sessions driven through ``streamlit.testing.v1.AppTest``.
+
+Each session takes a fresh ``AppTest`` and a ``record(action, seconds)``
+callback, and times every rerun it triggers. The same scripts back the
+rerun benchmark and the load-testing harness.
+"""
+import os
+import time
+
+# AppTest resolves relative paths against the calling file, so pin the app path.
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+RUN_TIMEOUT = 60
+
+
+def new_app():
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT)
+
+
+def timed_run(record, action, element_or_app):
+    start = time.perf_counter()
+    element_or_app.run()
+    record(action, time.perf_counter() - start)
+
+
+def by_label(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No element labelled {label!r}")
+
+
+def switch_mode(at, record, mode_name):
+    timed_run(record, "switch_mode", at.button(key=f"nav_btn_{mode_name}").click())
+
+
+def select_branch(at, record, branch_index=0):
+    branch = at.selectbox(key="branch_selector")
+    timed_run(record, "select_branch", branch.select(branch.options[branch_index]))
+
+
+# Search queries typed into the course picker, one per added course.
+COURSE_QUERIES = [
+    "BCSE2", "calculus", "physics", "data struct", "BHUM", "machine learning",
+    "BECE", "python", "BSTS", "operating",
+]
+
+
+def add_courses(at, record, n_courses):
+    """Searches for and adds ``n_courses`` courses in Semester Mode, one row at a time."""
+    for i in range(n_courses):
+        row_id = at.session_state["rows"][-1]["id"]
+        query = at.text_input(key=f"course_select_{row_id}_query")
+        timed_run(record, "search_course", query.input(COURSE_QUERIES[i % len(COURSE_QUERIES)]))
+
+        course = at.selectbox(key=f"course_select_{row_id}")
+        # L/P courses auto-add their pair.
+        timed_run(record, "select_course", course.select(course.options[0]))
+
+        last_id = at.session_state["rows"][-1]["id"]
+        timed_run(record, "add_row", at.button(key=f"add_{last_id}").click())
+
+
+def semester_session(at, record, n_courses=10):
+    """Searches for and adds ``n_courses`` courses in Semester Mode, one row at a time."""
+    timed_run(record, "initial_load", at)
+    add_courses(at, record, n_courses)
+
+
+def import_session(at, record, n_courses=40):
+    """Imports an ``n_courses`` transcript into Semester Mode in one rerun."""
+    import pandas as pd
+
+    timed_run(record, "initial_load", at)
+
+    catalog = pd.read_csv(os.path.join(os.path.dirname(APP_PATH), "data", "courses_bce.csv"), encoding="latin1")
+    codes = catalog["Course Code"].drop_duplicates().head(n_courses)
+    at.text_area(key="transcript_import_text").input("\n".join(f"{code} A" for code in codes))
+    timed_run(record, "import_transcript", at.button(key="transcript_import_button").click())
+
+
+def enter_semesters(at, record, n_semesters):
+    for i in range(n_semesters):
+        sem_id = at.session_state["semesters"][i]["id"]
+        gpa = at.text_input(key=f"gpa_{sem_id}_text_input")
+        timed_run(record, "enter_gpa", gpa.input(f"{7.5 + (i % 5) * 0.4:.2f}"))
+
+        credits = at.number_input(key=f"credits_{sem_id}")
+        timed_run(record, "enter_credits", credits.set_value(20.0 + (i % 3)))
+
+        if i < n_semesters - 1:
+            timed_run(record, "add_semester", by_label(at.button, "➕ Add Semester").click())
+
+
+def cgpa_session(at, record, n_semesters=8):
+    """Fills ``n_semesters`` GPA/credit rows in CGPA Mode."""
+    timed_run(record, "initial_load", at)
+    switch_mode(at, record, "CGPA Mode")
+    enter_semesters(at, record, n_semesters)
+
+
+def target_cgpa(at, record, target=8.5, next_credits=22.0):
+    """Asks the "Achieve a Target CGPA" block for the GPA needed next semester."""
+    timed_run(record, "open_target", by_label(at.button, "Set a Target CGPA").click())
+    at.number_input(key="target_cgpa_input").set_value(target)
+    at.number_input(key="target_credits_1").set_value(next_credits)
+    timed_run(record, "calculate_target", by_label(at.button, "Calculate Required GPA").click())
+
+
+def predict_grades(at, record, n_predictions):
+    course = by_label(at.selectbox, "Select Course")
+    theory = next(o for o in course.options if o.split(" - ")[0].endswith("L"))
+    timed_run(record, "select_course", course.select(theory))
+
+    for i in range(n_predictions):
+        by_label(at.number_input, "CAT 1 (out of 50)").set_value(20 + i)
+        by_label(at.number_input, "CAT 2 (out of 50)").set_value(25 + i)
+        by_label(at.number_input, "DA 1 (out of 10)").set_value(6 + i % 5)
+        by_label(at.number_input, "FAT (out of 100)").set_value(40 + 2 * i)
+        timed_run(record, "predict", by_label(at.button, "Predict Grade").click())
+
+
+def prediction_session(at, record, n_predictions=20):
+    """Runs ``n_predictions`` theory-course predictions with varying marks."""
+    timed_run(record, "initial_load", at)
+    switch_mode(at, record, "Grade Prediction Mode")
+    predict_grades(at, record, n_predictions)
+
+
+def student_session(at, record):
+    """
+    A typical visit: pick a branch, enter a few courses (L/P pairs included),
+    enter past semesters and a target CGPA, then predict a couple of grades.
+    """
+    timed_run(record, "initial_load", at)
+    select_branch(at, record, 1)
+    add_courses(at, record, 4)
+    switch_mode(at, record, "CGPA Mode")
+    enter_semesters(at, record, 3)
+    target_cgpa(at, record)
+    switch_mode(at, record, "Grade Prediction Mode")
+    predict_grades(at, record, 3)
+
+
+SESSIONS = {
+    "semester": semester_session,
+    "import": import_session,
+    "cgpa": cgpa_session,
+    "prediction": prediction_session,
+    "student": student_session,
+}
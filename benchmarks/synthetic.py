@@ -0,0 +1,93 @@
+"""Synthetic transcripts, semesters and class rosters for benchmarks."""
+import numpy as np
+
+from utils import GRADE_POINTS
+
+DEFAULT_CATALOG = "data/courses_bce.csv"
+
+GRADES = list(GRADE_POINTS.keys())
+NON_GRADED_GRADES = ["P", "F"]
+
+
+def make_transcript(courses_df, n_courses, seed=0):
+    """Returns ``n_courses`` subject dicts shaped like the modes' calculated subjects."""
+    rng = np.random.default_rng(seed)
+    picks = courses_df.iloc[rng.integers(0, len(courses_df), n_courses)]
+    subjects = []
+    for _, course in picks.iterrows():
+        non_graded = "Non-Graded Core Requirement" in course["Type"]
+        subjects.append({
+            "Course": course["Display"],
+            "Type": course["Type"],
+            "Credits": float(course["Credits"]),
+            "Grade": rng.choice(NON_GRADED_GRADES if non_graded else GRADES),
+        })
+    return subjects
+
+
+def make_semesters(n_semesters, seed=0):
+    """Returns CGPA Mode semester dicts with GPAs in [5, 10] and 16–27 credits."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": i,
+            "gpa": round(float(rng.uniform(5.0, 10.0)), 2),
+            "credits": float(rng.integers(32, 55)) / 2,
+        }
+        for i in range(n_semesters)
+    ]
+
+
+def make_roster(n_students, seed=0):
+    """
+    Returns a dict of per-student mark arrays for a class roster, in the
+    ranges accepted by the Grade Prediction Mode inputs.
+    """
+    rng = np.random.default_rng(seed)
+    return {
+        "da1": rng.integers(5, 11, n_students).astype(float),
+        "da2": rng.integers(5, 11, n_students).astype(float),
+        "da3": rng.integers(4, 11, n_students).astype(float),
+        "cat1": rng.integers(10, 51, n_students).astype(float),
+        "cat2": rng.integers(10, 51, n_students).astype(float),
+        "fat": rng.integers(30, 101, n_students).astype(float),
+        "class_strength": rng.integers(10, 121, n_students).astype(float),
+    }
+
+
+def write_department(courses_df, n_students, roster_path, transcripts_path, semesters=6,
+                     courses_per_semester=7, seed=0):
+    """
+    Writes a roster and a transcript file (in roster order) for
+    ``department_report``: ``semesters`` graded semesters per student and
+    one in progress, with marks, so its grades are predicted.
+    """
+    import pandas as pd
+
+    from script import MARK_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    ids = [f"S{i:07d}" for i in range(n_students)]
+    pd.DataFrame({"Student ID": ids, "Name": ids, "Branch": "BCE"}).to_csv(roster_path, index=False)
+
+    codes = courses_df["Course Code"].to_numpy()
+    non_graded = courses_df["Type"].str.contains("Non-Graded Core Requirement", regex=False).to_numpy()
+    per_student = (semesters + 1) * courses_per_semester
+    marks_high = [11, 11, 11, 51, 51, 101]
+    # Written a block of students at a time so the generator stays small too.
+    for block in range(0, n_students, 1000):
+        n = min(1000, n_students - block)
+        picks = rng.integers(0, len(codes), (n, per_student)).ravel()
+        semester = np.tile(np.repeat(np.arange(1, semesters + 2), courses_per_semester), n)
+        grades = np.where(non_graded[picks], "P", rng.choice(GRADES, len(picks)))
+        in_progress = semester == semesters + 1
+        frame = pd.DataFrame({
+            "Student ID": np.repeat(ids[block:block + n], per_student),
+            "Semester": semester,
+            "Course Code": codes[picks],
+            "Grade": np.where(in_progress, "", grades),
+        })
+        for column, high in zip(MARK_COLUMNS, marks_high):
+            frame[column] = np.where(in_progress, rng.integers(high // 3, high, len(picks)), np.nan)
+        frame["Class Strength"] = np.where(in_progress, rng.integers(10, 121, len(picks)), np.nan)
+        frame.to_csv(transcripts_path, mode="w" if block == 0 else "a", header=block == 0, index=False)
@@ -0,0 +1,168 @@
+"""
+Degree-completion planner: the least demanding set of grades in the
+remaining courses that still reaches a target CGPA.
+
+Credits are counted in half-credit units so every course contributes an
+integer number of "half grade points" (2 x credits x grade point). Reaching
+the target then means reaching a fixed integer total, and a subset-sum DP
+over those totals finds the smallest achievable total above it:
+
+1. The grade ceiling is the lowest grade that, taken in every remaining
+   graded course, reaches the target. No course needs more than that.
+2. Under that ceiling, the DP picks per-course grades whose total is the
+   smallest one that still reaches the target.
+
+Courses are then packed into the remaining semesters (first-fit
+decreasing, at most ``MAX_SEM_CREDITS`` per semester) to give the GPA
+needed in each semester.
+"""
+import math
+
+import numpy as np
+
+from utils import GRADE_POINTS
+
+# Lowest grade a planned course may take; F means the course is not cleared.
+PASSING_GRADES = {g: p for g, p in GRADE_POINTS.items() if p > 0}
+NON_GRADED_TYPE = "Non-Graded Core Requirement"
+
+
+def remaining_courses(courses_df, displays):
+    """Course records (display, credits, graded) for the chosen catalog entries."""
+    catalog = courses_df.drop_duplicates("Display").set_index("Display")
+    chosen = catalog.loc[[d for d in displays if d in catalog.index]]
+    return [
+        {
+            "Course": display,
+            "Credits": float(credits),
+            "graded": NON_GRADED_TYPE not in str(ctype),
+        }
+        for display, credits, ctype in zip(chosen.index, chosen["Credits"], chosen["Type"])
+    ]
+
+
+def _min_total_at_least(units, grade_points, target):
+    """
+    Picks one grade point per course (from ``grade_points``) so that
+    sum(units * point) is the smallest total >= ``target``.
+    Returns the chosen points per course, or None if unreachable.
+    """
+    shifts = [[u * p for p in grade_points] for u in units]
+    max_total = sum(max(s) for s in shifts)
+    if max_total < target:
+        return None
+
+    reachable = np.zeros((len(units) + 1, max_total + 1), dtype=bool)
+    reachable[0, 0] = True
+    for k, course_shifts in enumerate(shifts):
+        row = reachable[k + 1]
+        for shift in course_shifts:
+            row[shift:] |= reachable[k, :max_total + 1 - shift]
+
+    totals = np.flatnonzero(reachable[-1, max(target, 0):]) + max(target, 0)
+    total = int(totals[0])
+
+    chosen = [0] * len(units)
+    for k in range(len(units) - 1, -1, -1):
+        # Lowest grade first, so slack is left to the courses decided later.
+        for point, shift in zip(grade_points, shifts[k]):
+            if shift <= total and reachable[k, total - shift]:
+                chosen[k] = point
+                total -= shift
+                break
+    return chosen
+
+
+def pack_semesters(courses, n_semesters, max_sem_credits):
+    """
+    First-fit decreasing packing of courses into ``n_semesters``.
+    Returns a semester index (0-based) per course, or None if they don't fit.
+    """
+    loads = [0.0] * n_semesters
+    assignment = [None] * len(courses)
+    for i in sorted(range(len(courses)), key=lambda i: -courses[i]["Credits"]):
+        for s in range(n_semesters):
+            if loads[s] + courses[i]["Credits"] <= max_sem_credits:
+                loads[s] += courses[i]["Credits"]
+                assignment[i] = s
+                break
+        else:
+            return None
+    return assignment
+
+
+def plan_target_cgpa(target_cgpa, completed_weighted_sum, completed_credits, courses,
+                     remaining_semesters, max_sem_credits, max_total_credits):
+    """
+    Finds the least demanding grades in ``courses`` that reach ``target_cgpa``.
+
+    Returns a dict with "ok" and "message", and when a plan exists also
+    "ceiling" (highest grade any course needs), "courses" (rows with the
+    semester and grade for each course), "semester_gpas" and "final_cgpa".
+    """
+    if not courses:
+        return {"ok": False, "message": "Select the courses you still have to take."}
+
+    total_credits = completed_credits + sum(c["Credits"] for c in courses)
+    if total_credits > max_total_credits:
+        return {"ok": False, "message": (
+            f"These courses bring the total to {total_credits:.1f} credits, "
+            f"above the program limit of {max_total_credits}."
+        )}
+
+    assignment = pack_semesters(courses, remaining_semesters, max_sem_credits)
+    if assignment is None:
+        return {"ok": False, "message": (
+            f"These courses do not fit in {remaining_semesters} semester(s) "
+            f"of at most {max_sem_credits} credits."
+        )}
+
+    graded = [i for i, c in enumerate(courses) if c["graded"]]
+    units = [round(courses[i]["Credits"] * 2) for i in graded]
+    graded_credits = completed_credits + sum(units) / 2
+    # Half grade points still needed; the epsilon absorbs float noise in the target.
+    needed = math.ceil(target_cgpa * graded_credits * 2 - completed_weighted_sum * 2 - 1e-9)
+
+    points = sorted(set(PASSING_GRADES.values()))
+    ceiling = next((p for p in points if sum(units) * p >= needed), None)
+    if ceiling is None:
+        if not graded_credits:
+            return {"ok": False, "message": "None of these courses count towards the CGPA."}
+        best = (completed_weighted_sum + sum(units) / 2 * max(points)) / graded_credits
+        return {"ok": False, "message": (
+            f"A CGPA of {target_cgpa:.2f} is out of reach with these courses; "
+            f"straight {max(PASSING_GRADES, key=PASSING_GRADES.get)} grades give {best:.2f}."
+        )}
+
+    chosen = _min_total_at_least(units, [p for p in points if p <= ceiling], needed)
+    letter = {p: g for g, p in PASSING_GRADES.items()}
+    grades = dict(zip(graded, chosen))
+
+    rows = []
+    semester_points = [0.0] * remaining_semesters
+    semester_credits = [0.0] * remaining_semesters
+    for i, course in enumerate(courses):
+        point = grades.get(i)
+        semester = assignment[i]
+        if point is not None:
+            semester_points[semester] += point * course["Credits"]
+            semester_credits[semester] += course["Credits"]
+        rows.append({
+            "Semester": semester + 1,
+            "Course": course["Course"],
+            "Credits": course["Credits"],
+            "Grade": letter[point] if point is not None else "P",
+        })
+
+    final_weighted = completed_weighted_sum + sum(semester_points)
+    return {
+        "ok": True,
+        "message": f"No course needs more than {letter[ceiling]}.",
+        "ceiling": letter[ceiling],
+        "courses": sorted(rows, key=lambda r: (r["Semester"], r["Course"])),
+        "semester_gpas": [
+            points_sum / credits if credits else None
+            for points_sum, credits in zip(semester_points, semester_credits)
+        ],
+        "final_cgpa": final_weighted / graded_credits if graded_credits else 0.0,
+    }
@@ -0,0 +1,218 @@
+import json
+import numpy as np
+
+# Booster objectives whose margin is returned as-is by ``predict``.
+REGRESSION_OBJECTIVES = {"reg:squarederror", "reg:linear", "reg:absoluteerror", "reg:pseudohubererror"}
+CLASSIFICATION_OBJECTIVES = {"multi:softprob", "multi:softmax"}
+
+# Rows evaluated per traversal pass; bounds the (rows, trees) index matrix.
+ROW_BLOCK = 1024
+
+# Above this many rows XGBoost's native predictor is faster than the NumPy path.
+FAST_PATH_MAX_ROWS = 32
+
+
+def _parse_base_score(raw, num_groups):
+    """
+    Parses XGBoost's base_score, which newer versions store as a bracketed
+    vector string (e.g. '[5E-1]' or '[a,b,c]').
+    """
+    text = str(raw).strip().strip("[]")
+    values = np.array([float(v) for v in text.split(",") if v], dtype=np.float64)
+    if values.size == 1 and num_groups > 1:
+        values = np.repeat(values, num_groups)
+    return values
+
+
+class CompiledEnsemble:
+    """
+    A tree ensemble flattened into parallel node arrays.
+
+    Every tree is re-laid out as a complete binary tree of the ensemble's
+    maximum depth (children of slot ``i`` live at ``2i+1``/``2i+2``) and all
+    trees are stored back to back. A prediction is then ``depth`` vectorized
+    gather steps over a (rows, trees) matrix of slot indices instead of one
+    Python call per tree. Leaves shallower than the maximum depth are padded
+    with always-left splits that carry the leaf value down.
+    """
+
+    def __init__(self, feature, threshold, default_left, value, tree_group,
+                 base_margin, objective, num_features, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.tree_group = tree_group
+        self.base_margin = base_margin
+        self.objective = objective
+        self.num_features = num_features
+        self.max_depth = max_depth
+        self.num_groups = len(base_margin)
+        self.tree_size = 2 ** (max_depth + 1) - 1
+        self.roots = np.arange(len(tree_group), dtype=np.int64) * self.tree_size
+        self.group_starts = np.searchsorted(tree_group, np.arange(self.num_groups))
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Compiles an ``xgboost.Booster`` into flat node arrays."""
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in REGRESSION_OBJECTIVES | CLASSIFICATION_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for compilation: {objective}")
+
+        model = learner["gradient_booster"]["model"]
+        params = learner["learner_model_param"]
+        num_groups = max(int(params.get("num_class", "0")), 1)
+        base_margin = _parse_base_score(params["base_score"], num_groups)
+
+        trees = model["trees"]
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported by the compiled backend.")
+
+        tree_info = np.asarray(model.get("tree_info") or [0] * len(trees), dtype=np.int32)
+        # Group trees by output class so margins can be summed with one reduceat.
+        order = np.argsort(tree_info, kind="stable")
+
+        max_depth = max(_tree_depth(t["left_children"], t["right_children"]) for t in trees)
+        tree_size = 2 ** (max_depth + 1) - 1
+        total = tree_size * len(trees)
+
+        feature = np.zeros(total, dtype=np.int32)
+        threshold = np.full(total, np.inf, dtype=np.float32)
+        default_left = np.ones(total, dtype=bool)
+        value = np.zeros(total, dtype=np.float32)
+
+        for position, tree_id in enumerate(order):
+            _place_tree(trees[tree_id], position * tree_size, max_depth,
+                        feature, threshold, default_left, value)
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            default_left=default_left,
+            value=value,
+            tree_group=tree_info[order],
+            base_margin=base_margin,
+            objective=objective,
+            num_features=int(params["num_feature"]),
+            max_depth=max_depth,
+        )
+
+    def predict_margin(self, X):
+        """Returns raw margins with shape (rows, groups)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.num_features:
+            raise ValueError(
+                f"Feature shape mismatch, expected: {self.num_features}, got {X.shape[1]}"
+            )
+
+        margin = np.empty((X.shape[0], self.num_groups), dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            margin[start:start + ROW_BLOCK] = self._margin_block(X[start:start + ROW_BLOCK])
+        return margin + self.base_margin
+
+    def _margin_block(self, X):
+        rows = np.arange(X.shape[0])[:, None]
+        has_nan = bool(np.isnan(X).any())
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+
+        for _ in range(self.max_depth):
+            feat = self.feature[nodes]
+            x = X[rows, feat]
+            go_left = x < self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.default_left[nodes]
+            # Local slot i -> 2i+1 (left) or 2i+2 (right).
+            nodes = 2 * nodes - self.roots + 2 - go_left
+
+        leaf_values = self.value[nodes].astype(np.float64)
+        return np.add.reduceat(leaf_values, self.group_starts, axis=1)
+
+    def predict(self, X):
+        """Mirrors the sklearn wrapper: values for regressors, class ids for classifiers."""
+        margin = self.predict_margin(X)
+        if self.objective in CLASSIFICATION_OBJECTIVES:
+            return margin.argmax(axis=1)
+        return margin[:, 0]
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _tree_depth(left_children, right_children):
+    depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, level = stack.pop()
+        if left_children[node] == -1:
+            depth = max(depth, level)
+            continue
+        stack.append((left_children[node], level + 1))
+        stack.append((right_children[node], level + 1))
+    return depth
+
+
+def _place_tree(tree, base, max_depth, feature, threshold, default_left, value):
+    """Writes one XGBoost tree into its complete-binary-tree slots."""
+    left_children = tree["left_children"]
+    right_children = tree["right_children"]
+
+    stack = [(0, 0, 0)]
+    while stack:
+        node, slot, level = stack.pop()
+        if left_children[node] == -1:
+            leaf_value = tree["split_conditions"][node]
+            # Padding splits keep threshold=inf/default_left so rows always go
+            # left; the value is written to every descendant leaf slot.
+            first = slot
+            for _ in range(max_depth - level):
+                first = 2 * first + 1
+            width = 2 ** (max_depth - level)
+            value[base + first:base + first + width] = leaf_value
+            continue
+
+        feature[base + slot] = tree["split_indices"][node]
+        threshold[base + slot] = tree["split_conditions"][node]
+        default_left[base + slot] = bool(tree["default_left"][node])
+        stack.append((left_children[node], 2 * slot + 1, level + 1))
+        stack.append((right_children[node], 2 * slot + 2, level + 1))
+
+
+def compile_model(model):
+    """Compiles an XGBoost sklearn estimator (or raw Booster)."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    return CompiledEnsemble.from_booster(booster)
+
+
+class FastPredictor:
+    """
+    Drop-in ``predict`` wrapper around an XGBoost estimator.
+
+    Small inputs (the app predicts one row at a time) go through the compiled
+    NumPy ensemble, which skips the sklearn/DMatrix overhead. Large batches are
+    handed back to XGBoost's native multi-threaded predictor, which wins there.
+    """
+
+    def __init__(self, model, max_rows=FAST_PATH_MAX_ROWS):
+        self.model = model
+        self.compiled = compile_model(model)
+        self.max_rows = max_rows
+        self.n_features_in_ = self.compiled.num_features
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 2 and X.shape[0] > self.max_rows:
+            return self.model.predict(X)
+        return self.compiled.predict(X)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 2 and X.shape[0] > self.max_rows:
+            return self.model.predict_proba(X)
+        return self.compiled.predict_proba(X)
@@ -0,0 +1,38 @@
+# components/course_picker.py
+
+import streamlit as st
+
+MAX_RESULTS = 8
+
+def course_picker(key, course_index, current, selected, on_change=None, args=None,
+                  placeholder="Search for a course..."):
+    """
+    Search box plus a short selectbox of the best matches for one row.
+
+    Replaces a selectbox over the whole catalog: only the top matches from the
+    prebuilt course index (minus courses already used in other rows) are sent
+    to the browser. The row's current course is always kept as an option.
+    """
+    query = st.text_input(
+        "Search courses",
+        key=f"{key}_query",
+        placeholder="Type a course code or name...",
+        label_visibility="collapsed"
+    )
+
+    exclude = set(selected)
+    exclude.discard(current)
+    options = course_index.search(query, limit=MAX_RESULTS, exclude=exclude)
+    if current is not None and current not in options:
+        options = [current] + options
+
+    return st.selectbox(
+        label="Select a course...",
+        options=options,
+        index=options.index(current) if current in options else None,
+        key=key,
+        on_change=on_change,
+        args=args,
+        placeholder=placeholder,
+        label_visibility="collapsed"
+    )
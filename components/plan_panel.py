@@ -0,0 +1,153 @@
+# components/plan_panel.py
+
+import streamlit as st
+
+import state
+from plans import (
+    PLAN_MODES, decode_plan, encode_rows, encode_semesters, get_plan_store,
+    is_owner, new_owner, plan_rows, plan_semesters,
+)
+from utils import BRANCH_CATALOGS, get_course_data
+
+def current_plan_token(branch, mode, courses_df):
+    """Encodes the plan currently being edited, or None if there is nothing to save."""
+    if mode == "CGPA Mode":
+        semesters = st.session_state.get("semesters", [])
+        if not any(s["gpa"] is not None or s["credits"] is not None for s in semesters):
+            return None
+        return encode_semesters(branch, semesters)
+
+    rows = [r for r in st.session_state.get("rows", []) if r["course_display"]]
+    if not rows:
+        return None
+    return encode_rows(branch, mode, rows, courses_df)
+
+def apply_plan(token):
+    """
+    Restores a plan token into session state in one step: branch, mode and
+    all rows (or semesters). Returns an error message, or None on success.
+    """
+    try:
+        plan = decode_plan(token)
+        if plan["mode"] == "CGPA Mode":
+            items, _ = plan_semesters(plan)
+        else:
+            course_file_path, _ = BRANCH_CATALOGS[plan["branch"]]
+            items, _ = plan_rows(plan, get_course_data(course_file_path))
+    except ValueError as e:
+        return str(e)
+
+    # Keep whatever was being edited, then replace the target's rows.
+    state.switch_to(plan["branch"], plan["mode"])
+    st.session_state.branch_selector = plan["branch"]
+    st.session_state.mode = plan["mode"]
+    state.adopt("semesters" if plan["mode"] == "CGPA Mode" else "rows", items)
+    # Free Mode's table editor must be rebuilt from the restored rows.
+    for key in ("free_bulk_base", "free_bulk_editor"):
+        if key in st.session_state:
+            del st.session_state[key]
+    return None
+
+def restore_from_query_params():
+    """
+    Restores a ``?plan=`` link once per session. Must run before the branch
+    selector is created so the restored branch can still be set.
+    """
+    token = st.query_params.get("plan")
+    if not token or st.session_state.get("restored_plan") == token:
+        return
+    st.session_state.restored_plan = token
+    error = apply_plan(token)
+    if error:
+        st.warning(f"Could not restore the shared plan: {error}")
+
+def plan_owner():
+    """
+    This browser session's key for its saved plans. It lives in session
+    state only; a ``?owner=`` bookmark link (see ``plan_panel``) is adopted
+    once and then taken out of the address bar, so plan links copied from
+    it never carry the key.
+    """
+    owner = st.session_state.get("plan_owner")
+    if owner is None:
+        owner = st.query_params.get("owner")
+        if not is_owner(owner):
+            owner = new_owner()
+        st.session_state.plan_owner = owner
+    if "owner" in st.query_params:
+        del st.query_params["owner"]
+    return owner
+
+def saved_plan_names():
+    """The owner's saved plan names, queried once and kept until a save."""
+    owner = plan_owner()
+    cached = st.session_state.get("plan_names")
+    if cached is None or cached[0] != owner:
+        cached = st.session_state.plan_names = (owner, get_plan_store().names(owner))
+    return cached[1]
+
+def load_saved_plan():
+    name = st.session_state.get("plan_load_name")
+    token = get_plan_store().load(plan_owner(), name) if name else None
+    if token is None:
+        st.session_state.plan_message = ("warning", "Choose a saved plan to load.")
+        return
+    error = apply_plan(token)
+    if error:
+        st.session_state.plan_message = ("warning", f"Could not load '{name}': {error}")
+    else:
+        st.session_state.plan_message = ("success", f"Loaded '{name}'.")
+
+def save_plan(branch, mode, courses_df):
+    name = st.session_state.get("plan_save_name", "").strip()
+    if not name:
+        st.session_state.plan_message = ("warning", "Enter a name for the plan.")
+        return
+    # Re-encode here: fragment reruns may have edited rows since the panel rendered.
+    token = current_plan_token(branch, mode, courses_df)
+    if token is None:
+        st.session_state.plan_message = ("warning", "There is nothing to save yet.")
+        return
+    get_plan_store().save(plan_owner(), name, token)
+    st.session_state.pop("plan_names", None)
+    st.session_state.plan_message = ("success", f"Saved '{name}'.")
+
+def plan_panel(branch, mode, courses_df):
+    """Expander to share the current plan as a link, or save/load it by name."""
+    if mode not in PLAN_MODES:
+        return
+
+    with st.expander("💾 Save or share this plan"):
+        token = current_plan_token(branch, mode, courses_df)
+        if token is None:
+            st.caption("Add some courses or semesters to save or share this plan.")
+        else:
+            st.markdown("**Share link** — opens this plan on any device:")
+            st.code(f"?plan={token}", language=None)
+            if st.button("Put plan in the address bar", key="plan_update_url"):
+                st.query_params["plan"] = token
+                st.session_state.restored_plan = token
+
+            st.caption("Saved plans are kept for this session; bookmark the link below them to find "
+                       "them again later.")
+            save_col, save_btn_col = st.columns([3, 1])
+            with save_col:
+                st.text_input("Plan name", key="plan_save_name", placeholder="e.g. Semester 5 draft")
+            with save_btn_col:
+                st.button("Save", key="plan_save", on_click=save_plan, args=(branch, mode, courses_df))
+
+        saved = saved_plan_names()
+        if saved:
+            load_col, load_btn_col = st.columns([3, 1])
+            with load_col:
+                st.selectbox("Saved plans", saved, key="plan_load_name")
+            with load_btn_col:
+                st.button("Load", key="plan_load", on_click=load_saved_plan)
+            st.markdown("**Bookmark my plans** — opening this link finds your saved plans again. "
+                        "Keep it private: anyone with it can load and overwrite them.")
+            st.code(f"?owner={plan_owner()}", language=None)
+
+        message = st.session_state.pop("plan_message", None)
+        if message is not None:
+            level, text = message
+            getattr(st, level)(text)
@@ -1,14 +1,77 @@
 # components/tables.py
 
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-def display_results_table(calculated_subjects):
-    """Renders the final results table for the user."""
+import instrumentation
+
+MAX_CACHED_TABLES = 256
+
+_tables = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def build_results_table(calculated_subjects):
+    """
+    Returns (results, subtotals) DataFrames for the subject dicts: one row
+    per course with grade points and weighted score, and the credit and
+    weighted-score totals per course type. Built column by column in one
+    pass and memoised on the rows' contents, shared across sessions, so
+    treat the frames as read-only.
+    """
     from utils import GRADE_POINTS
 
+    key = tuple((s["Course"], s["Type"], s["Credits"], s["Grade"]) for s in calculated_subjects)
+    with _tables_lock:
+        tables = _tables.get(key)
+        if tables is not None:
+            _tables.move_to_end(key)
+            return tables
+
+    courses, types, credits, grades = (list(column) for column in zip(*key))
+    credits = np.asarray(credits, dtype=np.float64)
+    # Grade ids into a points lookup array instead of a per-row apply.
+    grade_ids = {grade: i for i, grade in enumerate(GRADE_POINTS)}
+    points = np.append(np.fromiter(GRADE_POINTS.values(), dtype=np.int64), 0)
+    grade_points = points[[grade_ids.get(g, len(GRADE_POINTS)) for g in grades]]
+    weighted = credits * grade_points
+    results = pd.DataFrame({
+        "Course": courses,
+        "Type": types,
+        "Credits": credits,
+        "Grade": grades,
+        "Grade Points": grade_points,
+        "Weighted Score": weighted,
+    })
+
+    type_index = {}
+    type_ids = np.fromiter((type_index.setdefault(t, len(type_index)) for t in types),
+                           dtype=np.int64, count=len(types))
+    type_names = list(type_index)
+    subtotals = pd.DataFrame({
+        "Type": type_names,
+        "Courses": np.bincount(type_ids, minlength=len(type_names)),
+        "Credits": np.bincount(type_ids, weights=credits, minlength=len(type_names)),
+        "Weighted Score": np.bincount(type_ids, weights=weighted, minlength=len(type_names)),
+    })
+
+    tables = (results, subtotals)
+    with _tables_lock:
+        _tables[key] = tables
+        if len(_tables) > MAX_CACHED_TABLES:
+            _tables.popitem(last=False)
+    return tables
+
+
+@instrumentation.timed("display_results_table")
+def display_results_table(calculated_subjects):
+    """Renders the final results table for the user, with credits per course type."""
     if calculated_subjects:
-        result_df = pd.DataFrame(calculated_subjects)
-        result_df["Grade Points"] = result_df["Grade"].apply(lambda g: GRADE_POINTS.get(g, 0))
-        result_df["Weighted Score"] = result_df["Credits"] * result_df["Grade Points"]
-        st.dataframe(result_df, use_container_width=True)
\ No newline at end of file
+        results, subtotals = build_results_table(calculated_subjects)
+        st.dataframe(results, use_container_width=True)
+        st.caption("Credits by course type")
+        st.dataframe(subtotals, use_container_width=True, hide_index=True)
@@ -0,0 +1,79 @@
+# components/transcript_importer.py
+
+import streamlit as st
+
+from transcript_import import parse_transcript, resolve_transcript, to_rows
+
+def import_transcript(key, courses_df, on_import=None):
+    """
+    Button callback: parses the pasted text or uploaded file, resolves it
+    against the catalog and writes the rows into session state, so the whole
+    transcript lands in a single rerun.
+    """
+    uploaded = st.session_state.get(f"{key}_file")
+    if uploaded is not None:
+        text = uploaded.getvalue().decode("utf-8", errors="replace")
+    else:
+        text = st.session_state.get(f"{key}_text", "")
+
+    if not text.strip():
+        st.session_state[f"{key}_report"] = ("warning", "Paste a course list or upload a file first.")
+        return
+
+    entries, unparsed = parse_transcript(text)
+    if entries.empty:
+        st.session_state[f"{key}_report"] = ("warning", "No course codes found in: " + ", ".join(unparsed))
+        return
+    resolved, unresolved = resolve_transcript(entries, courses_df)
+
+    if st.session_state.get(f"{key}_replace", True):
+        existing = []
+        next_id = st.session_state.get("next_id", 0)
+    else:
+        existing = [r for r in st.session_state.get("rows", []) if r["course_display"]]
+        next_id = st.session_state.next_id
+
+    new_rows, next_id = to_rows(resolved, next_id, existing=[r["course_display"] for r in existing])
+    rows = existing + new_rows
+    if not rows:
+        rows = [{"id": next_id, "course_display": None, "grade": "S"}]
+        next_id += 1
+    st.session_state.rows = rows
+    st.session_state.next_id = next_id
+
+    problems = unresolved + unparsed
+    message = f"Imported {len(new_rows)} course(s)."
+    if problems:
+        message += " Not found in this branch's catalog: " + ", ".join(problems)
+    st.session_state[f"{key}_report"] = ("warning" if problems else "success", message)
+
+    if on_import is not None:
+        on_import()
+
+def transcript_importer(key, courses_df, on_import=None):
+    """
+    Expander for importing a whole course list at once.
+
+    Accepts a CSV with "Course Code" and "Grade" columns, or one course per
+    line such as ``BCSE202L A``. L/P partners are added automatically.
+    """
+    with st.expander("📥 Import courses from a list or file"):
+        st.text_area(
+            "Course codes and grades",
+            key=f"{key}_text",
+            placeholder="BCSE202L A\nBMAT101L S\n...",
+            height=150
+        )
+        st.file_uploader("...or upload a CSV/text file", type=["csv", "txt"], key=f"{key}_file")
+        st.checkbox("Replace existing rows", value=True, key=f"{key}_replace")
+        st.button(
+            "Import",
+            key=f"{key}_button",
+            on_click=import_transcript,
+            args=(key, courses_df, on_import)
+        )
+
+        report = st.session_state.get(f"{key}_report")
+        if report is not None:
+            level, message = report
+            getattr(st, level)(message)
@@ -0,0 +1,165 @@
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+# How many catalogs (one per branch) keep a built index in memory.
+MAX_CACHED_INDEXES = 16
+
+# Minimum trigram similarity for a misspelt word to count as a match.
+FUZZY_THRESHOLD = 0.4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_END = "$"
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _trigrams(text):
+    text = f"  {str(text).lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CourseIndex:
+    """
+    In-memory search index over a course catalog.
+
+    Course codes and every word of the course name are inserted into a
+    prefix trie, so a query is answered by walking one trie path per query
+    token. A trigram index over the indexed words backs a fuzzy fallback
+    for typos ("pyhton"). Results are the catalog's ``Display`` strings.
+    """
+
+    def __init__(self, courses_df):
+        catalog = courses_df.drop_duplicates("Display")
+        self.displays = catalog["Display"].tolist()
+        self.codes = [str(c).lower() for c in catalog["Course Code"]]
+        self.trie = {}
+        self.word_entries = defaultdict(set)
+        self.word_grams = defaultdict(set)
+
+        for entry, (code, name) in enumerate(zip(self.codes, catalog["Course Name"])):
+            for token in {code, *_tokens(name)}:
+                self._insert(token, entry)
+                self.word_entries[token].add(entry)
+
+        self.word_gram_count = {}
+        for word in self.word_entries:
+            grams = _trigrams(word)
+            self.word_gram_count[word] = len(grams)
+            for gram in grams:
+                self.word_grams[gram].add(word)
+
+    def _insert(self, token, entry):
+        # Every node keeps the entries of its whole subtree, so a prefix
+        # lookup is a single walk down the trie.
+        node = self.trie
+        for ch in token:
+            node = node.setdefault(ch, {})
+            node.setdefault(_END, set()).add(entry)
+
+    def _prefix_entries(self, prefix):
+        node = self.trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get(_END, set())
+
+    def _fuzzy_entries(self, token):
+        """Maps entries to their best trigram (Dice) similarity with ``token``."""
+        token_grams = _trigrams(token)
+        shared = defaultdict(int)
+        for gram in token_grams:
+            for word in self.word_grams.get(gram, ()):
+                shared[word] += 1
+
+        best = {}
+        for word, count in shared.items():
+            similarity = 2 * count / (len(token_grams) + self.word_gram_count[word])
+            if word.startswith(token):
+                similarity = 1.0
+            if similarity < FUZZY_THRESHOLD:
+                continue
+            for entry in self.word_entries[word]:
+                if similarity > best.get(entry, 0.0):
+                    best[entry] = similarity
+        return best
+
+    def search(self, query, limit=8, exclude=()):
+        """
+        Returns up to ``limit`` Display strings matching ``query``, best first,
+        skipping any in ``exclude``.
+
+        Exact code matches rank first, then code prefixes, then courses where
+        every query word prefixes a word of the code or name, then fuzzy
+        (trigram) matches.
+        """
+        query = str(query or "").strip().lower()
+        if not query:
+            return []
+
+        exclude = set(exclude)
+        scores = {}
+
+        tokens = _tokens(query)
+        if tokens:
+            matched = set(self._prefix_entries(tokens[0]))
+            for token in tokens[1:]:
+                matched &= self._prefix_entries(token)
+            for entry in matched:
+                code = self.codes[entry]
+                if code == query:
+                    scores[entry] = 3.0
+                elif code.startswith(query):
+                    scores[entry] = 2.0
+                else:
+                    scores[entry] = 1.0
+
+        if tokens and len(scores) < limit:
+            fuzzy = None
+            for token in tokens:
+                token_scores = self._fuzzy_entries(token)
+                if fuzzy is None:
+                    fuzzy = token_scores
+                else:
+                    fuzzy = {e: fuzzy[e] + token_scores[e] for e in fuzzy.keys() & token_scores.keys()}
+            for entry, similarity in fuzzy.items():
+                if entry not in scores:
+                    scores[entry] = 0.9 * similarity / len(tokens)
+
+        ranked = sorted(scores, key=lambda e: (-scores[e], self.displays[e]))
+        results = []
+        for entry in ranked:
+            display = self.displays[entry]
+            if display in exclude:
+                continue
+            results.append(display)
+            if len(results) >= limit:
+                break
+        return results
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_course_index(courses_df):
+    """
+    Returns the CourseIndex for a catalog, building it on first use.
+    Indexes are shared across sessions and keyed by the catalog's contents.
+    """
+    key = hash(tuple(courses_df["Display"]))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = CourseIndex(courses_df)
+    with _indexes_lock:
+        _indexes[key] = index
+        if len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
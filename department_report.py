@@ -0,0 +1,381 @@
+"""
+End-of-term reports for a whole batch of students.
+
+    python -m department_report --roster roster.csv --transcripts transcripts.csv --output reports/batch
+    python -m department_report --roster roster.parquet --transcripts transcripts.parquet --workers 4
+
+The roster has a ``Student ID`` column and optionally ``Name`` and
+``Branch`` (a ``BRANCH_CATALOGS`` name or its short code, e.g. ``BCE``;
+default ``DEFAULT_BRANCH``). The transcripts have one row per student and
+course with ``Student ID``, ``Semester``, ``Course Code`` and ``Grade``. A
+course without a grade is in progress; when its row also has the marks
+columns of the grade history (``Digital Assignment I`` ...
+``Final Assessment Test``, ``Class Strength``, and optionally the published
+``Class Mean`` / ``Class SD``), its grade is predicted.
+
+For every student the job writes ``<Student ID>.csv`` (the courses, with
+predictions) and ``<Student ID>.html`` (semester GPAs, CGPA, credits by
+course type and the courses) into the output directory, and one line per
+student to ``summary.csv``.
+
+Both files are read in chunks and never held whole: the transcripts must
+list each student's rows together and in roster order (as a department
+export does), so the two are merged as they stream; a transcript student
+not found on the roster within the next ``LOOKAHEAD`` students stops the
+job before any later student is reported. Students are processed in
+batches on a pool of worker processes, at most two batches per worker in
+flight. Each batch computes every GPA in one grouped pass and runs all of
+its predictions as one ``ml_predict_batch`` call, so memory stays flat
+however large the roster is.
+"""
+import argparse
+import csv
+import html
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+import storage
+from html_tables import cell, table
+from script import MARK_COLUMNS
+from utils import BRANCH_CATALOGS, DEFAULT_BRANCH, GRADE_POINTS, load_course_data
+
+NON_GRADED_TYPE = "Non-Graded Core Requirement"
+TRANSCRIPT_COLUMNS = ["Student ID", "Semester", "Course Code", "Grade"]
+# Columns needed to predict an in-progress course.
+PREDICTION_COLUMNS = MARK_COLUMNS + ["Class Strength"]
+COURSE_COLUMNS = ["Semester", "Course Code", "Course Name", "Type", "Credits", "Grade",
+                  "Predicted Grade", "Predicted Overall"]
+SUMMARY_COLUMNS = ["Student ID", "Name", "Branch", "Semesters", "CGPA", "Credits Earned",
+                   "Credits In Progress", "Predicted Courses", "Unknown Courses"]
+
+BATCH_STUDENTS = 256
+# Roster students searched ahead for a transcript student who is not the current one.
+LOOKAHEAD = 1000
+CHUNK_ROWS = 100_000
+
+# Branch short code (from the catalog file name) -> branch name.
+BRANCH_CODES = {
+    os.path.basename(path)[len("courses_"):-len(".csv")].upper(): name
+    for name, (path, _) in BRANCH_CATALOGS.items()
+}
+
+# Per-process catalogs keyed by branch, as code -> Course Name/Type/Credits.
+_catalogs = {}
+
+
+def branch_name(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value == "":
+        return DEFAULT_BRANCH
+    value = str(value).strip()
+    if value in BRANCH_CATALOGS:
+        return value
+    if value.upper() in BRANCH_CODES:
+        return BRANCH_CODES[value.upper()]
+    raise ValueError(f"unknown branch {value!r}")
+
+
+def _catalog(branch):
+    catalog = _catalogs.get(branch)
+    if catalog is None:
+        courses_df = load_course_data(BRANCH_CATALOGS[branch][0])
+        catalog = courses_df.drop_duplicates("Course Code").copy()
+        catalog["Course Code"] = catalog["Course Code"].astype(str).str.strip().str.upper()
+        catalog = _catalogs[branch] = catalog.set_index("Course Code")[["Course Name", "Type", "Credits"]]
+    return catalog
+
+
+def iter_transcripts(path, chunk_rows=CHUNK_ROWS):
+    """Yields (student id, DataFrame of their rows) for each run of rows of one student."""
+    carry_id, carry = None, []
+    for chunk in storage.iter_table(path, chunk_rows=chunk_rows):
+        ids = chunk["Student ID"].astype(str).str.strip()
+        runs = ids.ne(ids.shift()).cumsum()
+        for _, piece in chunk.groupby(runs, sort=False):
+            student_id = ids[piece.index[0]]
+            if student_id != carry_id and carry:
+                yield carry_id, pd.concat(carry, ignore_index=True)
+                carry = []
+            carry_id = student_id
+            carry.append(piece)
+    if carry:
+        yield carry_id, pd.concat(carry, ignore_index=True)
+
+
+def iter_roster(roster_path, chunk_rows=CHUNK_ROWS):
+    """Yields one student dict (Student ID, Name, Branch) per roster row."""
+    for chunk in storage.iter_table(roster_path, chunk_rows=chunk_rows):
+        for record in chunk.to_dict("records"):
+            yield {
+                "Student ID": str(record["Student ID"]).strip(),
+                "Name": record.get("Name") if isinstance(record.get("Name"), str) else "",
+                "Branch": branch_name(record.get("Branch")),
+            }
+
+
+def iter_students(roster_path, transcripts_path, chunk_rows=CHUNK_ROWS, lookahead=LOOKAHEAD):
+    """
+    Yields (student dict, transcript DataFrame) in roster order, merging the
+    two streams. Students without transcript rows get an empty DataFrame.
+
+    When the next transcript student is not the current roster student, the
+    next ``lookahead`` roster students are searched for them. If they are not
+    there (not on the roster, already passed, or too far ahead) a ValueError
+    is raised at once, rather than giving every later student an empty report.
+    """
+    transcripts = iter_transcripts(transcripts_path, chunk_rows)
+    pending = next(transcripts, None)
+    empty = pd.DataFrame(columns=TRANSCRIPT_COLUMNS)
+    roster = iter_roster(roster_path, chunk_rows)
+    window = deque(islice(roster, lookahead + 1))
+    upcoming = Counter(student["Student ID"] for student in window)
+    emitted = set()
+    while window:
+        student = window.popleft()
+        upcoming[student["Student ID"]] -= 1
+        following = next(roster, None)
+        if following is not None:
+            window.append(following)
+            upcoming[following["Student ID"]] += 1
+
+        rows = empty
+        if pending is not None and pending[0] == student["Student ID"]:
+            rows = pending[1]
+            pending = next(transcripts, None)
+        elif pending is not None and upcoming[pending[0]] <= 0:
+            if pending[0] in emitted:
+                raise ValueError(f"transcript rows for student {pending[0]} are out of roster order")
+            raise ValueError(
+                f"transcript rows for student {pending[0]} (before roster student {student['Student ID']}) "
+                f"are not on the roster, or more than {lookahead} roster students ahead"
+            )
+        emitted.add(student["Student ID"])
+        yield student, rows
+    if pending is not None:
+        raise ValueError(f"transcript rows for student {pending[0]} are not on the roster")
+
+
+def iter_batches(students, size=BATCH_STUDENTS):
+    batch = []
+    for item in students:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _resolve(batch):
+    """
+    One frame of every course in the batch, joined to its branch catalog
+    (one join per branch), in batch order.
+    """
+    by_branch = {}
+    for i, (student, rows) in enumerate(batch):
+        if len(rows):
+            by_branch.setdefault(student["Branch"], []).append((i, rows))
+    if not by_branch:
+        return None
+    frames = []
+    for branch, parts in by_branch.items():
+        rows = pd.concat([rows for _, rows in parts], ignore_index=True)
+        rows["student"] = np.repeat([i for i, _ in parts], [len(rows) for _, rows in parts])
+        rows["Course Code"] = rows["Course Code"].astype(str).str.strip().str.upper()
+        frames.append(rows.join(_catalog(branch), on="Course Code"))
+    frame = pd.concat(frames, ignore_index=True).sort_values("student", kind="stable", ignore_index=True)
+    frame["Grade"] = frame["Grade"].where(frame["Grade"].notna(), "").astype(str).str.strip().str.upper()
+    frame["Credits"] = frame["Credits"].astype(float)
+    return frame
+
+
+def semester_gpas(frame):
+    """
+    Per (student, Semester): GPA over the graded courses, as ``calculate_gpa``
+    computes it (non-graded courses and courses without a grade excluded),
+    and the graded credits it is weighted by.
+    """
+    points = frame["Grade"].map(GRADE_POINTS)
+    non_graded = frame["Type"].fillna("").str.contains(NON_GRADED_TYPE, regex=False)
+    graded = points.notna() & frame["Type"].notna() & ~non_graded
+    terms = pd.DataFrame({
+        "student": frame["student"],
+        "Semester": frame["Semester"],
+        "credits": frame["Credits"].where(graded, 0.0),
+        "weighted": (frame["Credits"] * points).where(graded, 0.0),
+    }).groupby(["student", "Semester"], sort=True).sum()
+    terms["gpa"] = (terms["weighted"] / terms["credits"]).where(terms["credits"] > 0)
+    return terms
+
+
+def predict(frame):
+    """Adds Predicted Grade/Overall for in-progress courses that have marks."""
+    from modes.grade_prediction_mode import GRADE_MAP, REQUEST_COLUMNS, ml_predict_batch
+
+    frame["Predicted Grade"] = ""
+    frame["Predicted Overall"] = np.nan
+    if any(c not in frame.columns for c in PREDICTION_COLUMNS):
+        return 0
+    marks = frame[PREDICTION_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    todo = (frame["Grade"] == "") & frame["Type"].notna() & marks.notna().all(axis=1)
+    if not todo.any():
+        return 0
+
+    source = dict(zip(["da1", "da2", "da3", "cat1", "cat2", "fat", "class_strength"], PREDICTION_COLUMNS))
+    source.update(manual_avg="Class Mean", manual_sd="Class SD")
+    requests = np.full((int(todo.sum()), len(REQUEST_COLUMNS)), np.nan)
+    for j, name in enumerate(REQUEST_COLUMNS):
+        column = source.get(name)
+        if column in frame.columns:
+            requests[:, j] = pd.to_numeric(frame.loc[todo, column], errors="coerce")
+    results = ml_predict_batch(requests)
+    frame.loc[todo, "Predicted Overall"] = np.round(results[:, 0], 2)
+    frame.loc[todo, "Predicted Grade"] = [GRADE_MAP[int(g)] for g in results[:, 3]]
+    return int(todo.sum())
+
+
+def to_html(student, summary, terms, by_type, courses):
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(student['Student ID'])}</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse;margin-bottom:1.5em}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}}td:first-child,th:first-child{{text-align:left}}</style>
+</head><body>
+<h1>{html.escape(student['Student ID'])} {html.escape(student['Name'])}</h1>
+<p>{html.escape(student['Branch'])}</p>
+<p>CGPA <b>{cell(summary['CGPA'])}</b>, {cell(summary['Credits Earned'])} credits earned,
+{cell(summary['Credits In Progress'])} in progress.</p>
+<h2>Semesters</h2>
+{table(["Semester", "GPA", "Graded Credits"], terms)}
+<h2>Credits by course type</h2>
+{table(["Type", "Earned", "In Progress"], by_type)}
+<h2>Courses</h2>
+{table(COURSE_COLUMNS, courses)}
+</body></html>
+"""
+
+
+def _file_name(student_id):
+    return re.sub(r"[^\w.-]", "_", student_id)
+
+
+def _grouped(rows):
+    """{student: [row tuple without the student, ...]} for tuples led by the student."""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[0], []).append(row[1:])
+    return grouped
+
+
+def _csv_value(value):
+    if isinstance(value, float):
+        return "" if np.isnan(value) else value
+    return value
+
+
+def report_batch(batch, output_dir):
+    """Writes the reports of a batch of (student, transcript) pairs; returns their summary rows."""
+    frame = _resolve(batch)
+    courses, terms, by_type, totals = {}, {}, {}, {}
+    if frame is not None:
+        predict(frame)
+        known = frame["Type"].notna()
+        frame["Earned"] = frame["Credits"].where(known & (frame["Grade"] != "") & (frame["Grade"] != "F"), 0.0)
+        frame["In Progress"] = frame["Credits"].where(known & (frame["Grade"] == ""), 0.0)
+        frame["Predicted"] = frame["Predicted Grade"] != ""
+
+        # Aggregated over the whole batch, then split per student.
+        courses = _grouped(frame[["student", *COURSE_COLUMNS]].itertuples(index=False, name=None))
+        terms = _grouped(
+            (student, semester, gpa, credits, weighted) for (student, semester), gpa, credits, weighted
+            in semester_gpas(frame)[["gpa", "credits", "weighted"]].itertuples(name=None)
+        )
+        types = frame[known].groupby(["student", "Type"], sort=True)[["Earned", "In Progress"]].sum()
+        by_type = _grouped(
+            (student, course_type, earned, in_progress)
+            for (student, course_type), earned, in_progress in types.itertuples(name=None)
+        )
+        totals = frame.groupby("student")[["Earned", "In Progress", "Predicted"]].sum().to_dict("index")
+
+    summaries = []
+    for i, (student, _) in enumerate(batch):
+        student_terms = [t for t in terms.get(i, ()) if t[2] > 0]
+        credits = sum(t[2] for t in student_terms)
+        total = totals.get(i, {"Earned": 0.0, "In Progress": 0.0, "Predicted": 0})
+        student_courses = courses.get(i, [])
+        summary = {
+            "Student ID": student["Student ID"],
+            "Name": student["Name"],
+            "Branch": student["Branch"],
+            "Semesters": len(student_terms),
+            "CGPA": round(sum(t[3] for t in student_terms) / credits, 2) if credits else np.nan,
+            "Credits Earned": float(total["Earned"]),
+            "Credits In Progress": float(total["In Progress"]),
+            "Predicted Courses": int(total["Predicted"]),
+            "Unknown Courses": " ".join(str(c[1]) for c in student_courses if not isinstance(c[3], str)),
+        }
+
+        path = os.path.join(output_dir, _file_name(student["Student ID"]))
+        with open(path + ".csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(COURSE_COLUMNS)
+            writer.writerows([_csv_value(v) for v in row] for row in student_courses)
+        with open(path + ".html", "w", encoding="utf-8") as f:
+            f.write(to_html(student, summary, [t[:3] for t in terms.get(i, ())], by_type.get(i, []),
+                            student_courses))
+        summaries.append(summary)
+    return summaries
+
+
+def run(students, output_dir, workers, batch_size=BATCH_STUDENTS):
+    """Yields summary rows in roster order as their batches complete."""
+    batches = iter_batches(students, batch_size)
+    if workers <= 0:
+        for batch in batches:
+            yield from report_batch(batch, output_dir)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(pool.submit(report_batch, batch, output_dir))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roster", required=True, help="Roster file, .csv or .parquet.")
+    parser.add_argument("--transcripts", required=True, help="Transcript file, .csv or .parquet.")
+    parser.add_argument("--output", default=os.path.join("reports", "department"),
+                        help="Directory for the reports (default: reports/department).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (0 runs the batches in this process).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_STUDENTS, help="Students per batch.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows read per chunk of each file.")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+    students = iter_students(args.roster, args.transcripts, args.chunk_rows)
+    n_students = n_predicted = 0
+    with open(os.path.join(args.output, "summary.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        for summary in run(students, args.output, args.workers, args.batch_size):
+            writer.writerow(summary)
+            n_students += 1
+            n_predicted += summary["Predicted Courses"]
+    print(f"{n_students:,} students, {n_predicted:,} predicted courses in {time.perf_counter() - start:.2f} s; "
+          f"wrote reports to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Batch evaluation of the grade prediction models over a grade history.
+
+    python -m evaluation --data data/grades.csv --output reports/v0
+    python -m evaluation --data history.parquet --version 3 --output reports/v3
+
+Runs one model version (default: the live one, see ``model_registry``) over
+every row of a history file and writes ``<output>.json`` and
+``<output>.html``. The history needs the columns ``script.py`` trains on.
+Each stage runs once over the whole file as one array:
+
+- class mean: on the marks, as served;
+- class SD: on the true class mean (the stage alone) and on the predicted
+  one (the chain as served);
+- grade: on the true class statistics and on the predicted ones, before
+  and after ``apply_hard_rules``.
+
+The report holds:
+
+- regression errors;
+- per-grade confusion matrices;
+- calibration of the classifier's top probability;
+- errors by class strength bucket;
+- how often the hard rules override the classifier.
+
+Floats are rounded and keys sorted, so the JSON of two model versions or
+two history files can be diffed directly.
+"""
+import argparse
+import html
+import json
+import os
+import time
+
+import numpy as np
+
+import model_registry
+import script
+from html_tables import cell, table
+from modes.grade_prediction_mode import GRADE_MAP, apply_hard_rules_batch
+
+GRADES = [GRADE_MAP[i] for i in range(len(GRADE_MAP))]
+# Class strength bucket edges; the last bucket is open-ended.
+STRENGTH_EDGES = (10, 30, 50, 70, 90, 120)
+CALIBRATION_BINS = 10
+DECIMALS = 4
+
+
+def _round(value):
+    if isinstance(value, dict):
+        return {k: _round(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round(v) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else round(float(value), DECIMALS)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def regression_errors(actual, predicted):
+    error = predicted - actual
+    total = np.sum((actual - actual.mean()) ** 2)
+    return {
+        "rmse": float(np.sqrt(np.mean(error ** 2))),
+        "mae": float(np.mean(np.abs(error))),
+        "bias": float(np.mean(error)),
+        "r2": float(1 - np.sum(error ** 2) / total) if total else float("nan"),
+    }
+
+
+def confusion_matrix(actual, predicted):
+    """Rows are actual grades, columns predicted ones (both in GRADES order)."""
+    k = len(GRADES)
+    return np.bincount(actual * k + predicted, minlength=k * k).reshape(k, k)
+
+
+def grade_metrics(actual, predicted):
+    matrix = confusion_matrix(actual, predicted)
+    n = matrix.sum()
+    per_grade = {}
+    for i, grade in enumerate(GRADES):
+        tp = int(matrix[i, i])
+        fp = int(matrix[:, i].sum()) - tp
+        fn = int(matrix[i].sum()) - tp
+        per_grade[grade] = {
+            "confusion": {"tp": tp, "fp": fp, "fn": fn, "tn": int(n) - tp - fp - fn},
+            "support": tp + fn,
+            "precision": tp / (tp + fp) if tp + fp else float("nan"),
+            "recall": tp / (tp + fn) if tp + fn else float("nan"),
+        }
+    return {
+        "accuracy": float(np.mean(actual == predicted)),
+        "within_one_grade": float(np.mean(np.abs(actual - predicted) <= 1)),
+        "confusion_matrix": matrix.tolist(),
+        "per_grade": per_grade,
+    }
+
+
+def calibration(actual, proba):
+    """Reliability of the top class probability in equal-width bins."""
+    confidence = proba.max(axis=1)
+    correct = proba.argmax(axis=1) == actual
+    bins = np.minimum((confidence * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    count = np.bincount(bins, minlength=CALIBRATION_BINS)
+    conf_sum = np.bincount(bins, weights=confidence, minlength=CALIBRATION_BINS)
+    correct_sum = np.bincount(bins, weights=correct, minlength=CALIBRATION_BINS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_conf, accuracy = conf_sum / count, correct_sum / count
+    rows = [
+        {"range": [i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS], "rows": int(count[i]),
+         "mean_confidence": float(mean_conf[i]), "accuracy": float(accuracy[i])}
+        for i in range(CALIBRATION_BINS)
+    ]
+    gap = np.abs(np.nan_to_num(mean_conf - accuracy))
+    # Multiclass Brier score: squared distance to the one-hot actual grade.
+    one_hot = np.eye(proba.shape[1])[actual]
+    return {
+        "bins": rows,
+        "expected_calibration_error": float(np.sum(gap * count) / len(actual)),
+        "brier": float(np.mean(np.sum((proba - one_hot) ** 2, axis=1))),
+    }
+
+
+def strength_buckets(strength):
+    """Bucket index and label of every row's class strength."""
+    edges = np.asarray(STRENGTH_EDGES)
+    index = np.clip(np.searchsorted(edges, strength, side="right") - 1, 0, len(edges) - 1)
+    labels = [f"{lo}-{hi - 1}" for lo, hi in zip(STRENGTH_EDGES, STRENGTH_EDGES[1:])]
+    return index, labels + [f"{STRENGTH_EDGES[-1]}+"]
+
+
+def by_strength(strength, columns):
+    """
+    One entry per class strength bucket: row count plus, for every name ->
+    (actual, predicted) in ``columns``, RMSE for floats or accuracy for
+    grade ids.
+    """
+    index, labels = strength_buckets(strength)
+    k = len(labels)
+    count = np.bincount(index, minlength=k)
+    result = [{"class_strength": label, "rows": int(count[i])} for i, label in enumerate(labels)]
+    for name, (actual, predicted) in columns.items():
+        if np.issubdtype(actual.dtype, np.integer):
+            stat = np.bincount(index, weights=actual == predicted, minlength=k) / np.maximum(count, 1)
+            key = f"{name}_accuracy"
+        else:
+            stat = np.sqrt(np.bincount(index, weights=(predicted - actual) ** 2, minlength=k) / np.maximum(count, 1))
+            key = f"{name}_rmse"
+        for i in range(k):
+            result[i][key] = float(stat[i]) if count[i] else float("nan")
+    return result
+
+
+def hard_rule_overrides(overall, fat, model_grade, final_grade, actual):
+    overridden = model_grade != final_grade
+    forced_fail = (overall < 50) | (fat < 40)
+    return {
+        "override_rate": float(np.mean(overridden)),
+        "overridden_rows": int(overridden.sum()),
+        "by_rule": {
+            "overall_below_50": int(np.sum(overridden & (overall < 50))),
+            "fat_below_40": int(np.sum(overridden & (fat < 40) & (overall >= 50))),
+            "s_capped_below_80": int(np.sum(overridden & ~forced_fail)),
+        },
+        # On the overridden rows: was the model or the rule right?
+        "model_accuracy_when_overridden": float(np.mean(model_grade[overridden] == actual[overridden]))
+        if overridden.any() else float("nan"),
+        "rule_accuracy_when_overridden": float(np.mean(final_grade[overridden] == actual[overridden]))
+        if overridden.any() else float("nan"),
+    }
+
+
+def evaluate(history, estimators):
+    """Evaluates ``estimators`` (model name -> estimator) on a ``script.load_data`` frame."""
+    history = history.dropna(subset=script.SOURCE_COLUMNS + ["Final Grade Encoded"])
+
+    def features(name, **replace):
+        return np.column_stack([replace.get(c, history[c].to_numpy(np.float32)) for c in script.MODELS[name][0]])
+
+    overall = history["Overall Score"].to_numpy(np.float64)
+    fat = history["Final Assessment Test"].to_numpy(np.float64)
+    strength = history["Class Strength"].to_numpy(np.float64)
+    true_mean = history["Class Mean"].to_numpy(np.float64)
+    true_sd = history["Class SD"].to_numpy(np.float64)
+    actual = history["Final Grade Encoded"].to_numpy(np.int64)
+
+    reg_avg, reg_sd, clf = (estimators[name] for name in model_registry.MODEL_NAMES)
+    mean = reg_avg.predict(features("class_avg_xgb"))
+    sd_stage = reg_sd.predict(features("class_sd_xgb"))
+    sd_chain = reg_sd.predict(features("class_sd_xgb", **{"Class Mean": mean}))
+    proba_stage = clf.predict_proba(features("grade_xgb_classifier"))
+    proba_chain = clf.predict_proba(features("grade_xgb_classifier", **{"Class Mean": mean, "Class SD": sd_chain}))
+
+    model_grade = proba_chain.argmax(axis=1)
+    final_grade = apply_hard_rules_batch(overall, fat, model_grade).astype(np.int64)
+    stage_grade = apply_hard_rules_batch(overall, fat, proba_stage.argmax(axis=1)).astype(np.int64)
+
+    return {
+        "rows": len(history),
+        "grades": GRADES,
+        "class_mean": regression_errors(true_mean, mean),
+        "class_sd": {
+            "stage": regression_errors(true_sd, sd_stage),
+            "chain": regression_errors(true_sd, sd_chain),
+        },
+        "grade": {
+            "stage": grade_metrics(actual, stage_grade),
+            "chain_before_rules": grade_metrics(actual, model_grade),
+            "chain": grade_metrics(actual, final_grade),
+        },
+        "calibration": calibration(actual, proba_chain),
+        "by_class_strength": by_strength(strength, {
+            "class_mean": (true_mean, mean),
+            "class_sd": (true_sd, sd_chain),
+            "grade": (actual, final_grade),
+        }),
+        "hard_rules": hard_rule_overrides(overall, fat, model_grade, final_grade, actual),
+    }
+
+
+def to_html(report):
+    """Renders a (rounded) report as a standalone HTML page."""
+    parts = [f"<h1>Model evaluation: version {report['version']}</h1>",
+             f"<p>{html.escape(report['data'])}: {report['rows']:,} rows</p>"]
+
+    parts.append("<h2>Regression</h2>")
+    regressions = {"class mean": report["class_mean"], "class SD (stage)": report["class_sd"]["stage"],
+                   "class SD (chain)": report["class_sd"]["chain"]}
+    parts.append(table(["model", "RMSE", "MAE", "bias", "R²"],
+                       [[name, m["rmse"], m["mae"], m["bias"], m["r2"]] for name, m in regressions.items()], DECIMALS))
+
+    titles = {"stage": "true class statistics", "chain_before_rules": "chain, before hard rules",
+              "chain": "chain, as served"}
+    for key, title in titles.items():
+        metrics = report["grade"][key]
+        parts.append(f"<h2>Grade: {title}</h2><p>accuracy {cell(metrics['accuracy'], DECIMALS)}, "
+                     f"within one grade {cell(metrics['within_one_grade'], DECIMALS)}</p>")
+        parts.append(table(["actual \\ predicted"] + report["grades"],
+                           [[g] + row for g, row in zip(report["grades"], metrics["confusion_matrix"])], DECIMALS))
+        parts.append(table(["grade", "support", "precision", "recall", "TP", "FP", "FN", "TN"], [
+            [g, m["support"], m["precision"], m["recall"], *m["confusion"].values()]
+            for g, m in metrics["per_grade"].items()
+        ], DECIMALS))
+
+    cal = report["calibration"]
+    parts.append(f"<h2>Calibration (chain, before hard rules)</h2><p>ECE "
+                 f"{cell(cal['expected_calibration_error'], DECIMALS)}, Brier {cell(cal['brier'], DECIMALS)}</p>")
+    parts.append(table(["confidence", "rows", "mean confidence", "accuracy"],
+                       [[f"{b['range'][0]:.1f}–{b['range'][1]:.1f}", b["rows"], b["mean_confidence"], b["accuracy"]]
+                        for b in cal["bins"]], DECIMALS))
+
+    buckets = report["by_class_strength"]
+    parts.append("<h2>By class strength</h2>")
+    columns = ["class_strength"] + [c for c in buckets[0] if c != "class_strength"]
+    parts.append(table(columns, [[bucket[c] for c in columns] for bucket in buckets], DECIMALS))
+
+    rules = report["hard_rules"]
+    parts.append(f"<h2>Hard rule overrides</h2><p>{rules['overridden_rows']:,} rows "
+                 f"({cell(rules['override_rate'], DECIMALS)})</p>")
+    parts.append(table(["rule", "rows"], list(rules["by_rule"].items()), DECIMALS))
+    parts.append(table(["on overridden rows", "accuracy"], [
+        ["model", rules["model_accuracy_when_overridden"]], ["hard rules", rules["rule_accuracy_when_overridden"]],
+    ], DECIMALS))
+
+    style = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin:1em 0}"
+             "td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}")
+    return f"<!doctype html><html><head><meta charset='utf-8'><style>{style}</style></head>" \
+           f"<body>{''.join(parts)}</body></html>"
+
+
+def write_report(report, output):
+    """Writes ``<output>.json`` and ``<output>.html``; returns their paths."""
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    report = _round(report)
+    with open(output + ".json", "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    with open(output + ".html", "w", encoding="utf-8") as f:
+        f.write(to_html(report))
+    return output + ".json", output + ".html"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=script.DEFAULT_DATA, help="Grade history, .csv or .parquet.")
+    parser.add_argument("--version", type=int, help="Model registry version (default: the live one).")
+    parser.add_argument("--output", default=os.path.join("reports", "evaluation"),
+                        help="Report path without extension (default: reports/evaluation).")
+    args = parser.parse_args()
+
+    version = model_registry.current_version() if args.version is None else args.version
+    start = time.perf_counter()
+    history = script.load_data(args.data)
+    loaded = time.perf_counter()
+    report = evaluate(history, model_registry.load_estimators(version))
+    report.update(version=version, data=args.data)
+    paths = write_report(report, args.output)
+
+    grade = report["grade"]["chain"]
+    print(f"version {version}: {report['rows']:,} rows, load {loaded - start:.2f} s, "
+          f"evaluate {time.perf_counter() - loaded:.2f} s")
+    print(f"class mean RMSE {report['class_mean']['rmse']:.3f}, class SD RMSE {report['class_sd']['chain']['rmse']:.3f}, "
+          f"grade accuracy {grade['accuracy']:.3f}, hard rule overrides {report['hard_rules']['override_rate']:.3f}")
+    print("wrote " + ", ".join(paths))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Append-only log of reported grade outcomes.
+
+After a prediction a student can report the grade they actually received
+(and, when the faculty published them, the real class average and SD).
+Each report is one JSON line holding the prediction inputs, what the app
+predicted and the actual outcome. Lines are written with a single
+``O_APPEND`` write, so concurrent sessions and server processes never
+interleave records. ``retraining`` reads the log to continue boosting the
+models.
+
+The log lives at ``GRADE_APP_FEEDBACK_LOG`` (default ``feedback.jsonl``
+beside this file).
+"""
+import json
+import math
+import numbers
+import os
+import time
+import uuid
+
+import pandas as pd
+
+from utils import GRADE_IDS
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+FEEDBACK_LOG = os.environ.get("GRADE_APP_FEEDBACK_LOG", os.path.join(ROOT_DIR, "feedback.jsonl"))
+
+# Share of reports held out to validate retrained models, chosen by report id.
+HOLDOUT_PERCENT = 20
+
+# Prediction request fields -> grade history columns (see script.py).
+INPUT_COLUMNS = {
+    "da1": "Digital Assignment I", "da2": "Digital Assignment II", "da3": "Digital Assignment III",
+    "cat1": "Continuous Assessment I", "cat2": "Continuous Assessment II", "fat": "Final Assessment Test",
+    "class_strength": "Class Strength",
+}
+
+
+def _clean(value):
+    # NaN marks "not given" in prediction requests; JSON has null for that.
+    if not isinstance(value, numbers.Real):
+        return value
+    return None if math.isnan(value) else float(value)
+
+
+def record_outcome(course_code, request, prediction, actual_grade,
+                   actual_class_mean=None, actual_class_sd=None, model_version=None, path=None):
+    """
+    Appends one outcome report. ``request`` is the prediction request dict
+    and ``prediction`` holds overall, class_mean, class_sd, grade and model_used.
+    """
+    if actual_grade not in GRADE_IDS:
+        raise ValueError(f"Unknown grade {actual_grade!r}")
+    entry = {
+        "id": uuid.uuid4().hex,
+        "time": time.time(),
+        "course": course_code,
+        "model_version": model_version,
+        "inputs": {k: _clean(v) for k, v in request.items()},
+        "prediction": {k: _clean(v) for k, v in prediction.items()},
+        "actual": {
+            "grade": actual_grade,
+            "class_mean": _clean(actual_class_mean),
+            "class_sd": _clean(actual_class_sd),
+        },
+    }
+    line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(path or FEEDBACK_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    return entry
+
+
+def read_outcomes(path=None):
+    """
+    Returns ([(offset, record), ...], end_offset) for every complete line of
+    the log, where ``offset`` is the line's byte offset. A line still being
+    written (no trailing newline yet) is left for the next read; malformed
+    lines are skipped.
+    """
+    path = path or FEEDBACK_LOG
+    if not os.path.exists(path):
+        return [], 0
+
+    records = []
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append((offset, json.loads(line)))
+            except ValueError:
+                pass
+            offset += len(line)
+    return records, offset
+
+
+def is_holdout(record):
+    return int(record["id"][:8], 16) % 100 < HOLDOUT_PERCENT
+
+
+def to_frame(records):
+    """
+    Turns outcome records into grade history rows (the columns script.py
+    trains on). Class Mean/SD are the reported values when given, otherwise
+    the ones the prediction used; unknown values are NaN.
+    """
+    rows = []
+    for record in records:
+        inputs, prediction, actual = record["inputs"], record["prediction"], record["actual"]
+        row = {column: inputs.get(field) for field, column in INPUT_COLUMNS.items()}
+        row["Overall Score"] = prediction.get("overall")
+        row["Class Mean"] = actual.get("class_mean") or prediction.get("class_mean")
+        row["Class SD"] = actual.get("class_sd") or prediction.get("class_sd")
+        row["Reported Class Mean"] = actual.get("class_mean")
+        row["Reported Class SD"] = actual.get("class_sd")
+        row["Final Grade Encoded"] = GRADE_IDS[actual["grade"]]
+        rows.append(row)
+    return pd.DataFrame(rows, dtype="float64")
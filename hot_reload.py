@@ -0,0 +1,192 @@
+"""
+Hot reload of course catalogs and the shipped models when their files change.
+
+Every ``GRADE_APP_RELOAD_INTERVAL`` seconds (default 5; 0 turns it off) a
+daemon thread stats the catalogs loaded so far and the version 0 model
+files beside ``modes/grade_prediction_mode.py``. A file is reloaded once it
+has changed and then kept the same size and mtime for a whole interval, so
+a copy still being written is not picked up halfway.
+
+The reload happens entirely on the watcher thread. A new catalog is parsed,
+checked (required columns, at least one course, no course without a code or
+name, non-negative numeric credits) and its search index built; only then
+is it published with one reference swap in ``utils``. Sessions get the new
+DataFrame on their next rerun, fragment reruns included (fragments look the
+catalog up by path), and never a half-loaded one; a rerun already running
+keeps the DataFrame it started with. New models are loaded and
+must give finite predictions and a known grade on a canary row before
+``model_registry`` swaps them in. A file that fails its checks is rejected
+and the previous version keeps serving until the file changes again.
+
+Reload times are recorded as the ``reload.catalog`` and ``reload.models``
+phases, and reloads and rejections as the ``catalog_reloaded``,
+``models_reloaded`` and ``reload_rejected`` counters.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import course_search
+import instrumentation
+import model_registry
+import shared_cache
+import storage
+import utils
+
+INTERVAL = float(os.environ.get("GRADE_APP_RELOAD_INTERVAL", "5"))
+
+REQUIRED_COLUMNS = [*storage.CATALOG_COLUMNS, "Display"]
+# One request per model stage: scores and class strength in their widget ranges.
+CANARY = {
+    "class_mean": np.array([[8, 8, 8, 40, 40, 70, 60]], dtype=np.float32),
+    "class_sd": np.array([[75, 65, 60]], dtype=np.float32),
+    "grade": np.array([[75, 65, 12, 60]], dtype=np.float32),
+}
+GRADE_IDS = range(7)
+
+logger = logging.getLogger("grade_app.reload")
+
+_thread = None
+_thread_lock = threading.Lock()
+# path -> stamp seen on the previous poll, for files not yet reloaded.
+_pending = {}
+# path -> stamp of a file that failed its checks, not retried until it changes.
+_rejected = {}
+# The model files' stamps the live version 0 set was loaded from.
+_model_stamps = None
+
+
+def model_files():
+    directory = model_registry.version_dir(0)
+    return [os.path.join(directory, f"{name}.pkl") for name in model_registry.MODEL_NAMES]
+
+
+def _stamp(path):
+    try:
+        return utils.file_stamp(path)
+    except OSError:
+        return None
+
+
+def _settled(key, stamp):
+    """True once ``stamp`` has been seen on two polls in a row for ``key``."""
+    if _pending.get(key) == stamp:
+        del _pending[key]
+        return True
+    _pending[key] = stamp
+    return False
+
+
+def validate_catalog(courses_df):
+    """Raises ValueError when ``courses_df`` is not a usable catalog."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in courses_df.columns]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    if courses_df.empty:
+        raise ValueError("no courses")
+    if courses_df[["Course Code", "Course Name"]].isna().any(axis=None):
+        raise ValueError("course without a code or name")
+    credits = pd.to_numeric(courses_df["Credits"], errors="coerce")
+    if credits.isna().any() or (credits < 0).any():
+        raise ValueError("credits missing, not numeric or negative")
+
+
+def validate_models(models):
+    """Raises ValueError unless every stage of ``models`` predicts sanely on the canary."""
+    for stage in ("class_mean", "class_sd"):
+        value = np.asarray(getattr(models, stage).predict(CANARY[stage]), dtype=np.float64)
+        if value.shape != (1,) or not np.isfinite(value).all():
+            raise ValueError(f"{stage} model predicted {value!r}")
+    grade = np.asarray(models.grade.predict(CANARY["grade"]))
+    if grade.shape != (1,) or grade[0] not in GRADE_IDS:
+        raise ValueError(f"grade model predicted {grade!r}")
+
+
+def reload_catalog(path, stamp):
+    """
+    Parses, checks and indexes the catalog at ``path``, then swaps it in.
+    Returns True when swapped in, False when the file changed while being
+    read (tried again on a later poll); raises when it fails a check.
+    """
+    start = time.perf_counter()
+    if shared_cache.is_enabled():
+        shared_cache.refresh()
+    courses_df = utils.load_course_data(path)
+    if _stamp(path) != stamp:
+        return False
+    validate_catalog(courses_df)
+    course_search.get_course_index(courses_df)
+    utils.install_catalog(path, courses_df, stamp)
+    instrumentation.observe("reload.catalog", time.perf_counter() - start)
+    instrumentation.count("catalog_reloaded")
+    return True
+
+
+def reload_models():
+    """Loads the shipped models again and swaps them in once they pass the canary."""
+    start = time.perf_counter()
+    if shared_cache.is_enabled():
+        shared_cache.refresh()
+    model_registry.activate(0, validate=validate_models)
+    instrumentation.observe("reload.models", time.perf_counter() - start)
+    instrumentation.count("models_reloaded")
+
+
+def _reject(what, error):
+    instrumentation.count("reload_rejected")
+    logger.warning("kept the previous %s: %s", what, error)
+
+
+def poll():
+    """Checks the watched files once, reloading those that changed and settled."""
+    global _model_stamps
+    for path, loaded in list(utils._catalog_stamps.items()):
+        stamp = _stamp(path)
+        if stamp is None or stamp == loaded or stamp == _rejected.get(path):
+            _pending.pop(path, None)
+        elif _settled(path, stamp):
+            try:
+                reload_catalog(path, stamp)
+            except Exception as e:
+                _rejected[path] = stamp
+                _reject(path, e)
+
+    stamps = tuple(_stamp(path) for path in model_files())
+    if _model_stamps is None:
+        _model_stamps = stamps
+    elif stamps == _model_stamps or None in stamps:
+        _pending.pop("models", None)
+    elif _settled("models", stamps):
+        _model_stamps = stamps
+        # While a published version is live, the new files load when it is rolled back to 0.
+        if model_registry.current().version == 0:
+            try:
+                reload_models()
+            except Exception as e:
+                _reject("models", e)
+
+
+def _loop():
+    while True:
+        time.sleep(INTERVAL)
+        try:
+            poll()
+        except Exception:
+            logger.exception("hot reload check failed")
+
+
+def start():
+    """Starts the watcher once per process when enabled."""
+    global _thread, _model_stamps
+    if INTERVAL <= 0 or _thread is not None:
+        return
+    with _thread_lock:
+        if _thread is None:
+            _model_stamps = tuple(_stamp(path) for path in model_files())
+            utils.CATALOGS_WATCHED = True
+            _thread = threading.Thread(target=_loop, name="grade-app-reload", daemon=True)
+            _thread.start()
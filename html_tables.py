@@ -0,0 +1,29 @@
+"""
+HTML tables for the generated reports (``evaluation``, ``department_report``).
+
+Every header and cell is escaped. Floats are printed with a fixed number of
+decimals; a missing value (None or NaN) is shown as a dash.
+"""
+import html
+import math
+import numbers
+
+MISSING = "–"
+
+
+def cell(value, decimals=2):
+    """The escaped text of one table cell."""
+    if value is None:
+        return MISSING
+    if isinstance(value, numbers.Real) and not isinstance(value, numbers.Integral):
+        return MISSING if math.isnan(value) else f"{value:.{decimals}f}"
+    return html.escape(str(value))
+
+
+def table(header, rows, decimals=2):
+    """A ``<table>`` with a header row and one row per sequence in ``rows``."""
+    head = "".join(f"<th>{html.escape(str(h))}</th>" for h in header)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{cell(v, decimals)}</td>" for v in row) + "</tr>" for row in rows
+    )
+    return f"<table><tr>{head}</tr>{body}</table>"
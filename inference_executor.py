@@ -0,0 +1,234 @@
+"""
+Bounded executor that runs model inference off the Streamlit script thread.
+
+Requests are single rows (or small blocks) of model input. A dispatcher
+thread collects requests for up to ``max_wait`` seconds after the first one
+of a batch arrived (or until ``max_batch`` rows are waiting), stacks them
+into one array and runs the batch function once on a thread or process
+pool, then hands each caller its slice of the result. Under load many
+sessions' predictions therefore share one vectorized model call.
+
+The queue is bounded: when it is full ``submit`` raises ``QueueFull`` and
+the caller is expected to fall back to running the prediction inline.
+
+Configured with ``GRADE_APP_INFERENCE_EXECUTOR`` (``off``, ``thread`` or
+``process``), ``GRADE_APP_INFERENCE_WORKERS``, ``GRADE_APP_INFERENCE_QUEUE``,
+``GRADE_APP_INFERENCE_BATCH`` and ``GRADE_APP_INFERENCE_MAX_WAIT_MS``. Queue
+depth, queue wait, batch run time and request/batch counts are recorded
+through ``instrumentation``.
+"""
+import atexit
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import instrumentation
+
+BACKEND = os.environ.get("GRADE_APP_INFERENCE_EXECUTOR", "off")
+WORKERS = int(os.environ.get("GRADE_APP_INFERENCE_WORKERS", "2"))
+MAX_QUEUE = int(os.environ.get("GRADE_APP_INFERENCE_QUEUE", "256"))
+MAX_BATCH = int(os.environ.get("GRADE_APP_INFERENCE_BATCH", "64"))
+# Collection window per batch; 0 batches only what is already queued.
+MAX_WAIT = float(os.environ.get("GRADE_APP_INFERENCE_MAX_WAIT_MS", "5")) / 1000
+
+BACKENDS = ("thread", "process")
+# Seconds an idle dispatcher waits before checking whether it was shut down.
+STOP_POLL = 0.1
+
+
+class QueueFull(RuntimeError):
+    """Raised by ``submit`` when the executor's request queue is full."""
+
+
+class _Request:
+    __slots__ = ("rows", "future", "enqueued")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class InferenceExecutor:
+    """
+    Micro-batching executor around ``fn``, a picklable function mapping an
+    (n, features) array to an (n, outputs) array row for row.
+    """
+
+    def __init__(self, fn, backend="thread", workers=WORKERS, max_queue=MAX_QUEUE,
+                 max_batch=MAX_BATCH, max_wait=MAX_WAIT, initializer=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+        self.fn = fn
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        if backend == "process":
+            # Spawned workers import the model module afresh instead of
+            # inheriting the server's threads through fork.
+            self.pool = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"),
+                                            initializer=initializer)
+        else:
+            self.pool = ThreadPoolExecutor(workers, thread_name_prefix="grade-app-inference",
+                                           initializer=initializer)
+
+        # At most one batch per worker in flight; later requests keep
+        # queueing and are coalesced into the next batch.
+        self._slots = threading.Semaphore(workers)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._closed = False
+        self._stopping = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="grade-app-inference-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, rows):
+        """Queues ``rows`` and returns a Future resolving to their outputs."""
+        if self._closed:
+            raise RuntimeError("InferenceExecutor is shut down")
+        request = _Request(np.atleast_2d(np.asarray(rows, dtype=np.float64)))
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            instrumentation.count("inference_rejected")
+            raise QueueFull(f"inference queue is full ({self.queue.maxsize} requests)")
+        instrumentation.set_gauge("inference_queue_depth", self.queue.qsize())
+        return request.future
+
+    def predict(self, rows, timeout=None):
+        """Submits ``rows`` and waits for the result."""
+        return self.submit(rows).result(timeout)
+
+    def _next_batch(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=STOP_POLL)
+                break
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return None
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.rows)
+        # The window counts from the first request's arrival, so a request
+        # that already queued behind busy workers is not held any longer.
+        # With nothing in flight there is no load to coalesce, so a lone
+        # request is dispatched straight away.
+        deadline = first.enqueued + (self.max_wait if self._in_flight else 0.0)
+        while size < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    request = self.queue.get(timeout=remaining)
+                else:
+                    request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Shutdown sentinel: finish this batch; the next call sees
+                # the empty queue and the stop flag.
+                break
+            batch.append(request)
+            size += len(request.rows)
+        return batch
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            batch = self._next_batch()
+            if batch is None:
+                self._slots.release()
+                return
+
+            started = time.perf_counter()
+            for request in batch:
+                instrumentation.observe("inference.queue_wait", started - request.enqueued)
+            instrumentation.set_gauge("inference_queue_depth", self.queue.qsize())
+            instrumentation.count("inference_requests", len(batch))
+            instrumentation.count("inference_batches")
+
+            rows = batch[0].rows if len(batch) == 1 else np.concatenate([r.rows for r in batch])
+            self._track_in_flight(1)
+            try:
+                future = self.pool.submit(self.fn, rows)
+            except Exception as e:
+                self._track_in_flight(-1)
+                self._slots.release()
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            future.add_done_callback(lambda f, batch=batch, started=started: self._complete(f, batch, started))
+
+    def _track_in_flight(self, delta):
+        with self._in_flight_lock:
+            self._in_flight += delta
+
+    def _complete(self, future, batch, started):
+        self._track_in_flight(-1)
+        self._slots.release()
+        instrumentation.observe("inference.batch_run", time.perf_counter() - started)
+        try:
+            outputs = future.result()
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            n = len(request.rows)
+            request.future.set_result(outputs[offset:offset + n])
+            offset += n
+
+    def shutdown(self):
+        """
+        Stops accepting requests and lets the dispatcher finish what is
+        queued. Never blocks on a full queue; requests the dispatcher did
+        not get to within five seconds fail with RuntimeError.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        try:
+            # Wakes an idle dispatcher at once; otherwise it sees the flag.
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._dispatcher.join(timeout=5)
+        while True:
+            try:
+                request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("InferenceExecutor is shut down"))
+        self.pool.shutdown(wait=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(fn, initializer=None):
+    """
+    Returns the process-wide executor for ``fn`` as configured by the
+    environment, or None when ``GRADE_APP_INFERENCE_EXECUTOR`` is off.
+    """
+    global _executor
+    if BACKEND not in BACKENDS:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor(fn, backend=BACKEND, initializer=initializer)
+                atexit.register(_executor.shutdown)
+    return _executor
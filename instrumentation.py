@@ -0,0 +1,293 @@
+"""
+Opt-in timing instrumentation for script runs.
+
+Enable it for every session with ``GRADE_APP_PROFILE=1``, or for a single
+session by opening the app with ``?profile=1``. Phase timings are aggregated
+into per-process histograms which can be exposed as Prometheus text on
+``GRADE_APP_METRICS_PORT`` and/or logged every
+``GRADE_APP_PROFILE_LOG_INTERVAL`` seconds. Only the environment starts
+these exporters; ``?profile=1`` just times the visitor's own runs. Components can also record
+counters and gauges, which are exported alongside the histograms.
+
+When profiling is off, ``phase()`` hands back a shared no-op context manager
+and ``timed`` wrappers cost one attribute lookup per call.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, Prometheus style (an implicit +Inf bucket follows).
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ENABLED = os.environ.get("GRADE_APP_PROFILE", "0") == "1"
+METRICS_PORT = os.environ.get("GRADE_APP_METRICS_PORT")
+LOG_INTERVAL = os.environ.get("GRADE_APP_PROFILE_LOG_INTERVAL")
+
+logger = logging.getLogger("grade_app.profile")
+
+_NOOP = nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_exporters_started = False
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th quantile (inf if it falls in the overflow bucket)."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enable(value=True):
+    """Turns profiling on or off for every session in this process."""
+    global ENABLED
+    ENABLED = value
+
+
+def start_run(query_params=None):
+    """
+    Called at the top of each script run. Decides whether this run is
+    profiled and, when the environment enables profiling or a metrics port,
+    starts the exporters on the first run.
+    """
+    enabled = ENABLED
+    if not enabled and query_params is not None:
+        enabled = query_params.get("profile") in ("1", "true")
+    _local.enabled = enabled
+    _local.run_start = time.perf_counter() if enabled else None
+
+    if ENABLED or METRICS_PORT:
+        _start_exporters()
+
+
+def finish_run():
+    """Records the total script run time for a profiled run."""
+    start = getattr(_local, "run_start", None)
+    if start is not None:
+        observe("script_run", time.perf_counter() - start)
+        _local.run_start = None
+
+
+def is_enabled():
+    return getattr(_local, "enabled", ENABLED)
+
+
+def phase(name):
+    """Context manager timing a named phase of the current run."""
+    if not is_enabled():
+        return _NOOP
+    return _Timer(name)
+
+
+def timed(name):
+    """Decorator timing every call of the wrapped function as phase ``name``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedModel:
+    """Proxy that times ``predict``/``predict_proba`` on a model as phase ``name``."""
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+
+    def predict(self, X):
+        if not is_enabled():
+            return self.model.predict(X)
+        with _Timer(self.name):
+            return self.model.predict(X)
+
+    def predict_proba(self, X):
+        if not is_enabled():
+            return self.model.predict_proba(X)
+        with _Timer(self.name):
+            return self.model.predict_proba(X)
+
+    def __getattr__(self, attr):
+        return getattr(self.model, attr)
+
+
+def observe(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def count(name, n=1):
+    """Adds ``n`` to the counter ``name``."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def set_gauge(name, value):
+    """Sets the gauge ``name`` to its current ``value``."""
+    with _lock:
+        _gauges[name] = value
+
+
+def counters():
+    with _lock:
+        return dict(_counters), dict(_gauges)
+
+
+def snapshot():
+    """Returns {phase: {"count", "sum", "buckets"}} for every recorded phase."""
+    with _lock:
+        return {
+            name: {"count": h.count, "sum": h.total, "buckets": list(h.counts)}
+            for name, h in _histograms.items()
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def render_prometheus():
+    """Renders all histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP grade_app_phase_seconds Time spent in each phase of a script run.",
+        "# TYPE grade_app_phase_seconds histogram",
+    ]
+    for name, data in sorted(snapshot().items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), data["buckets"]):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'grade_app_phase_seconds_bucket{{phase="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'grade_app_phase_seconds_sum{{phase="{name}"}} {data["sum"]}')
+        lines.append(f'grade_app_phase_seconds_count{{phase="{name}"}} {data["count"]}')
+
+    counter_values, gauge_values = counters()
+    for name, value in sorted(counter_values.items()):
+        lines.append(f"# TYPE grade_app_{name}_total counter")
+        lines.append(f"grade_app_{name}_total {value}")
+    for name, value in sorted(gauge_values.items()):
+        lines.append(f"# TYPE grade_app_{name} gauge")
+        lines.append(f"grade_app_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary_line():
+    """One-line human-readable summary, used by the periodic log reporter."""
+    with _lock:
+        parts = [
+            f"{name} n={h.count} mean={h.total / h.count * 1000:.1f}ms p95<={h.quantile(0.95) * 1000:g}ms"
+            for name, h in sorted(_histograms.items()) if h.count
+        ]
+    return "; ".join(parts)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port):
+    server = ThreadingHTTPServer(("", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="grade-app-metrics", daemon=True).start()
+    return server
+
+
+def start_log_reporter(interval):
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+
+    def report():
+        while True:
+            time.sleep(interval)
+            line = summary_line()
+            if line:
+                logger.info("phase timings: %s", line)
+
+    threading.Thread(target=report, name="grade-app-profile-log", daemon=True).start()
+
+
+def _start_exporters():
+    global _exporters_started
+    if _exporters_started:
+        return
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if METRICS_PORT:
+        try:
+            start_metrics_server(int(METRICS_PORT))
+        except OSError as e:
+            # Another worker on this host may already own the port.
+            logger.warning("metrics server not started on port %s: %s", METRICS_PORT, e)
+    if LOG_INTERVAL:
+        start_log_reporter(float(LOG_INTERVAL))
@@ -0,0 +1,193 @@
+"""
+Versioned registry of the grade prediction models with atomic hot swaps.
+
+The serving models form one immutable ``ModelSet``. A prediction batch
+reads the current set once and uses it for every stage, so installing a new
+set (a single reference assignment) never mixes two versions within one
+prediction and never waits for predictions already running.
+
+Version 0 is the set shipped beside ``modes/grade_prediction_mode.py``.
+Retrained versions are published under ``GRADE_APP_MODEL_REGISTRY``
+(default ``model_registry/`` beside this file) as ``v<N>/`` directories of
+``.pkl`` files plus ``meta.json``, and the ``CURRENT`` file naming the live
+version is replaced atomically. Every process checks ``CURRENT`` at most
+every ``REFRESH_INTERVAL`` seconds and loads a newly published version
+(writing an older number into ``CURRENT`` rolls back the same way). That
+load runs on a background thread, so predictions keep the live set while
+it happens; a version that fails to load is logged, counted as
+``model_refresh_failed`` and not tried again, and the live set stays.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+
+import joblib
+
+import instrumentation
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.join(ROOT_DIR, "modes")
+REGISTRY_DIR = os.environ.get("GRADE_APP_MODEL_REGISTRY", os.path.join(ROOT_DIR, "model_registry"))
+MODEL_NAMES = ("class_avg_xgb", "class_sd_xgb", "grade_xgb_classifier")
+
+# Seconds between checks for a version published by another process.
+REFRESH_INTERVAL = 5.0
+# Published versions kept on disk besides the live one.
+KEEP_VERSIONS = 5
+
+
+class ModelSet(NamedTuple):
+    class_mean: object
+    class_sd: object
+    grade: object
+    version: int
+
+
+logger = logging.getLogger("grade_app.models")
+
+_loader = None
+_current = None
+_checked_at = 0.0
+_swap_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+# Thread loading a version published by another process, if one is running.
+_refresh_thread = None
+# A published version that failed to load; kept out of later checks.
+_failed_version = None
+
+
+def version_dir(version):
+    return BASE_DIR if version == 0 else os.path.join(REGISTRY_DIR, f"v{version}")
+
+
+def current_version():
+    """The published live version (0 when nothing has been published)."""
+    try:
+        with open(os.path.join(REGISTRY_DIR, "CURRENT")) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def read_meta(version):
+    if version == 0:
+        return {"version": 0}
+    with open(os.path.join(version_dir(version), "meta.json")) as f:
+        return json.load(f)
+
+
+def load_estimators(version):
+    """The raw (unwrapped) estimators of ``version``, keyed by model name."""
+    directory = version_dir(version)
+    return {name: joblib.load(os.path.join(directory, f"{name}.pkl")) for name in MODEL_NAMES}
+
+
+def configure(loader):
+    """
+    Sets ``loader(model_dir) -> (class_mean, class_sd, grade)``, which turns
+    a version directory into serving models, and loads the live version.
+    """
+    global _loader
+    _loader = loader
+    activate(current_version())
+
+
+def activate(version, validate=None):
+    """
+    Loads ``version`` and swaps it in; predictions in flight keep their set.
+    ``validate(models)`` may raise to keep the live set instead.
+    """
+    global _current, _checked_at
+    models = ModelSet(*_loader(version_dir(version)), version=version)
+    if validate is not None:
+        validate(models)
+    with _swap_lock:
+        _current = models
+        _checked_at = time.monotonic()
+    return models
+
+
+def current():
+    """The live ModelSet, picking up versions published by other processes."""
+    if time.monotonic() - _checked_at > REFRESH_INTERVAL:
+        _refresh()
+    return _current
+
+
+def _refresh():
+    """Starts loading a newly published version in the background; never raises."""
+    global _checked_at, _refresh_thread
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        _checked_at = time.monotonic()
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        version = current_version()
+        if version in (_current.version, _failed_version) or not os.path.isdir(version_dir(version)):
+            return
+        _refresh_thread = threading.Thread(target=_load_published, args=(version,),
+                                           name="grade-app-model-refresh", daemon=True)
+        _refresh_thread.start()
+    except Exception:
+        logger.exception("checking for a published model version failed")
+    finally:
+        _refresh_lock.release()
+
+
+def _load_published(version):
+    global _failed_version
+    try:
+        activate(version)
+    except Exception:
+        # A missing or corrupt .pkl, or a version pruned while loading.
+        _failed_version = version
+        instrumentation.count("model_refresh_failed")
+        logger.exception("kept model version %s; loading version %s failed", _current.version, version)
+
+
+def publish(estimators, meta):
+    """
+    Writes a new version with ``estimators`` (name -> estimator) and makes
+    it the live one on disk. Returns the new version number.
+    """
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    version = max([current_version(), *_published_versions()]) + 1
+
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=REGISTRY_DIR)
+    try:
+        for name in MODEL_NAMES:
+            joblib.dump(estimators[name], os.path.join(staging, f"{name}.pkl"))
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({**meta, "version": version, "published": time.time()}, f, indent=2)
+        os.rename(staging, version_dir(version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(REGISTRY_DIR, "CURRENT")
+    with open(pointer + ".tmp", "w") as f:
+        f.write(str(version))
+    os.replace(pointer + ".tmp", pointer)
+    _prune(version)
+    return version
+
+
+def _published_versions():
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    return sorted(
+        int(name[1:]) for name in os.listdir(REGISTRY_DIR)
+        if name.startswith("v") and name[1:].isdigit()
+    )
+
+
+def _prune(live):
+    old = [v for v in _published_versions() if v != live]
+    for version in old[:-KEEP_VERSIONS]:
+        shutil.rmtree(version_dir(version), ignore_errors=True)
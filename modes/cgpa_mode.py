@@ -1,11 +1,14 @@
 import streamlit as st
 import pandas as pd
 from typing import List, Dict
+from utils import calculate_cgpa, catalog_path, get_course_data
+from cgpa_planner import plan_target_cgpa, remaining_courses
+import instrumentation
 
 MAX_SEM_CREDITS = 30.5
 TOTAL_SEMESTERS = 8
 
-def run(MAX_TOTAL_CREDITS):
+def run(MAX_TOTAL_CREDITS, courses_df):
     st.subheader("CGPA Calculator")
     
     if "semesters" not in st.session_state:
@@ -18,6 +21,18 @@ def run(MAX_TOTAL_CREDITS):
     if 'goal_cgpa' not in st.session_state:
         st.session_state.goal_cgpa = None
 
+    # Fragments get the catalog's path and look it up on each rerun, so a
+    # hot-reloaded catalog reaches them without a full rerun.
+    semester_table(MAX_TOTAL_CREDITS, catalog_path(courses_df))
+
+@st.fragment
+@instrumentation.timed("fragment.cgpa_semesters")
+def semester_table(MAX_TOTAL_CREDITS, course_file):
+    """
+    Semester rows and the current CGPA. Runs as a fragment so editing a row
+    does not rerun the whole app; the target calculator is nested inside it
+    and also reruns on its own.
+    """
     def add_semester_row():
         if len(st.session_state.semesters) < TOTAL_SEMESTERS:
             new_id = st.session_state.next_sem_id
@@ -115,17 +130,13 @@ def run(MAX_TOTAL_CREDITS):
     if not gpas_valid:
         st.stop()
     
-    valid_semesters = [s for s in st.session_state.semesters if s["gpa"] is not None and s["credits"] is not None]
-    
-    total_weighted_sum = sum(s["gpa"] * s["credits"] for s in valid_semesters)
-    current_total_credits = sum(s["credits"] for s in valid_semesters)
+    cgpa, current_total_credits, total_weighted_sum = calculate_cgpa(st.session_state.semesters)
     
     if current_total_credits > MAX_TOTAL_CREDITS:
         st.toast(f"Total credits ({current_total_credits:.1f}) exceed the program limit of {MAX_TOTAL_CREDITS}. Please correct the credits.")
         st.stop()
         
     if current_total_credits > 0:
-        cgpa = total_weighted_sum / current_total_credits
         st.success(f"### 🎯 Your Current CGPA: {cgpa:.2f}")
 
         if cgpa >= 9.0:
@@ -140,7 +151,17 @@ def run(MAX_TOTAL_CREDITS):
         st.info("Enter your semester GPAs and credits to calculate your CGPA.")
     
     st.markdown("---")
-    
+
+    target_calculator(MAX_TOTAL_CREDITS, current_total_credits, total_weighted_sum)
+
+    st.markdown("---")
+
+    course_planner(MAX_TOTAL_CREDITS, course_file, current_total_credits, total_weighted_sum)
+
+@st.fragment
+@instrumentation.timed("fragment.cgpa_target")
+def target_calculator(MAX_TOTAL_CREDITS, current_total_credits, total_weighted_sum):
+    """The "Achieve a Target CGPA" block, rerun independently of the semester rows."""
     st.subheader("Achieve a Target CGPA")
     
     if st.button("Set a Target CGPA"):
@@ -228,4 +249,63 @@ def run(MAX_TOTAL_CREDITS):
                         else:
                             st.success(f"To reach a CGPA of **{target_cgpa:.2f}**, you need an average GPA of **{required_gpa:.2f}** in your next {num_sem_to_add} semester(s).")
             else:
-                st.toast("You have no remaining semesters or credits to set a goal.")
\ No newline at end of file
+                st.toast("You have no remaining semesters or credits to set a goal.")
+
+@st.fragment
+@instrumentation.timed("fragment.cgpa_planner")
+def course_planner(MAX_TOTAL_CREDITS, course_file, current_total_credits, total_weighted_sum):
+    """
+    Plans grades for the remaining courses: the lowest grades (and the
+    lowest grade ceiling) that still reach a target CGPA.
+    """
+    courses_df = get_course_data(course_file)
+    st.subheader("Plan Your Remaining Courses")
+    st.caption("Pick the courses you still have to take. The planner finds the least demanding grades that reach your target.")
+
+    remaining_semesters = TOTAL_SEMESTERS - len(st.session_state.semesters)
+    if remaining_semesters <= 0:
+        st.info("All semesters are already entered.")
+        return
+
+    selected = st.multiselect(
+        "Remaining courses",
+        sorted(courses_df["Display"].drop_duplicates().tolist()),
+        key="planner_courses",
+        placeholder="Search courses..."
+    )
+    target_cgpa = st.number_input(
+        "Target CGPA for the degree",
+        min_value=0.0,
+        max_value=10.0,
+        step=0.01,
+        format="%.2f",
+        key="planner_target"
+    )
+
+    if st.button("Find the easiest plan", key="planner_run"):
+        if current_total_credits == 0:
+            st.toast("Please enter at least one semester's data first.")
+            return
+
+        plan = plan_target_cgpa(
+            target_cgpa,
+            total_weighted_sum,
+            current_total_credits,
+            remaining_courses(courses_df, selected),
+            remaining_semesters,
+            MAX_SEM_CREDITS,
+            MAX_TOTAL_CREDITS,
+        )
+        if not plan["ok"]:
+            st.warning(plan["message"])
+            return
+
+        st.success(f"🎯 {plan['message']} Final CGPA: **{plan['final_cgpa']:.2f}**")
+        semester_summary = [
+            f"Semester {len(st.session_state.semesters) + i + 1}: GPA {gpa:.2f}"
+            for i, gpa in enumerate(plan["semester_gpas"]) if gpa is not None
+        ]
+        st.markdown(" · ".join(semester_summary))
+        plan_df = pd.DataFrame(plan["courses"])
+        plan_df["Semester"] = plan_df["Semester"] + len(st.session_state.semesters)
+        st.dataframe(plan_df, hide_index=True, use_container_width=True)
@@ -1,10 +1,17 @@
 import streamlit as st
-from utils import calculate_gpa, GRADE_POINTS
+import pandas as pd
+from utils import calculate_gpa, clear_missing_courses, GRADE_POINTS
 from components.tables import display_results_table
+from components.course_picker import course_picker
+from components.transcript_importer import transcript_importer
+from course_search import get_course_index
 
 GRADE_OPTIONS = list(GRADE_POINTS.keys())
 NON_GRADED_OPTIONS = ["P", "F"]
 
+# Plans larger than this open in the bulk (table) editor by default.
+BULK_EDIT_ROWS = 15
+
 def add_row(idx):
     new_row = {
         "id": st.session_state.next_id,
@@ -18,21 +25,19 @@ def delete_row(row_id):
     if len(st.session_state.rows) > 1:
         st.session_state.rows = [r for r in st.session_state.rows if r["id"] != row_id]
 
-def run(MAX_TOTAL_CREDITS, courses_df):
-    st.header("Free Mode – Flexible GPA Calculator 🎓")
-    st.caption("Add any courses, choose grades, and compute GPA within your total credit limit.")
-
-    # Init rows
-    if "rows" not in st.session_state:
-        st.session_state.rows = [{"id": 0, "course_display": None, "grade": "S"}]
-        st.session_state.next_id = 1
-
+def render_rows(courses_df):
+    """Renders one widget row per course and returns the selected subjects."""
+    missing = clear_missing_courses(st.session_state.rows, courses_df)
+    if missing:
+        st.warning("No longer in the course catalog, so removed from your plan: " + ", ".join(missing))
     selected_courses = [
         row["course_display"]
         for row in st.session_state.rows
         if row["course_display"]
     ]
 
+    course_index = get_course_index(courses_df)
+
     # Header
     header = st.columns([0.5, 3, 2, 1, 1, 0.5])
     header[0].write("")
@@ -53,21 +58,11 @@ def run(MAX_TOTAL_CREDITS, courses_df):
         with add_col:
             st.button("➕", key=f"add_{row_id}", on_click=add_row, args=(idx,))
         with course_col:
-            available_courses = sorted(courses_df["Display"].tolist())
-            options_available = [
-                c for c in available_courses
-                if c not in selected_courses or c == row["course_display"]
-            ]
-
-            current = row["course_display"]
-            idx_val = options_available.index(current) if current in options_available else None
-
-            selected = st.selectbox(
-                "Course",
-                key=f"course_{row_id}",
-                options=options_available,
-                index=idx_val,
-                label_visibility="collapsed",
+            selected = course_picker(
+                f"course_{row_id}",
+                course_index,
+                row["course_display"],
+                selected_courses,
                 placeholder="Select a course..."
             )
             row["course_display"] = selected
@@ -83,11 +78,11 @@ def run(MAX_TOTAL_CREDITS, courses_df):
             is_nongraded = False
 
         with type_col:
-            st.text_input("", value=ctype, disabled=True, label_visibility="collapsed")
+            st.text_input("Type", value=ctype, key=f"type_{row_id}", disabled=True, label_visibility="collapsed")
 
         with credits_col:
             st.number_input(
-                "",
+                "Credits",
                 value=credits,
                 disabled=True,
                 format="%.1f",
@@ -101,7 +96,7 @@ def run(MAX_TOTAL_CREDITS, courses_df):
                 row["grade"] = valid_grades[0]
 
             grade = st.selectbox(
-                "",
+                "Grade",
                 options=valid_grades,
                 key=f"grade_{row_id}",
                 index=valid_grades.index(row["grade"]),
@@ -120,6 +115,112 @@ def run(MAX_TOTAL_CREDITS, courses_df):
                 "Grade": grade,
             })
 
+    return calculated
+
+def render_bulk_editor(courses_df):
+    """
+    Renders the plan as a single st.data_editor grid over the same row model.
+    One component with one copy of the course options, so rerun cost stays
+    flat as the plan grows.
+    """
+    course_info = courses_df.drop_duplicates("Display").set_index("Display")
+
+    # The editor stores edits relative to the frame it was given, so the base
+    # frame must stay fixed while bulk mode is on.
+    if "free_bulk_base" not in st.session_state:
+        st.session_state.free_bulk_base = pd.DataFrame({
+            "Course": [row["course_display"] for row in st.session_state.rows],
+            "Grade": [row["grade"] for row in st.session_state.rows],
+        })
+
+    edited = st.data_editor(
+        st.session_state.free_bulk_base,
+        key="free_bulk_editor",
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Course": st.column_config.SelectboxColumn(
+                "Course", options=sorted(course_info.index.tolist()), width="large"
+            ),
+            "Grade": st.column_config.SelectboxColumn(
+                "Grade", options=GRADE_OPTIONS + ["P"], default="S"
+            ),
+        },
+    )
+
+    edited = edited.dropna(subset=["Course"])
+    missing = ~edited["Course"].isin(course_info.index)
+    if missing.any():
+        st.warning("No longer in the course catalog, so ignored: " + ", ".join(edited.loc[missing, "Course"]))
+        edited = edited[~missing]
+    duplicates = edited["Course"].duplicated()
+    if duplicates.any():
+        st.warning("Duplicate courses were ignored: " + ", ".join(edited.loc[duplicates, "Course"]))
+        edited = edited[~duplicates]
+
+    types = course_info["Type"].reindex(edited["Course"]).to_numpy()
+    credits = course_info["Credits"].reindex(edited["Course"]).astype(float).to_numpy()
+
+    rows = []
+    calculated = []
+    for course, grade, ctype, credit in zip(edited["Course"], edited["Grade"], types, credits):
+        valid_grades = NON_GRADED_OPTIONS if "Non-Graded" in ctype else GRADE_OPTIONS
+        if grade not in valid_grades:
+            grade = valid_grades[0]
+        rows.append({"course_display": course, "grade": grade})
+        calculated.append({"Course": course, "Type": ctype, "Credits": float(credit), "Grade": grade})
+
+    sync_rows(rows)
+    return calculated
+
+def sync_rows(rows):
+    """Replaces the row model with the bulk editor's rows when they differ."""
+    current = [(r["course_display"], r["grade"]) for r in st.session_state.rows if r["course_display"]]
+    if current == [(r["course_display"], r["grade"]) for r in rows]:
+        return
+
+    # Fresh ids so the per-row widgets never pick up stale widget state.
+    next_id = st.session_state.next_id
+    for row in rows:
+        row["id"] = next_id
+        next_id += 1
+    if not rows:
+        rows = [{"id": next_id, "course_display": None, "grade": "S"}]
+        next_id += 1
+    st.session_state.rows = rows
+    st.session_state.next_id = next_id
+
+def reset_bulk_editor():
+    """Drops the editor's base frame so it is rebuilt from the current rows."""
+    for key in ("free_bulk_base", "free_bulk_editor"):
+        if key in st.session_state:
+            del st.session_state[key]
+
+def run(MAX_TOTAL_CREDITS, courses_df):
+    st.header("Free Mode – Flexible GPA Calculator 🎓")
+    st.caption("Add any courses, choose grades, and compute GPA within your total credit limit.")
+
+    # Init rows
+    if "rows" not in st.session_state:
+        st.session_state.rows = [{"id": 0, "course_display": None, "grade": "S"}]
+        st.session_state.next_id = 1
+
+    transcript_importer("transcript_import", courses_df, on_import=reset_bulk_editor)
+
+    bulk_edit = st.toggle(
+        "Bulk edit (table view)",
+        value=len(st.session_state.rows) > BULK_EDIT_ROWS,
+        key="free_bulk_edit",
+        on_change=reset_bulk_editor,
+        help="Edit the whole plan in a single table. Faster for large plans."
+    )
+
+    if bulk_edit:
+        calculated = render_bulk_editor(courses_df)
+    else:
+        calculated = render_rows(courses_df)
+
     if calculated:
         st.markdown("---")
         st.subheader("Results")
@@ -3,7 +3,15 @@ import math
 import streamlit as st
 import numpy as np
 import joblib
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+import instrumentation
+import feedback
+import inference_executor
+import model_registry
+import shared_cache
+import surrogate
+from compiled_trees import FastPredictor
 
 GRADE_MAP = {
     0: "F",
@@ -27,17 +35,56 @@ GRADE_COLORS = {
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def load_models():
-    """Load models from the same directory as this file."""
+# Set GRADE_APP_FAST_INFERENCE=1 to serve predictions from compiled tree arrays.
+FAST_INFERENCE = os.environ.get("GRADE_APP_FAST_INFERENCE", "0") == "1"
+
+def with_surrogates(reg_sd, clf_grade, model_dir):
+    """Serves the SD and grade models from their lookup tables when enabled and built."""
+    if not surrogate.ENABLED:
+        return reg_sd, clf_grade
+    return (
+        surrogate.wrap(reg_sd, os.path.join(model_dir, "class_sd_xgb.pkl")),
+        surrogate.wrap(clf_grade, os.path.join(model_dir, "grade_xgb_classifier.pkl")),
+    )
+
+def load_models(model_dir=BASE_DIR):
+    """
+    Load models from ``model_dir`` (by default the directory of this file),
+    or map the compiled models from the shared cache when
+    GRADE_APP_SHARED_CACHE is set and the shipped models are requested.
+    """
+    if shared_cache.is_enabled() and model_dir == BASE_DIR:
+        shared = shared_cache.load_models()
+        reg_sd, clf_grade = with_surrogates(shared["class_sd_xgb"], shared["grade_xgb_classifier"], model_dir)
+        return (
+            instrumentation.TimedModel(shared["class_avg_xgb"], "predict.class_mean"),
+            instrumentation.TimedModel(reg_sd, "predict.class_sd"),
+            instrumentation.TimedModel(clf_grade, "predict.grade"),
+        )
+
+    avg_path = os.path.join(model_dir, "class_avg_xgb.pkl")
+    sd_path = os.path.join(model_dir, "class_sd_xgb.pkl")
+    grade_path = os.path.join(model_dir, "grade_xgb_classifier.pkl")
+
+    reg_avg = joblib.load(avg_path)
+    reg_sd = joblib.load(sd_path)
+    clf_grade = joblib.load(grade_path)
+
+    if FAST_INFERENCE:
+        reg_avg, reg_sd, clf_grade = (
+            compile_or_keep(m) for m in (reg_avg, reg_sd, clf_grade)
+        )
+    reg_sd, clf_grade = with_surrogates(reg_sd, clf_grade, model_dir)
+    return (
+        instrumentation.TimedModel(reg_avg, "predict.class_mean"),
+        instrumentation.TimedModel(reg_sd, "predict.class_sd"),
+        instrumentation.TimedModel(clf_grade, "predict.grade"),
+    )
+
+def configure_models():
+    """Loads the live model version into the registry, stopping the app if it can't."""
     try:
-        avg_path = os.path.join(BASE_DIR, "class_avg_xgb.pkl")
-        sd_path = os.path.join(BASE_DIR, "class_sd_xgb.pkl")
-        grade_path = os.path.join(BASE_DIR, "grade_xgb_classifier.pkl")
-
-        reg_avg = joblib.load(avg_path)
-        reg_sd = joblib.load(sd_path)
-        clf_grade = joblib.load(grade_path)
-        return reg_avg, reg_sd, clf_grade
+        model_registry.configure(load_models)
     except FileNotFoundError as e:
         st.error(f"Model file not found: {e.filename}")
         st.error("Place class_avg_xgb.pkl, class_sd_xgb.pkl and grade_xgb_classifier.pkl beside this file.")
@@ -46,7 +93,17 @@ def load_models():
         st.error(f"Error loading models: {e}")
         st.stop()
 
-regressor_avg, regressor_sd, classifier_grade = load_models()
+def compile_or_keep(model):
+    """Wraps a model in the compiled fast path, keeping the original if it can't be compiled."""
+    try:
+        return FastPredictor(model)
+    except ValueError:
+        return model
+
+configure_models()
+
+# Seconds a script run waits for the inference executor before giving up.
+PREDICT_TIMEOUT = 30
 
 def calculate_weighted_marks(cat1, cat2, da1, da2, da3, fat):
     """Return overall weighted marks (out of 100)."""
@@ -117,13 +174,17 @@ def zscore_to_grade(final_marks, class_avg, class_sd):
     else:
         return "F"
 
+@instrumentation.timed("plot_bell_curve")
 def plot_bell_curve(class_mean, class_sd, user_score):
     """
     Returns a matplotlib figure with a normal distribution curve
     and a vertical line marking user_score.
     (No seaborn - plain matplotlib)
     """
-    fig, ax = plt.subplots(figsize=(6, 3.5))
+    # A bare Figure is not registered with pyplot, so it is freed with the
+    # last reference instead of piling up in pyplot's global figure list.
+    fig = Figure(figsize=(6, 3.5))
+    ax = fig.subplots()
     width = max(8 * (class_sd if class_sd > 0 else 1), 20)
     x = np.linspace(class_mean - width/2, class_mean + width/2, 1000)
     if class_sd <= 0:
@@ -141,7 +202,7 @@ def plot_bell_curve(class_mean, class_sd, user_score):
     ax.set_ylabel("Density")
     ax.legend(loc="upper right", fontsize="small")
     ax.grid(axis="y", alpha=0.2)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 def show_grade_card(letter_grade, overall, class_mean, class_sd, model_used):
@@ -202,46 +263,126 @@ def progress_to_next(letter_grade, overall, class_mean, class_sd):
     prog = (z - lower_current) / denom
     return float(np.clip(prog, 0.0, 1.0))
 
+# Column layout of one prediction request; manual values are NaN when not given.
+REQUEST_COLUMNS = [
+    "da1", "da2", "da3", "cat1", "cat2", "fat",
+    "da1_avg", "da2_avg", "da3_avg", "cat1_avg", "cat2_avg", "fat_avg",
+    "class_strength", "manual_avg", "manual_sd",
+]
+GRADE_IDS = {letter: grade_id for grade_id, letter in GRADE_MAP.items()}
+
+def apply_hard_rules_batch(overall, fat, grade_ids):
+    """Vectorized apply_hard_rules over arrays of grade ids."""
+    grade_ids = np.where((overall < 50) | (fat < 40), GRADE_IDS["F"], grade_ids)
+    return np.where((grade_ids == GRADE_IDS["S"]) & (overall < 80), GRADE_IDS["A"], grade_ids)
+
+def _predict_with_fallback(model, X):
+    # Older model files were trained without the class strength column.
+    try:
+        return model.predict(X)
+    except Exception:
+        return model.predict(X[:, :-1])
+
+def ml_predict_batch(requests):
+    """
+    Runs the whole prediction chain (class mean -> class SD -> grade -> hard
+    rules) for an (n, len(REQUEST_COLUMNS)) array in one model call per stage.
+    Returns an (n, 4) array of overall, class_mean, class_sd and grade id.
+    """
+    # One snapshot for the whole batch, so a hot swap never mixes versions.
+    models = model_registry.current()
+    R = np.atleast_2d(np.asarray(requests, dtype=np.float64))
+    col = {name: R[:, i] for i, name in enumerate(REQUEST_COLUMNS)}
+    n = len(R)
+
+    overall = calculate_weighted_marks(col["cat1"], col["cat2"], col["da1"], col["da2"], col["da3"], col["fat"])
+    manual_avg = np.nan_to_num(col["manual_avg"])
+    manual_sd = np.nan_to_num(col["manual_sd"])
+
+    # Class mean from the component averages, falling back to the student's
+    # own marks for any component whose average was not given.
+    def mean_of_given(names, fallback_names):
+        avgs = np.column_stack([col[c] for c in names])
+        given = avgs > 0
+        own = np.column_stack([col[c] for c in fallback_names])
+        own_given = own > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            from_avgs = np.where(given, avgs, 0).sum(1) / given.sum(1)
+            from_own = np.where(own_given, own, 0).sum(1) / own_given.sum(1)
+        return np.nan_to_num(np.where(given.any(1), from_avgs, from_own))
+
+    da_mean = mean_of_given(["da1_avg", "da2_avg", "da3_avg"], ["da1", "da2", "da3"])
+    cat_mean = mean_of_given(["cat1_avg", "cat2_avg"], ["cat1", "cat2"])
+    fat_mean = np.where(col["fat_avg"] > 0, col["fat_avg"], col["fat"])
+    from_averages = calculate_weighted_marks(cat_mean, cat_mean, da_mean, da_mean, da_mean, fat_mean)
+
+    avg_columns = ["da1_avg", "da2_avg", "da3_avg", "cat1_avg", "cat2_avg", "fat_avg"]
+    has_averages = (np.column_stack([col[c] for c in avg_columns]) > 0).any(1)
+    # A manual SD alone means the component averages are ignored.
+    use_averages = has_averages & ~(manual_sd > 0)
+    need_model_mean = ~(manual_avg > 0) & ~use_averages
+
+    class_mean = np.where(manual_avg > 0, manual_avg, from_averages)
+    if need_model_mean.any():
+        X = R[need_model_mean][:, [0, 1, 2, 3, 4, 5, 12]]
+        class_mean[need_model_mean] = _predict_with_fallback(models.class_mean, X)
+
+    class_sd = manual_sd.copy()
+    need_model_sd = ~(manual_sd > 0)
+    if need_model_sd.any():
+        X = np.column_stack([overall, class_mean, col["class_strength"]])[need_model_sd]
+        class_sd[need_model_sd] = _predict_with_fallback(models.class_sd, X)
+
+    # Both manual values given: z-score grading, no models.
+    manual_only = (manual_avg > 0) & (manual_sd > 0)
+    grade_ids = np.empty(n, dtype=np.float64)
+    if manual_only.any():
+        grade_ids[manual_only] = [
+            GRADE_IDS[zscore_to_grade(o, m, sd)]
+            for o, m, sd in zip(overall[manual_only], manual_avg[manual_only], manual_sd[manual_only])
+        ]
+    if (~manual_only).any():
+        X = np.column_stack([overall, class_mean, class_sd, col["class_strength"]])[~manual_only]
+        grade_ids[~manual_only] = _predict_with_fallback(models.grade, X)
+
+    grade_ids = apply_hard_rules_batch(overall, col["fat"], grade_ids)
+    return np.column_stack([overall, class_mean, class_sd, grade_ids])
+
+def predict_request(request):
+    """
+    Runs one prediction request, on the inference executor when it is
+    enabled (falling back to inline when its queue is full or it does not
+    answer within PREDICT_TIMEOUT seconds).
+    Returns overall, class_mean, class_sd and the final letter grade.
+    """
+    row = np.array([[request.get(c, np.nan) for c in REQUEST_COLUMNS]], dtype=np.float64)
+    executor = inference_executor.get_executor(ml_predict_batch)
+    result = None
+    if executor is not None:
+        try:
+            result = executor.predict(row, timeout=PREDICT_TIMEOUT)
+        except inference_executor.QueueFull:
+            pass
+        except TimeoutError:
+            instrumentation.count("inference_timeouts")
+    if result is None:
+        result = ml_predict_batch(row)
+
+    overall, class_mean, class_sd, grade_id = result[0]
+    return overall, class_mean, class_sd, GRADE_MAP[int(grade_id)]
+
 def ml_predict_final_grade(
     da1, da2, da3, cat1, cat2, fat,
     da1_avg, da2_avg, da3_avg, cat1_avg, cat2_avg, fat_avg,
     class_strength
 ):
     """Predict class_mean, class_sd, and final grade using ML models."""
-    overall = calculate_weighted_marks(cat1, cat2, da1, da2, da3, fat)
-
-    provided_avgs = [da1_avg, da2_avg, da3_avg, cat1_avg, cat2_avg, fat_avg]
-    known_avg = safe_mean(provided_avgs)
-
-    if known_avg is not None:
-        da_vals = [v for v in [da1_avg, da2_avg, da3_avg] if v and v > 0]
-        cat_vals = [v for v in [cat1_avg, cat2_avg] if v and v > 0]
-
-        da_mean = np.mean(da_vals) if da_vals else safe_mean([da1, da2, da3])
-        cat_mean = np.mean(cat_vals) if cat_vals else safe_mean([cat1, cat2])
-        fat_mean = fat_avg if fat_avg and fat_avg > 0 else fat
-
-        class_mean = calculate_weighted_marks(cat_mean, cat_mean, da_mean, da_mean, da_mean, fat_mean)
-    else:
-        try:
-            class_mean = regressor_avg.predict([[da1, da2, da3, cat1, cat2, fat, class_strength]])[0]
-        except Exception:
-            class_mean = regressor_avg.predict([[da1, da2, da3, cat1, cat2, fat]])[0]
-
-    try:
-        class_sd = regressor_sd.predict([[overall, class_mean, class_strength]])[0]
-    except Exception:
-        class_sd = regressor_sd.predict([[overall, class_mean]])[0]
-
-    try:
-        grade_id = classifier_grade.predict([[overall, class_mean, class_sd, class_strength]])[0]
-    except Exception:
-        grade_id = classifier_grade.predict([[overall, class_mean, class_sd]])[0]
-
-    predicted_letter = GRADE_MAP.get(int(grade_id), "Unknown")
-    final_letter = apply_hard_rules(overall, fat, predicted_letter)
-
-    return overall, class_mean, class_sd, final_letter
+    return predict_request({
+        "da1": da1, "da2": da2, "da3": da3, "cat1": cat1, "cat2": cat2, "fat": fat,
+        "da1_avg": da1_avg, "da2_avg": da2_avg, "da3_avg": da3_avg,
+        "cat1_avg": cat1_avg, "cat2_avg": cat2_avg, "fat_avg": fat_avg,
+        "class_strength": class_strength,
+    })
 
 def run(courses_df):
     st.set_page_config(page_title="Grade Predictor (Advanced)", layout="centered")
@@ -311,80 +452,77 @@ def run(courses_df):
 
     class_strength = st.number_input("Class Strength (for ML models)", 10, 120, 60)
 
-    if st.button("Predict Grade"):
-        overall = calculate_weighted_marks(cat1, cat2, da1, da2, da3, fat)
+    request = {
+        "da1": da1, "da2": da2, "da3": da3, "cat1": cat1, "cat2": cat2, "fat": fat,
+        "da1_avg": da1_avg, "da2_avg": da2_avg, "da3_avg": da3_avg,
+        "cat1_avg": cat1_avg, "cat2_avg": cat2_avg, "fat_avg": fat_avg,
+        "class_strength": class_strength,
+        "manual_avg": manual_avg if manual_avg > 0 else np.nan,
+        "manual_sd": manual_sd if manual_sd > 0 else np.nan,
+    }
 
+    if st.button("Predict Grade"):
         if manual_avg > 0 and manual_sd > 0:
             st.info("Manual override active — component averages ignored, ML skipped.")
-            predicted = zscore_to_grade(overall, manual_avg, manual_sd)
-            final = apply_hard_rules(overall, fat, predicted)
-
-            show_grade_card(final, overall, manual_avg, manual_sd, "Manual (Z-score)")
-            prog = progress_to_next(final, overall, manual_avg, manual_sd)
-            st.progress(prog)
-            fig = plot_bell_curve(manual_avg, manual_sd, overall)
-            st.pyplot(fig)
-            return
-
-        if manual_avg > 0 and manual_sd == 0:
+            model_used = "Manual (Z-score)"
+        elif manual_avg > 0:
             st.info("Manual overall class average provided — component averages ignored for class mean.")
-            class_mean = manual_avg
-            try:
-                class_sd = regressor_sd.predict([[overall, class_mean, class_strength]])[0]
-            except Exception:
-                class_sd = regressor_sd.predict([[overall, class_mean]])[0]
-            try:
-                grade_id = classifier_grade.predict([[overall, class_mean, class_sd, class_strength]])[0]
-            except Exception:
-                grade_id = classifier_grade.predict([[overall, class_mean, class_sd]])[0]
-
-            predicted = GRADE_MAP.get(int(grade_id), "Unknown")
-            final = apply_hard_rules(overall, fat, predicted)
-
-            show_grade_card(final, overall, class_mean, class_sd, "ManualAvg + ML")
-            prog = progress_to_next(final, overall, class_mean, class_sd)
-            st.progress(prog)
-            fig = plot_bell_curve(class_mean, class_sd, overall)
-            st.pyplot(fig)
-            return
-
-        if manual_avg == 0 and manual_sd > 0:
+            model_used = "ManualAvg + ML"
+        elif manual_sd > 0:
             st.info("Manual class SD provided — component averages ignored for SD handling where appropriate.")
-            try:
-                class_mean = regressor_avg.predict([[da1, da2, da3, cat1, cat2, fat, class_strength]])[0]
-            except Exception:
-                class_mean = regressor_avg.predict([[da1, da2, da3, cat1, cat2, fat]])[0]
-
-            class_sd = manual_sd
-
-            try:
-                grade_id = classifier_grade.predict([[overall, class_mean, class_sd, class_strength]])[0]
-            except Exception:
-                grade_id = classifier_grade.predict([[overall, class_mean, class_sd]])[0]
-
-            predicted = GRADE_MAP.get(int(grade_id), "Unknown")
-            final = apply_hard_rules(overall, fat, predicted)
-
-            show_grade_card(final, overall, class_mean, class_sd, "ManualSD + ML")
-            prog = progress_to_next(final, overall, class_mean, class_sd)
-            st.progress(prog)
-            fig = plot_bell_curve(class_mean, class_sd, overall)
-            st.pyplot(fig)
-            return
-
-        st.info("No manual override — using ML models (component averages used if provided).")
-
-        overall, class_mean, class_sd, predicted = ml_predict_final_grade(
-            da1, da2, da3, cat1, cat2, fat,
-            da1_avg, da2_avg, da3_avg, cat1_avg, cat2_avg, fat_avg,
-            class_strength
-        )
-
-        final = apply_hard_rules(overall, fat, predicted)
-
-        show_grade_card(final, overall, class_mean, class_sd, "ML")
+            model_used = "ManualSD + ML"
+        else:
+            st.info("No manual override — using ML models (component averages used if provided).")
+            model_used = "ML"
+        models = model_registry.current()
+        if model_used != "Manual (Z-score)" and any(map(surrogate.is_approximate, (models.class_sd, models.grade))):
+            model_used += " (approximate tables)"
+
+        overall, class_mean, class_sd, final = predict_request(request)
+        st.session_state.last_prediction = {
+            "course": course_code,
+            "request": request,
+            "prediction": {
+                "overall": overall, "class_mean": class_mean, "class_sd": class_sd,
+                "grade": final, "model_used": model_used,
+            },
+            "model_version": model_registry.current().version,
+        }
+
+        show_grade_card(final, overall, class_mean, class_sd, model_used)
         prog = progress_to_next(final, overall, class_mean, class_sd)
         st.progress(prog)
         fig = plot_bell_curve(class_mean, class_sd, overall)
         st.pyplot(fig)
-        return
+
+    last = st.session_state.get("last_prediction")
+    if last is not None and last["course"] == course_code:
+        report_outcome(last)
+
+def report_outcome(last):
+    """Opt-in form to report the grade actually received for the last prediction."""
+    with st.expander("Report my actual grade"):
+        st.caption(
+            "Optional. Your marks, the prediction and the grade you received are saved "
+            "(without any personal details) to improve future predictions."
+        )
+        with st.form("outcome_report", clear_on_submit=True):
+            actual_grade = st.selectbox("Grade received", list(GRADE_MAP.values())[::-1])
+            actual_avg = st.number_input("Published class average (optional)", 0.0, 100.0, 0.0)
+            actual_sd = st.number_input("Published class SD (optional)", 0.0, 40.0, 0.0)
+            submitted = st.form_submit_button("Submit")
+
+        if submitted:
+            try:
+                feedback.record_outcome(
+                    last["course"], last["request"], last["prediction"], actual_grade,
+                    actual_avg if actual_avg > 0 else None,
+                    actual_sd if actual_sd > 0 else None,
+                    model_version=last["model_version"],
+                )
+            except OSError as e:
+                st.error(f"Could not save your report: {e}")
+                return
+            # One report per prediction.
+            del st.session_state.last_prediction
+            st.success("Thanks! Your grade was recorded.")
@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
-from utils import get_paired_course, calculate_gpa, GRADE_POINTS
+from utils import get_paired_course, calculate_gpa, catalog_path, clear_missing_courses, get_course_data, GRADE_POINTS
 from components.tables import display_results_table
+from components.course_picker import course_picker
+from components.transcript_importer import transcript_importer
+from course_search import get_course_index
+import instrumentation
 
 MAX_CREDITS = 30.5
 GRADE_OPTIONS = list(GRADE_POINTS.keys())
@@ -13,7 +17,7 @@ def on_course_change(row_id):
     Updates the session state and checks for paired courses to add.
     """
     selected_course_display = st.session_state[f"course_select_{row_id}"]
-    courses_df = st.session_state.courses_df
+    courses_df = get_course_data(st.session_state.catalog_path)
     for row in st.session_state.rows:
         if row["id"] == row_id:
             row["course_display"] = selected_course_display
@@ -66,16 +70,39 @@ def delete_row(row_id):
 
 def run(courses_df):
     """Main function for the Semester Mode UI."""
-    st.session_state.courses_df = courses_df
+    # A handle to the shared catalog for the row callbacks, not a copy.
+    st.session_state.catalog_path = catalog_path(courses_df)
     semester_number = st.number_input("Semester Number", min_value=1, max_value=8, value=1, step=1)
     st.subheader(f"Semester {semester_number} Courses")
     
     if "rows" not in st.session_state:
         st.session_state.rows = [{"id": 0, "course_display": None, "grade": "S"}]
         st.session_state.next_id = 1
-        
+
+    transcript_importer("transcript_import", courses_df)
+    semester_editor(st.session_state.catalog_path, semester_number)
+
+@st.fragment
+@instrumentation.timed("fragment.semester_editor")
+def semester_editor(course_file, semester_number):
+    """
+    Row editor and results panel. Runs as a fragment, so editing a row only
+    re-executes this region instead of the whole app script. The catalog is
+    looked up by path on every fragment rerun, so a hot-reloaded catalog
+    reaches the editor without a full rerun.
+    """
+    calculated_subjects = render_rows(get_course_data(course_file))
+    render_results(calculated_subjects, semester_number)
+
+def render_rows(courses_df):
+    """Renders one editable row per course and returns the selected subjects."""
+    missing = clear_missing_courses(st.session_state.rows, courses_df)
+    if missing:
+        st.warning("No longer in the course catalog, so removed from your plan: " + ", ".join(missing))
     calculated_subjects = []
     selected_courses_list = [row["course_display"] for row in st.session_state.rows if row["course_display"] is not None]
+    selected_courses = set(selected_courses_list)
+    course_index = get_course_index(courses_df)
     header_col1, header_col2, header_col3, header_col4, header_col5, header_col6 = st.columns([0.5, 3, 2, 1, 1, 0.5])
     with header_col1:
         st.write("")
@@ -98,20 +125,13 @@ def run(courses_df):
             st.button("➕", key=f"add_{row_id}", on_click=add_new_row, args=(idx,))
         
         with course_col:
-            current_course = row["course_display"]
-            available_courses = sorted(courses_df["Display"].tolist())
-            available_options = [c for c in available_courses if c not in selected_courses_list or c == current_course]
-            initial_index = available_options.index(current_course) if current_course in available_options else None
-            
-            st.selectbox(
-                label="Select a course...",
-                options=available_options,
-                index=initial_index,
-                key=f"course_select_{row_id}",
+            course_picker(
+                f"course_select_{row_id}",
+                course_index,
+                row["course_display"],
+                selected_courses,
                 on_change=on_course_change,
                 args=(row_id,),
-                placeholder="Search for a course...",
-                label_visibility="collapsed"
             )
 
         course_info = {}
@@ -127,9 +147,9 @@ def run(courses_df):
             course_info["credits"] = 0.0
             
         with type_col:
-            st.text_input(f"", value=course_info["type"], key=f"type_{row_id}", disabled=True, label_visibility="collapsed")
+            st.text_input("Type", value=course_info["type"], key=f"type_{row_id}", disabled=True, label_visibility="collapsed")
         with credits_col:
-            st.number_input(f"", value=course_info["credits"], key=f"credits_{row_id}", disabled=True, format="%.2f", label_visibility="collapsed")
+            st.number_input("Credits", value=course_info["credits"], key=f"credits_{row_id}", disabled=True, format="%.2f", label_visibility="collapsed")
         with grade_col:
             if is_non_graded:
                 grade_options = NON_GRADED_OPTIONS
@@ -142,7 +162,7 @@ def run(courses_df):
                 row["grade"] = current_grade
 
             grade = st.selectbox(
-                f"",
+                "Grade",
                 options=grade_options,
                 index=grade_options.index(current_grade),
                 key=f"grade_{row_id}",
@@ -160,35 +180,42 @@ def run(courses_df):
                 "Credits": course_info["credits"],
                 "Grade": grade,
             })
-    if calculated_subjects:
-        st.markdown("---")
-        st.subheader("Results")
-        
-        graded_subjects = [
-            sub for sub in calculated_subjects
-            if "Non-Graded Core Requirement" not in sub["Type"]
-        ]
-        
-        total_credits = sum(sub["Credits"] for sub in calculated_subjects)
-        
-        gpa, gpa_credits = calculate_gpa(graded_subjects)
 
-        has_non_graded_course = any("Non-Graded Core Requirement" in sub["Type"] for sub in calculated_subjects)
+    return calculated_subjects
 
-        if has_non_graded_course:
-            st.info(f"📚 **Total Credits:** {total_credits:.2f} (Credits from all courses)")
-            st.info(f"📚 **GPA Credits:** {gpa_credits:.2f} (Credits used for GPA calculation)")
-        else:
-            st.info(f"📚 **Total Credits:** {total_credits:.2f}")
+def render_results(calculated_subjects, semester_number):
+    """Renders the GPA summary and results table for the selected subjects."""
+    if not calculated_subjects:
+        return
+
+    st.markdown("---")
+    st.subheader("Results")
+    
+    graded_subjects = [
+        sub for sub in calculated_subjects
+        if "Non-Graded Core Requirement" not in sub["Type"]
+    ]
+    
+    total_credits = sum(sub["Credits"] for sub in calculated_subjects)
+    
+    gpa, gpa_credits = calculate_gpa(graded_subjects)
 
-        if total_credits > MAX_CREDITS:
-            st.warning(f"⚠️ **Total credits ({total_credits}) exceed the maximum limit of {MAX_CREDITS}.** Please remove some courses.")
+    has_non_graded_course = any("Non-Graded Core Requirement" in sub["Type"] for sub in calculated_subjects)
+
+    if has_non_graded_course:
+        st.info(f"📚 **Total Credits:** {total_credits:.2f} (Credits from all courses)")
+        st.info(f"📚 **GPA Credits:** {gpa_credits:.2f} (Credits used for GPA calculation)")
+    else:
+        st.info(f"📚 **Total Credits:** {total_credits:.2f}")
+
+    if total_credits > MAX_CREDITS:
+        st.warning(f"⚠️ **Total credits ({total_credits}) exceed the maximum limit of {MAX_CREDITS}.** Please remove some courses.")
+    else:
+        if gpa_credits > 0:
+            st.success(f"🎯 **GPA for Semester {semester_number}: {gpa:.2f}**")
         else:
-            if gpa_credits > 0:
-                st.success(f"🎯 **GPA for Semester {semester_number}: {gpa:.2f}**")
-            else:
-                st.info(f"🎯 **GPA for Semester {semester_number}: 0.00**")
-                st.info("GPA cannot be calculated as only non-graded courses were selected.")
-            
-        if total_credits <= MAX_CREDITS:
-            display_results_table(calculated_subjects)
\ No newline at end of file
+            st.info(f"🎯 **GPA for Semester {semester_number}: 0.00**")
+            st.info("GPA cannot be calculated as only non-graded courses were selected.")
+        
+    if total_credits <= MAX_CREDITS:
+        display_results_table(calculated_subjects)
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""
+Compact, shareable encoding of a saved plan.
+
+A plan is packed into bytes and base64url-encoded so it fits in a
+``?plan=`` query parameter:
+
+    header   version, branch index, mode index, catalog CRC32, item count
+    rows     (catalog position, grade code) per course     (Semester/Free Mode)
+    sems     (GPA x 100, credits x 2) per semester           (CGPA Mode)
+
+Courses are stored by their position in the branch catalog, so the CRC of
+the catalog's course list is kept in the header; a plan saved against a
+different catalog is rejected rather than silently mapped to other courses.
+Encoded plans can also be kept in a local SQLite store under a name. Each
+saved plan belongs to an owner, a random per-browser key (see
+``new_owner``), and is only listed, loaded, overwritten or deleted for that
+owner.
+"""
+import base64
+import os
+import re
+import secrets
+import sqlite3
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils import BRANCH_CATALOGS, GRADE_POINTS
+
+FORMAT_VERSION = 1
+PLAN_MODES = ["Semester Mode", "CGPA Mode", "Free Mode"]
+GRADE_CODES = list(GRADE_POINTS) + ["P"]
+
+PLAN_DB_PATH = os.environ.get("GRADE_APP_PLAN_DB", "plans.db")
+
+_HEADER = struct.Struct(">BBBIH")
+_ROW = np.dtype([("course", ">u2"), ("grade", "u1")])
+_SEMESTER = np.dtype([("gpa", ">u2"), ("credits", "u1")])
+_MISSING_GPA = 0xFFFF
+_MISSING_CREDITS = 0xFF
+
+
+def catalog_displays(courses_df):
+    """The catalog's course list in the order plan positions refer to."""
+    return courses_df["Display"].drop_duplicates().tolist()
+
+
+def catalog_crc(displays):
+    return zlib.crc32("\n".join(displays).encode("utf-8"))
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(token):
+    token = token.strip()
+    return base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+
+
+def encode_rows(branch, mode, rows, courses_df):
+    """Encodes Semester/Free Mode rows. Empty rows are dropped."""
+    displays = catalog_displays(courses_df)
+    position = {display: i for i, display in enumerate(displays)}
+    rows = [row for row in rows if row.get("course_display") in position]
+
+    body = np.empty(len(rows), dtype=_ROW)
+    body["course"] = [position[row["course_display"]] for row in rows]
+    body["grade"] = [GRADE_CODES.index(row["grade"]) if row["grade"] in GRADE_CODES else 0 for row in rows]
+
+    header = _HEADER.pack(FORMAT_VERSION, list(BRANCH_CATALOGS).index(branch),
+                          PLAN_MODES.index(mode), catalog_crc(displays), len(rows))
+    return _b64encode(header + body.tobytes())
+
+
+def encode_semesters(branch, semesters):
+    """Encodes CGPA Mode semesters (GPA to 2 decimals, credits to 0.5)."""
+    body = np.empty(len(semesters), dtype=_SEMESTER)
+    body["gpa"] = [_MISSING_GPA if s["gpa"] is None else round(s["gpa"] * 100) for s in semesters]
+    body["credits"] = [_MISSING_CREDITS if s["credits"] is None else round(s["credits"] * 2) for s in semesters]
+
+    header = _HEADER.pack(FORMAT_VERSION, list(BRANCH_CATALOGS).index(branch),
+                          PLAN_MODES.index("CGPA Mode"), 0, len(semesters))
+    return _b64encode(header + body.tobytes())
+
+
+def decode_plan(token):
+    """
+    Decodes a plan token into a dict with "branch", "mode", "crc" and the
+    packed "items" array. Raises ValueError on malformed tokens.
+    """
+    try:
+        data = _b64decode(token)
+        version, branch_idx, mode_idx, crc, count = _HEADER.unpack_from(data)
+    except (ValueError, struct.error) as e:
+        raise ValueError(f"Not a valid plan: {e}")
+
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported plan version {version}.")
+    if branch_idx >= len(BRANCH_CATALOGS) or mode_idx >= len(PLAN_MODES):
+        raise ValueError("Plan refers to an unknown branch or mode.")
+
+    mode = PLAN_MODES[mode_idx]
+    dtype = _SEMESTER if mode == "CGPA Mode" else _ROW
+    body = data[_HEADER.size:]
+    if len(body) != count * dtype.itemsize:
+        raise ValueError("Plan is truncated.")
+
+    return {
+        "branch": list(BRANCH_CATALOGS)[branch_idx],
+        "mode": mode,
+        "crc": crc,
+        "items": np.frombuffer(body, dtype=dtype),
+    }
+
+
+def plan_rows(plan, courses_df, next_id=0):
+    """
+    Resolves a decoded Semester/Free Mode plan against its catalog in one
+    step. Returns ``(rows, next_id)``.
+    """
+    displays = catalog_displays(courses_df)
+    if plan["crc"] != catalog_crc(displays):
+        raise ValueError("This plan was saved against a different version of the course catalog.")
+
+    items = plan["items"]
+    if len(items) and (items["course"].max() >= len(displays) or items["grade"].max() >= len(GRADE_CODES)):
+        raise ValueError("Plan refers to courses outside the catalog.")
+
+    courses = np.asarray(displays, dtype=object)[items["course"]]
+    grades = np.asarray(GRADE_CODES, dtype=object)[items["grade"]]
+    rows = [
+        {"id": next_id + i, "course_display": course, "grade": grade}
+        for i, (course, grade) in enumerate(zip(courses, grades))
+    ]
+    return rows, next_id + len(rows)
+
+
+def plan_semesters(plan, next_id=0):
+    """Resolves a decoded CGPA Mode plan. Returns ``(semesters, next_id)``."""
+    items = plan["items"]
+    semesters = [
+        {
+            "id": next_id + i,
+            "gpa": None if gpa == _MISSING_GPA else gpa / 100,
+            "credits": None if credits == _MISSING_CREDITS else credits / 2,
+        }
+        for i, (gpa, credits) in enumerate(zip(items["gpa"].tolist(), items["credits"].tolist()))
+    ]
+    return semesters, next_id + len(semesters)
+
+
+def new_owner():
+    """A random key identifying one browser's saved plans."""
+    return secrets.token_urlsafe(16)
+
+
+def is_owner(value):
+    return bool(value) and re.fullmatch(r"[A-Za-z0-9_-]{16,64}", value) is not None
+
+
+class PlanStore:
+    """Named plans kept in a local SQLite database, scoped to their owner."""
+
+    def __init__(self, path=PLAN_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(plans)")]
+            if columns and "owner" not in columns:
+                # Plans saved before owners existed were visible to everyone;
+                # they are set aside rather than handed to whoever asks first.
+                conn.execute("ALTER TABLE plans RENAME TO plans_unowned")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "owner TEXT NOT NULL, name TEXT NOT NULL, token TEXT NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (owner, name))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call; Streamlit runs sessions on
+        # separate threads and sqlite3 connections are not shareable.
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, owner, name, token):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO plans (owner, name, token, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(owner, name) DO UPDATE SET token = excluded.token, updated = excluded.updated",
+                (owner, name, token, time.time()),
+            )
+
+    def load(self, owner, name):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT token FROM plans WHERE owner = ? AND name = ?", (owner, name)
+            ).fetchone()
+        return row[0] if row else None
+
+    def names(self, owner):
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute(
+                "SELECT name FROM plans WHERE owner = ? ORDER BY updated DESC", (owner,)
+            )]
+
+    def delete(self, owner, name):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM plans WHERE owner = ? AND name = ?", (owner, name))
+
+
+_store = None
+
+
+def get_plan_store():
+    """Returns the process-wide PlanStore, creating the database on first use."""
+    global _store
+    if _store is None:
+        _store = PlanStore()
+    return _store
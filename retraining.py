@@ -0,0 +1,192 @@
+"""
+Background incremental retraining from the outcome feedback log.
+
+Every ``GRADE_APP_RETRAIN_INTERVAL`` seconds (off when unset or 0) a daemon
+thread reads the reports added to ``feedback`` since the live model version
+was published. Once at least ``GRADE_APP_RETRAIN_MIN_ROWS`` new reports are
+in, each model continues boosting from its current booster for
+``GRADE_APP_RETRAIN_ROUNDS`` rounds on the new rows it has labels for:
+
+- the grade classifier on every report,
+- the class mean/SD regressors only on reports with the real class average/SD.
+
+Reports are split into training and holdout rows by id. A continued model
+replaces the current one only if it scores at least as well on the holdout
+and on the test rows of ``script``'s fixed split of the grade history
+(``GRADE_APP_RETRAIN_REFERENCE``, default ``data/grades.csv``). The reports
+are unauthenticated, so the holdout alone could be stuffed by one user; the
+reference split is not theirs to change.
+Accepted models are published as a new ``model_registry`` version and
+swapped in without restarting the server. Only one process per registry
+directory retrains, guarded by a lock file.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import feedback
+import instrumentation
+import model_registry
+import script
+
+INTERVAL = float(os.environ.get("GRADE_APP_RETRAIN_INTERVAL", "0"))
+MIN_NEW_ROWS = int(os.environ.get("GRADE_APP_RETRAIN_MIN_ROWS", "20"))
+BOOST_ROUNDS = int(os.environ.get("GRADE_APP_RETRAIN_ROUNDS", "20"))
+# Fewer holdout rows than this for a model and it is left unchanged.
+MIN_HOLDOUT = 5
+REFERENCE_DATA = os.environ.get("GRADE_APP_RETRAIN_REFERENCE", script.DEFAULT_DATA)
+
+# Label column of each model in feedback.to_frame rows.
+LABELS = {
+    "class_avg_xgb": "Reported Class Mean",
+    "class_sd_xgb": "Reported Class SD",
+    "grade_xgb_classifier": "Final Grade Encoded",
+}
+
+logger = logging.getLogger("grade_app.retrain")
+
+_thread = None
+_thread_lock = threading.Lock()
+_host_lock = None
+_last_attempt = {}
+# Test rows of the reference data's fixed split, read on first use.
+_reference = None
+
+
+def _stage_rows(frame, name, label=None):
+    features = script.MODELS[name][0]
+    label = label or LABELS[name]
+    if name == "grade_xgb_classifier":
+        # Grades forced by the hard rules say nothing about the classifier.
+        frame = frame[(frame["Overall Score"] >= 50) & (frame["Final Assessment Test"] >= 40)]
+    rows = frame[features + [label]].dropna()
+    return rows[features].to_numpy(np.float32), rows[label].to_numpy()
+
+
+def reference_rows(name):
+    """(X, y) of ``name`` on the test rows of the reference data's fixed split."""
+    global _reference
+    if _reference is None:
+        _reference = pd.concat(
+            [chunk[is_test] for chunk, is_test in script.iter_split_chunks(REFERENCE_DATA)], ignore_index=True
+        )
+    return _stage_rows(_reference, name, script.MODELS[name][1])
+
+
+def _score(model, X, y):
+    """Higher is better: accuracy for the classifier, negative RMSE otherwise."""
+    predicted = model.predict(X)
+    if isinstance(model, xgb.XGBClassifier):
+        return float(np.mean(predicted == y))
+    return -float(np.sqrt(np.mean((predicted - y) ** 2)))
+
+
+def continue_boosting(model, name, X, y, rounds=BOOST_ROUNDS):
+    """Returns a copy of ``model`` boosted ``rounds`` more rounds on (X, y)."""
+    estimator = type(model)
+    dtrain = xgb.DMatrix(X, label=y, feature_names=script.MODELS[name][0])
+    booster = xgb.train(script.booster_params(estimator), dtrain, num_boost_round=rounds,
+                        xgb_model=model.get_booster())
+    return script.to_estimator(estimator, booster)
+
+
+def retrain_once():
+    """
+    Runs one retraining pass. Returns a summary dict whose "status" is
+    "skipped", "rejected" or "published".
+    """
+    version = model_registry.current_version()
+    since = model_registry.read_meta(version).get("feedback_offset", 0)
+    records, end_offset = feedback.read_outcomes()
+
+    new = [r for offset, r in records if offset >= since and not feedback.is_holdout(r)]
+    if len(new) < MIN_NEW_ROWS:
+        return {"status": "skipped", "version": version, "new_rows": len(new)}
+    if _last_attempt.get(version) == end_offset:
+        # Nothing reported since this version last failed validation.
+        return {"status": "skipped", "version": version, "new_rows": 0}
+    _last_attempt[version] = end_offset
+
+    train = feedback.to_frame(new)
+    holdout = feedback.to_frame([r for _, r in records if feedback.is_holdout(r)])
+    estimators = model_registry.load_estimators(version)
+
+    updated, scores = {}, {}
+    for name, model in estimators.items():
+        X, y = _stage_rows(train, name)
+        X_holdout, y_holdout = _stage_rows(holdout, name) if len(holdout) else (X[:0], y[:0])
+        if not len(X) or len(X_holdout) < MIN_HOLDOUT:
+            continue
+        candidate = continue_boosting(model, name, X, y)
+        before, after = _score(model, X_holdout, y_holdout), _score(candidate, X_holdout, y_holdout)
+        X_reference, y_reference = reference_rows(name)
+        reference_before = _score(model, X_reference, y_reference)
+        reference_after = _score(candidate, X_reference, y_reference)
+        scores[name] = {"before": before, "after": after, "train_rows": len(X), "holdout_rows": len(X_holdout),
+                        "reference_before": reference_before, "reference_after": reference_after,
+                        "reference_rows": len(X_reference)}
+        if after >= before and reference_after >= reference_before:
+            updated[name] = candidate
+
+    if not updated:
+        instrumentation.count("retrain_rejected")
+        return {"status": "rejected", "version": version, "scores": scores}
+
+    new_version = model_registry.publish({**estimators, **updated}, {
+        "parent": version,
+        "feedback_offset": end_offset,
+        "updated": sorted(updated),
+        "scores": scores,
+    })
+    model_registry.activate(new_version)
+    instrumentation.count("retrain_published")
+    instrumentation.set_gauge("model_version", new_version)
+    return {"status": "published", "version": new_version, "scores": scores, "updated": sorted(updated)}
+
+
+def _acquire_host_lock():
+    """Takes an exclusive lock on the registry, held for this process's lifetime."""
+    global _host_lock
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    os.makedirs(model_registry.REGISTRY_DIR, exist_ok=True)
+    handle = open(os.path.join(model_registry.REGISTRY_DIR, "retrain.lock"), "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _host_lock = handle
+    return True
+
+
+def _loop():
+    while True:
+        time.sleep(INTERVAL)
+        start = time.perf_counter()
+        try:
+            summary = retrain_once()
+            if summary["status"] != "skipped":
+                logger.info("retraining %s: %s", summary["status"], summary)
+        except Exception:
+            logger.exception("retraining failed")
+        instrumentation.observe("retrain.run", time.perf_counter() - start)
+
+
+def start():
+    """Starts the background retrainer once per process when enabled."""
+    global _thread
+    if INTERVAL <= 0 or _thread is not None:
+        return
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_loop, name="grade-app-retrain", daemon=True)
+            if _acquire_host_lock():
+                _thread.start()
@@ -1,113 +1,346 @@
-import pandas as pd
+"""
+Trains the grade prediction models used by Grade Prediction Mode.
+
+    python script.py                                  # in memory
+    python script.py --external-memory                # streamed in chunks
+    python script.py --data history.parquet --external-memory --cache-dir /tmp/xgb
+
+The default path reads the whole history into one DataFrame. With
+``--external-memory`` the history is streamed chunk by chunk (from its
+Parquet copy when there is one, see ``storage``) through an XGBoost
+``DataIter`` into a ``QuantileDMatrix``, so only the quantized feature
+matrix is held instead of the raw rows and their train/test copies.
+``--cache-dir`` additionally spills the quantized pages to disk
+(``ExtMemQuantileDMatrix``) for histories that do not fit even then.
+
+Each model is a stage with its own fingerprint (data content, feature spec,
+hyperparameters, training mode and library versions). A stage whose
+fingerprint is in ``--artifact-cache`` is reused instead of retrained, so
+changing one model's settings retrains only that model. The models are
+written to ``modes/``, where the app loads them from; ``--surrogates`` also
+builds their lookup tables (see ``surrogate``).
+"""
+import argparse
+import filecmp
+import hashlib
+import inspect
+import json
+import math
+import os
+import shutil
+import tempfile
+from importlib import metadata
+
+import joblib
+import numpy as np
+import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
 from xgboost import XGBRegressor, XGBClassifier
-import joblib
-import math
 
-# ============ 1. Load Data ============
-df = pd.read_csv("data\grades.csv")
-df.columns = df.columns.str.strip()
+import storage
+from utils import GRADE_IDS
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(ROOT_DIR, "data", "grades.csv")
+MODEL_DIR = os.path.join(ROOT_DIR, "modes")
+TRAIN_CACHE_DIR = os.environ.get("GRADE_APP_TRAIN_CACHE", os.path.join(ROOT_DIR, ".train_cache"))
+# Library versions that are part of every stage fingerprint.
+VERSIONED_PACKAGES = ("xgboost", "scikit-learn", "numpy", "pandas")
+CHUNK_ROWS = 100_000
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+MARK_COLUMNS = [
+    "Digital Assignment I", "Digital Assignment II", "Digital Assignment III",
+    "Continuous Assessment I", "Continuous Assessment II", "Final Assessment Test",
+]
+# Columns of the grade history the models are trained from.
+SOURCE_COLUMNS = MARK_COLUMNS + ["Class Strength", "Class Mean", "Class SD", "Final Grade"]
+
+grade_map = GRADE_IDS
+inv_grade_map = {v: k for k, v in grade_map.items()}
+
+TREE_PARAMS = dict(learning_rate=0.05, max_depth=6, subsample=0.8, colsample_bytree=0.8, random_state=RANDOM_STATE)
+
+# name -> (features, label, estimator, n_estimators)
+MODELS = {
+    # Model 1: Class Mean from the marks and class strength
+    "class_avg_xgb": (MARK_COLUMNS + ["Class Strength"], "Class Mean", XGBRegressor, 300),
+    # Model 2: Class SD from the overall score, class mean and strength
+    "class_sd_xgb": (["Overall Score", "Class Mean", "Class Strength"], "Class SD", XGBRegressor, 300),
+    # Model 3: Final Grade from the overall score and class statistics
+    "grade_xgb_classifier": (["Overall Score", "Class Mean", "Class SD", "Class Strength"], "Final Grade Encoded", XGBClassifier, 400),
+}
+MODEL_TITLES = {
+    "class_avg_xgb": "📘 Training Class Mean Model...",
+    "class_sd_xgb": "📗 Training Class SD Model...",
+    "grade_xgb_classifier": "📙 Training Final Grade Classifier...",
+}
+
 
-# ============ 2. Weighted Score ============
+# ============ 1. Load Data ============
 def calculate_weighted_marks(cat1, cat2, da1, da2, da3, fat):
     return (cat1 / 50) * 15 + (cat2 / 50) * 15 + \
            (da1 / 10) * 10 + (da2 / 10) * 10 + (da3 / 10) * 10 + \
            (fat / 100) * 40
 
-df["Overall Score"] = df.apply(lambda r: calculate_weighted_marks(
-    r["Continuous Assessment I"],
-    r["Continuous Assessment II"],
-    r["Digital Assignment I"],
-    r["Digital Assignment II"],
-    r["Digital Assignment III"],
-    r["Final Assessment Test"]
-), axis=1)
-
-# Encode grades
-grade_map = {"F": 0, "E": 1, "D": 2, "C": 3, "B": 4, "A": 5, "S": 6}
-inv_grade_map = {v: k for k, v in grade_map.items()}
-df["Final Grade Encoded"] = df["Final Grade"].map(grade_map)
-
-# ============================================================================================
-# 3A — Model 1: Predict Class Mean   (Inputs: DA1–DA3, CAT1–CAT2, FAT, Class Strength)
-# ============================================================================================
-print("\n📘 Training Class Mean Model...")
-
-X_avg = df[
-    [
-        "Digital Assignment I", "Digital Assignment II", "Digital Assignment III",
-        "Continuous Assessment I", "Continuous Assessment II", "Final Assessment Test",
-        "Class Strength"
-    ]
-]
-y_avg = df["Class Mean"]
 
-X_train, X_test, y_train, y_test = train_test_split(X_avg, y_avg, test_size=0.2, random_state=42)
+def add_derived_columns(df):
+    """Adds the weighted ``Overall Score`` and the encoded final grade (vectorized)."""
+    df["Overall Score"] = calculate_weighted_marks(
+        df["Continuous Assessment I"],
+        df["Continuous Assessment II"],
+        df["Digital Assignment I"],
+        df["Digital Assignment II"],
+        df["Digital Assignment III"],
+        df["Final Assessment Test"],
+    )
+    df["Final Grade Encoded"] = df["Final Grade"].map(grade_map)
+    return df
+
+
+def load_data(path):
+    return add_derived_columns(storage.read_table(path, SOURCE_COLUMNS))
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Yields the grade history ``chunk_rows`` rows at a time with derived columns added."""
+    for chunk in storage.iter_table(path, SOURCE_COLUMNS, chunk_rows):
+        yield add_derived_columns(chunk)
+
+
+def iter_split_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Yields (chunk, is_test) pairs. Rows are assigned to the test set with
+    probability ``TEST_SIZE`` from a generator seeded per chunk, so every
+    pass over the file reproduces the same split.
+    """
+    for i, chunk in enumerate(iter_chunks(path, chunk_rows)):
+        rng = np.random.default_rng([RANDOM_STATE, i])
+        yield chunk, rng.random(len(chunk)) < TEST_SIZE
+
+
+class GradeChunkIter(xgb.DataIter):
+    """Feeds one model's features and label from the train (or test) rows of each chunk."""
+
+    def __init__(self, path, features, label, chunk_rows=CHUNK_ROWS, test=False, cache_prefix=None):
+        self.path = path
+        self.features = features
+        self.label = label
+        self.chunk_rows = chunk_rows
+        self.test = test
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_split_chunks(self.path, self.chunk_rows)
+        for chunk, is_test in self._chunks:
+            rows = chunk[is_test if self.test else ~is_test]
+            if len(rows):
+                input_data(data=rows[self.features].to_numpy(np.float32), label=rows[self.label].to_numpy())
+                return True
+        return False
+
+
+# ============ 2. Train ============
+def train_stage_in_memory(df, name):
+    """Trains one model from the in-memory history; returns (model, report text)."""
+    features, label, estimator, n_estimators = MODELS[name]
+    X, y = df[features], df[label]
+    stratify = y if estimator is XGBClassifier else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=stratify
+    )
+
+    model = estimator(n_estimators=n_estimators, **TREE_PARAMS)
+    model.fit(X_train, y_train)
+    return model, report(model, y_test, model.predict(X_test))
+
+
+def booster_params(estimator):
+    """Native ``xgb.train`` parameters equivalent to ``TREE_PARAMS`` for ``estimator``."""
+    params = {
+        "tree_method": "hist",
+        "eta": TREE_PARAMS["learning_rate"],
+        "max_depth": TREE_PARAMS["max_depth"],
+        "subsample": TREE_PARAMS["subsample"],
+        "colsample_bytree": TREE_PARAMS["colsample_bytree"],
+        "seed": RANDOM_STATE,
+    }
+    if estimator is XGBClassifier:
+        params.update(objective="multi:softprob", num_class=len(grade_map))
+    else:
+        params["objective"] = "reg:squarederror"
+    return params
+
+
+def to_estimator(estimator, booster):
+    """Wraps a native booster in the sklearn estimator class the app loads."""
+    model = estimator()
+    model.load_model(bytearray(booster.save_raw("json")))
+    return model
+
+
+def train_stage_external(path, name, chunk_rows=CHUNK_ROWS, cache_dir=None):
+    """Trains one model from the streamed history; returns (model, report text)."""
+    features, label, estimator, n_estimators = MODELS[name]
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        train_iter = GradeChunkIter(path, features, label, chunk_rows, cache_prefix=os.path.join(cache_dir, name))
+        dtrain = xgb.ExtMemQuantileDMatrix(train_iter)
+    else:
+        dtrain = xgb.QuantileDMatrix(GradeChunkIter(path, features, label, chunk_rows))
+    booster = xgb.train(booster_params(estimator), dtrain, num_boost_round=n_estimators)
+    del dtrain
+
+    model = to_estimator(estimator, booster)
+
+    y_test, y_pred = [], []
+    for chunk, is_test in iter_split_chunks(path, chunk_rows):
+        rows = chunk[is_test]
+        if len(rows):
+            y_test.append(rows[label].to_numpy())
+            y_pred.append(model.predict(rows[features].to_numpy(np.float32)))
+    return model, report(model, np.concatenate(y_test), np.concatenate(y_pred))
+
+
+def report(model, y_test, y_pred):
+    if isinstance(model, XGBClassifier):
+        return (f"Accuracy: {accuracy_score(y_test, y_pred)}\n"
+                f"\nClassification Report:\n {classification_report(y_test, y_pred, zero_division=0)}")
+    return (f"R² Score: {r2_score(y_test, y_pred):.3f}\n"
+            f"RMSE: {math.sqrt(mean_squared_error(y_test, y_pred)):.3f}")
 
-regressor_avg = XGBRegressor(
-    n_estimators=300, learning_rate=0.05, max_depth=6,
-    subsample=0.8, colsample_bytree=0.8, random_state=42
-)
-regressor_avg.fit(X_train, y_train)
 
-y_pred = regressor_avg.predict(X_test)
-print(f"R² Score: {r2_score(y_test, y_pred):.3f}")
-print(f"RMSE: {math.sqrt(mean_squared_error(y_test, y_pred)):.3f}")
+# ============ 3. Stage Cache ============
+def stage_fingerprint(name, data_digest, training):
+    """
+    Identifies one stage's artifact: the data content, the stage's feature
+    spec and hyperparameters, how it is trained (``training``) and the
+    library versions. Stages are independent, so changing one stage's spec
+    leaves the other fingerprints (and their cached models) untouched.
+    """
+    features, label, estimator, n_estimators = MODELS[name]
+    spec = {
+        "stage": name,
+        "data": data_digest,
+        "features": features,
+        "label": label,
+        "derived": [inspect.getsource(calculate_weighted_marks), grade_map],
+        "estimator": estimator.__name__,
+        "n_estimators": n_estimators,
+        "params": TREE_PARAMS,
+        "split": [TEST_SIZE, RANDOM_STATE],
+        "training": training,
+        "versions": {pkg: metadata.version(pkg) for pkg in VERSIONED_PACKAGES},
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
 
-# ============================================================================================
-# 3B — Model 2: Predict Class SD   (Inputs: Overall Score, Class Mean, Class Strength)
-# ============================================================================================
-print("\n📗 Training Class SD Model...")
 
-X_sd = df[["Overall Score", "Class Mean", "Class Strength"]]
-y_sd = df["Class SD"]
+def load_cached_stage(cache_root, name, fingerprint):
+    """Returns (model, report text, artifact path) for a cached stage, or None."""
+    directory = os.path.join(cache_root, name, fingerprint)
+    artifact = os.path.join(directory, "model.pkl")
+    if not os.path.exists(artifact):
+        return None
+    with open(os.path.join(directory, "report.txt"), encoding="utf-8") as f:
+        return joblib.load(artifact), f.read(), artifact
 
-X_train_sd, X_test_sd, y_train_sd, y_test_sd = train_test_split(
-    X_sd, y_sd, test_size=0.2, random_state=42
-)
 
-regressor_sd = XGBRegressor(
-    n_estimators=300, learning_rate=0.05, max_depth=6,
-    subsample=0.8, colsample_bytree=0.8, random_state=42
-)
-regressor_sd.fit(X_train_sd, y_train_sd)
+def store_stage(cache_root, name, fingerprint, model, text):
+    """Caches a trained stage (written aside and renamed into place); returns the artifact path."""
+    directory = os.path.join(cache_root, name, fingerprint)
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(directory))
+    joblib.dump(model, os.path.join(staging, "model.pkl"))
+    with open(os.path.join(staging, "report.txt"), "w", encoding="utf-8") as f:
+        f.write(text)
+    try:
+        os.rename(staging, directory)
+    except OSError:
+        # Cached concurrently by another run; keep theirs.
+        shutil.rmtree(staging, ignore_errors=True)
+    return os.path.join(directory, "model.pkl")
 
-y_pred_sd = regressor_sd.predict(X_test_sd)
-print(f"R² Score: {r2_score(y_test_sd, y_pred_sd):.3f}")
-print(f"RMSE: {math.sqrt(mean_squared_error(y_test_sd, y_pred_sd)):.3f}")
 
-# ============================================================================================
-# 3C — Model 3: Predict Final Grade (Inputs: Overall Score, Class Mean, Class SD, Class Strength)
-# ============================================================================================
-print("\n📙 Training Final Grade Classifier...")
+# ============ 4. Save Models ============
+def save_models(models, output_dir, artifacts=None):
+    """
+    Writes the models to ``output_dir``. Cached artifacts are copied, and
+    files whose contents are unchanged are left alone, so their mtimes (and
+    the shared cache built from them) stay valid.
+    """
+    print("\n💾 Saving trained models...")
+    os.makedirs(output_dir, exist_ok=True)
+    artifacts = artifacts or {}
+    for name, model in models.items():
+        target = os.path.join(output_dir, f"{name}.pkl")
+        source = artifacts.get(name)
+        if source is None:
+            joblib.dump(model, target)
+        elif not (os.path.exists(target) and filecmp.cmp(source, target, shallow=False)):
+            shutil.copyfile(source, target)
+    joblib.dump(grade_map, os.path.join(output_dir, "grade_mapping.pkl"))
+    print("✅ All models saved successfully!")
 
-X_grade = df[["Overall Score", "Class Mean", "Class SD", "Class Strength"]]
-y_grade = df["Final Grade Encoded"]
 
-Xg_train, Xg_test, yg_train, yg_test = train_test_split(
-    X_grade, y_grade, test_size=0.2, random_state=42, stratify=y_grade
-)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA, help="Grade history, .csv or .parquet.")
+    parser.add_argument("--external-memory", action="store_true",
+                        help="Stream the history in chunks instead of loading it into memory.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per chunk when streaming.")
+    parser.add_argument("--cache-dir", help="Spill quantized pages to this directory when streaming.")
+    parser.add_argument("--output-dir", default=MODEL_DIR,
+                        help="Where the .pkl files are written (default: the models the app loads).")
+    parser.add_argument("--artifact-cache", default=TRAIN_CACHE_DIR, help="Trained stage cache directory.")
+    parser.add_argument("--no-cache", action="store_true", help="Retrain every stage and cache nothing.")
+    parser.add_argument("--surrogates", action="store_true",
+                        help="Also build the lookup tables for the SD and grade models (see surrogate.py).")
+    args = parser.parse_args(argv)
 
-classifier_grade = XGBClassifier(
-    n_estimators=400, learning_rate=0.05, max_depth=6,
-    subsample=0.8, colsample_bytree=0.8, random_state=42
-)
-classifier_grade.fit(Xg_train, yg_train)
+    data_digest = storage.file_digest(args.data)
+    if args.external_memory:
+        training = {"mode": "external", "chunk_rows": args.chunk_rows}
+    else:
+        training = {"mode": "memory"}
 
-yg_pred = classifier_grade.predict(Xg_test)
+    df = None
+    models, artifacts = {}, {}
+    for name in MODELS:
+        print("\n" + MODEL_TITLES[name])
+        fingerprint = stage_fingerprint(name, data_digest, training)
+        cached = None if args.no_cache else load_cached_stage(args.artifact_cache, name, fingerprint)
+        if cached is not None:
+            model, text, artifacts[name] = cached
+            print(f"(unchanged, reusing cached model {fingerprint})")
+        else:
+            if args.external_memory:
+                model, text = train_stage_external(args.data, name, args.chunk_rows, args.cache_dir)
+            else:
+                if df is None:
+                    df = load_data(args.data)
+                model, text = train_stage_in_memory(df, name)
+            if not args.no_cache:
+                artifacts[name] = store_stage(args.artifact_cache, name, fingerprint, model, text)
+        print(text)
+        models[name] = model
+    save_models(models, args.output_dir, artifacts)
 
-print("Accuracy:", accuracy_score(yg_test, yg_pred))
-print("\nClassification Report:\n", classification_report(yg_test, yg_pred))
+    if args.surrogates:
+        import surrogate
 
-# ============================================================================================
-# 4. SAVE MODELS
-# ============================================================================================
-print("\n💾 Saving trained models...")
+        print("\nSurrogate lookup tables")
+        if df is None and not args.external_memory:
+            df = load_data(args.data)
+        for name, meta in surrogate.build_for_dir(args.output_dir, df).items():
+            print(surrogate.describe(name, meta))
 
-joblib.dump(regressor_avg, "class_avg_xgb.pkl")
-joblib.dump(regressor_sd, "class_sd_xgb.pkl")
-joblib.dump(classifier_grade, "grade_xgb_classifier.pkl")
-joblib.dump(grade_map, "grade_mapping.pkl")
 
-print("✅ All models saved successfully!")
+if __name__ == "__main__":
+    main()
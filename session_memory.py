@@ -0,0 +1,161 @@
+"""
+Per-session memory accounting, cleanup and an optional ceiling.
+
+Every row and semester keys several widgets by its id (``course_<id>``,
+``type_<id>``, ``credits_<id>``, ``grade_<id>``, ``gpa_<id>_text_input``,
+...). Deleting a row, importing a transcript or restoring a retained mode
+(which renumbers its rows, see ``state``) leaves the old keys behind.
+``collect()`` drops every such key whose id no longer belongs to a live
+row or semester.
+
+``usage()`` estimates the bytes a session holds, by category. Objects
+shared by every session in the process (the parsed catalogs) are counted
+separately as "shared", not against the session.
+
+With ``GRADE_APP_SESSION_MEMORY_LIMIT_MB`` set, ``enforce()`` keeps a
+session under that many MiB by dropping, in order, the least recently used
+retained (branch, mode) states and then derived state that is rebuilt on
+demand. Entered work in the active mode is never dropped; if it alone is
+over the ceiling the caller is told so.
+"""
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import instrumentation
+import state
+import utils
+
+LIMIT_MB = float(os.environ.get("GRADE_APP_SESSION_MEMORY_LIMIT_MB", "0"))
+
+# Widget keys derived from a row or semester id.
+ID_WIDGET_KEY = re.compile(
+    r"^(?:course_select|course|type|credits|cred|grade|add|delete|del_sem|del|gpa)_(\d+)(?:_.+)?$"
+)
+# Dropped (least important first) once the retained states are gone.
+DERIVED_KEYS = (*state.TRANSIENT_KEYS, "transcript_import_report", "last_prediction")
+
+_MODE_KEYS = {k for keys in state.MODE_STATE_KEYS.values() for k in keys}
+
+
+def live_ids(ss=None):
+    ss = st.session_state if ss is None else ss
+    ids = set()
+    for list_key in state.ID_LISTS:
+        ids.update(item["id"] for item in ss.get(list_key) or ())
+    return ids
+
+
+def orphaned_keys(ss=None):
+    """Row/semester widget keys whose id is no longer live."""
+    ss = st.session_state if ss is None else ss
+    ids = live_ids(ss)
+    orphans = []
+    for key in list(ss.keys()):
+        match = ID_WIDGET_KEY.match(key) if isinstance(key, str) else None
+        if match and int(match.group(1)) not in ids:
+            orphans.append(key)
+    return orphans
+
+
+def collect(ss=None):
+    """Deletes orphaned widget keys; returns how many were removed."""
+    ss = st.session_state if ss is None else ss
+    orphans = orphaned_keys(ss)
+    for key in orphans:
+        del ss[key]
+    if orphans:
+        instrumentation.count("session_keys_collected", len(orphans))
+    return len(orphans)
+
+
+def _shared_ids():
+    return {id(df) for df in list(utils._catalogs.values())}
+
+
+def approx_size(obj, shared, seen):
+    """Deep size estimate of ``obj``, skipping ``shared`` object ids and anything in ``seen``."""
+    if id(obj) in seen or id(obj) in shared:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + sys.getsizeof(obj)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, shared, seen) + approx_size(v, shared, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v, shared, seen) for v in obj)
+    return size
+
+
+def category(key):
+    if key == state._STATES:
+        return "retained_states"
+    if key in _MODE_KEYS:
+        return "mode_state"
+    if key in DERIVED_KEYS:
+        return "derived"
+    if isinstance(key, str) and ID_WIDGET_KEY.match(key):
+        return "row_widgets"
+    return "other"
+
+
+def usage(ss=None):
+    """Approximate bytes held by the session, by category, plus "total" and "shared"."""
+    ss = st.session_state if ss is None else ss
+    shared = _shared_ids()
+    seen = set()
+    result = dict.fromkeys(("mode_state", "row_widgets", "retained_states", "derived", "other"), 0)
+    shared_bytes = 0
+    for key in list(ss.keys()):
+        value = ss[key]
+        if id(value) in shared:
+            shared_bytes += approx_size(value, (), set())
+            continue
+        result[category(key)] += approx_size(value, shared, seen)
+    result["total"] = sum(result.values())
+    result["shared"] = shared_bytes
+    return result
+
+
+def enforce(limit_mb=None, ss=None):
+    """
+    Shrinks the session under ``limit_mb`` MiB (default ``LIMIT_MB``; 0 means
+    no ceiling). Returns (bytes in use, whether it is within the ceiling);
+    the bytes are None when there is no ceiling.
+    """
+    ss = st.session_state if ss is None else ss
+    limit_mb = LIMIT_MB if limit_mb is None else limit_mb
+    if limit_mb <= 0:
+        return None, True
+
+    total = usage(ss)["total"]
+    limit = limit_mb * 2**20
+    retained = ss.get(state._STATES)
+    while total > limit and retained:
+        retained.popitem(last=False)
+        instrumentation.count("session_states_evicted")
+        total = usage(ss)["total"]
+    for key in DERIVED_KEYS:
+        if total <= limit:
+            break
+        if key in ss:
+            del ss[key]
+            instrumentation.count("session_states_evicted")
+            total = usage(ss)["total"]
+    return total, total <= limit
+
+
+def render_report(ss=None):
+    """Caption with the session's memory by category (shown on profiled runs)."""
+    report = usage(ss)
+    parts = ", ".join(f"{k.replace('_', ' ')} {v / 1024:.1f} KiB" for k, v in report.items() if v)
+    st.caption(f"Session memory: {parts}")
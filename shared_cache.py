@@ -0,0 +1,252 @@
+"""
+Read-only, memory-mapped cache of course catalogs and compiled models for
+multi-process deployments.
+
+Set ``GRADE_APP_SHARED_CACHE`` to a directory to enable it. The first worker
+on a host builds the cache (models compiled to flat tree arrays, catalogs
+as Arrow IPC files), every worker then maps the files read-only, so the
+model arrays and the catalogs, text columns included, live once in the page
+cache and are shared by all workers instead of each worker unpickling its
+own XGBoost models and parsing its own catalogs. Without pyarrow, catalogs
+are stored as one ``.npy`` array per column instead and only their numeric
+columns are shared; text columns are copied into each worker.
+
+Builds are atomic: a build is written to a temporary directory and renamed
+to a directory named after a fingerprint of the source files, so workers
+never see a half-written cache and a changed model or catalog simply
+produces a new build. Once a new build is published, older builds other
+than the one just before it (which workers may still have mapped) are
+removed. Build it ahead of a deployment with:
+
+    python -m shared_cache build
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import storage
+from storage import pa
+from compiled_trees import CompiledEnsemble, compile_model
+
+CACHE_FORMAT = 3
+SHARED_CACHE_DIR = os.environ.get("GRADE_APP_SHARED_CACHE")
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(ROOT_DIR, "modes")
+MODEL_NAMES = ("class_avg_xgb", "class_sd_xgb", "grade_xgb_classifier")
+CATALOG_GLOB = os.path.join(ROOT_DIR, "data", "courses_*.csv")
+
+# Builds kept on disk besides the one just published.
+KEEP_PREVIOUS = 1
+
+ENSEMBLE_ARRAYS = ("feature", "threshold", "default_left", "value", "tree_group", "base_margin")
+
+_attached = {}
+
+
+def is_enabled():
+    return bool(SHARED_CACHE_DIR)
+
+
+def _source_files():
+    models = [os.path.join(MODEL_DIR, f"{name}.pkl") for name in MODEL_NAMES]
+    return models + sorted(glob.glob(CATALOG_GLOB))
+
+
+def fingerprint():
+    """Identifies a build by the cache format and the sources' names, sizes and mtimes."""
+    digest = hashlib.sha1(f"format={CACHE_FORMAT}".encode())
+    for path in _source_files():
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def build(cache_dir=None):
+    """
+    Builds the cache for the current sources unless it already exists.
+    Returns the build directory.
+    """
+    cache_dir = cache_dir or SHARED_CACHE_DIR
+    target = os.path.join(cache_dir, fingerprint())
+    if os.path.isdir(target):
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".build-", dir=cache_dir)
+    try:
+        for name in MODEL_NAMES:
+            model = joblib.load(os.path.join(MODEL_DIR, f"{name}.pkl"))
+            _write_ensemble(os.path.join(staging, "models", name), compile_model(model))
+        for path in sorted(glob.glob(CATALOG_GLOB)):
+            _write_catalog(os.path.join(staging, "catalogs", os.path.basename(path)), path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    try:
+        os.rename(staging, target)
+    except OSError:
+        # Another worker finished the same build first; use theirs.
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+        return target
+    _prune(cache_dir, target)
+    return target
+
+
+def _prune(cache_dir, live):
+    """Removes builds older than the ``KEEP_PREVIOUS`` newest besides ``live``."""
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    with open(os.path.join(cache_dir, ".prune.lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        builds = [
+            os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+            if re.fullmatch(r"[0-9a-f]{16}", name) and name != os.path.basename(live)
+        ]
+        builds.sort(key=os.path.getmtime, reverse=True)
+        for old in builds[KEEP_PREVIOUS:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _write_ensemble(directory, ensemble):
+    os.makedirs(directory)
+    for name in ENSEMBLE_ARRAYS:
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(ensemble, name))
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({
+            "objective": ensemble.objective,
+            "num_features": ensemble.num_features,
+            "max_depth": ensemble.max_depth,
+        }, f)
+
+
+def _write_catalog(directory, csv_path):
+    # Read exactly like utils.load_course_data so both paths agree.
+    courses_df = storage.read_table(csv_path, storage.CATALOG_COLUMNS)
+    courses_df["Display"] = courses_df["Course Code"].astype(str) + " - " + courses_df["Course Name"]
+
+    os.makedirs(directory)
+    if storage.is_available():
+        # Text as large_string: its 64-bit offsets are what pandas' Arrow
+        # strings use, so reading the column back needs no conversion.
+        table = pa.Table.from_pandas(courses_df, preserve_index=False)
+        table = table.cast(pa.schema([
+            pa.field(f.name, pa.large_string()) if pa.types.is_string(f.type) else f for f in table.schema
+        ]))
+        with pa.OSFile(os.path.join(directory, "catalog.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return
+
+    columns = []
+    for i, column in enumerate(courses_df.columns):
+        values = courses_df[column]
+        if values.dtype.kind in "biuf":
+            array = values.to_numpy()
+        else:
+            # Fixed-width unicode so the column can be memory-mapped.
+            array = values.astype(str).to_numpy(dtype=str)
+        np.save(os.path.join(directory, f"{i}.npy"), array)
+        columns.append({"name": column, "missing": values.isna().to_numpy().nonzero()[0].tolist()})
+    with open(os.path.join(directory, "columns.json"), "w") as f:
+        json.dump(columns, f)
+
+
+def _current_build():
+    build_dir = _attached.get("build_dir")
+    if build_dir is None:
+        build_dir = _attached["build_dir"] = build()
+    return build_dir
+
+
+def refresh():
+    """
+    Attaches to the build for the current sources (building it if needed),
+    so later loads see changed models and catalogs. Returns the build directory.
+    """
+    build_dir = _attached["build_dir"] = build()
+    return build_dir
+
+
+def load_models():
+    """
+    Returns {name: CompiledEnsemble} backed by read-only memory maps of the
+    shared build. The arrays are never copied into the worker.
+    """
+    build_dir = _current_build()
+    models = {}
+    for name in MODEL_NAMES:
+        directory = os.path.join(build_dir, "models", name)
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {
+            array: np.load(os.path.join(directory, f"{array}.npy"), mmap_mode="r")
+            for array in ENSEMBLE_ARRAYS
+        }
+        models[name] = CompiledEnsemble(**arrays, **meta)
+    return models
+
+
+def load_catalog(csv_path):
+    """
+    Returns the course DataFrame for ``csv_path`` from the shared build.
+    Every column of an Arrow catalog stays memory-mapped; in the ``.npy``
+    fallback only numeric columns do and text columns become object arrays.
+    """
+    directory = os.path.join(_current_build(), "catalogs", os.path.basename(csv_path))
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(csv_path)
+
+    arrow_path = os.path.join(directory, "catalog.arrow")
+    if os.path.exists(arrow_path):
+        table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+        # Column by column: converting the whole table would consolidate
+        # (copy) the numeric columns into one block.
+        return pd.DataFrame({
+            name: column.to_pandas() if pa.types.is_large_string(column.type) else column.to_numpy()
+            for name, column in zip(table.column_names, table.columns)
+        }, copy=False)
+
+    with open(os.path.join(directory, "columns.json")) as f:
+        columns = json.load(f)
+
+    data = {}
+    for i, column in enumerate(columns):
+        array = np.load(os.path.join(directory, f"{i}.npy"), mmap_mode="r")
+        if array.dtype.kind == "U":
+            values = array.astype(object)
+            values[column["missing"]] = np.nan
+            data[column["name"]] = values
+        else:
+            data[column["name"]] = array
+    return pd.DataFrame(data, copy=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the shared model/catalog cache.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--cache-dir", default=SHARED_CACHE_DIR,
+                        help="Cache directory (default: $GRADE_APP_SHARED_CACHE).")
+    args = parser.parse_args()
+    if not args.cache_dir:
+        parser.error("--cache-dir or GRADE_APP_SHARED_CACHE is required")
+    print(build(args.cache_dir))
+
+
+if __name__ == "__main__":
+    main()
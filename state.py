@@ -0,0 +1,132 @@
+"""
+Per-branch, per-mode session state containers.
+
+Each mode keeps its working state (rows, semesters, ...) in plain session
+state keys while it is active. Switching branch or mode stashes those keys
+into a container for the (branch, mode) being left and restores the
+container of the one being entered, so nothing is re-entered after a
+switch. Only the most recently used ``MAX_RETAINED_BRANCHES`` branches are
+kept per session.
+"""
+import os
+from collections import OrderedDict
+
+import streamlit as st
+
+MAX_RETAINED_BRANCHES = int(os.environ.get("GRADE_APP_MAX_RETAINED_BRANCHES", "3"))
+
+# Session state keys owned by each mode.
+MODE_STATE_KEYS = {
+    "Semester Mode": ("rows", "next_id", "transcript_import_report"),
+    "Free Mode": ("rows", "next_id", "transcript_import_report"),
+    "CGPA Mode": ("semesters", "next_sem_id", "show_goal_input", "goal_cgpa", "planner_courses", "planner_target"),
+    "Grade Prediction Mode": ("last_prediction",),
+}
+
+# Row lists whose ids key widgets, and the counter that numbers them.
+ID_LISTS = {"rows": "next_id", "semesters": "next_sem_id"}
+
+# Derived state that is rebuilt from the rows instead of being retained.
+# (The data editor's own widget state cannot be written back.)
+TRANSIENT_KEYS = ("free_bulk_base", "free_bulk_editor")
+
+_STATES = "_retained_states"
+_ACTIVE = "_active_state"
+_NEXT_UID = "_retained_next_uid"
+
+
+def switch_to(branch, mode):
+    """
+    Makes (branch, mode) the active container. Call once per run after the
+    branch and mode are known; it is a no-op unless either changed.
+    """
+    ss = st.session_state
+    target = (branch, mode)
+    active = ss.get(_ACTIVE)
+    if active == target:
+        return
+
+    states = ss.get(_STATES)
+    if states is None:
+        states = ss[_STATES] = OrderedDict()
+
+    if active is not None:
+        _stash(states, active)
+    _restore(states, target)
+    ss[_ACTIVE] = target
+
+
+def _stash(states, key):
+    ss = st.session_state
+    branch, mode = key
+
+    # Ids handed out so far; restored rows are renumbered past them so they
+    # never collide with widget state left over from the mode being left.
+    next_uid = ss.get(_NEXT_UID, 0)
+    for counter in ID_LISTS.values():
+        next_uid = max(next_uid, ss.get(counter, 0))
+    ss[_NEXT_UID] = next_uid
+
+    saved = {k: ss[k] for k in MODE_STATE_KEYS.get(mode, ()) if k in ss}
+    for k in (*MODE_STATE_KEYS.get(mode, ()), *TRANSIENT_KEYS):
+        if k in ss:
+            del ss[k]
+
+    branch_states = states.setdefault(branch, {})
+    if saved:
+        branch_states[mode] = saved
+    else:
+        branch_states.pop(mode, None)
+    states.move_to_end(branch)
+    _evict(states)
+
+
+def _restore(states, key):
+    ss = st.session_state
+    branch, mode = key
+
+    branch_states = states.get(branch)
+    saved = branch_states.pop(mode, None) if branch_states is not None else None
+    if branch_states is not None:
+        states.move_to_end(branch)
+    if not saved:
+        return
+
+    for list_key in ID_LISTS:
+        if list_key in saved:
+            adopt(list_key, saved.pop(list_key))
+
+    for k, v in saved.items():
+        if k not in ID_LISTS.values():
+            ss[k] = v
+
+
+def adopt(list_key, items):
+    """
+    Installs a row list (``rows`` or ``semesters``) as the active one,
+    renumbering its ids past every id this session has used so they never
+    collide with widget state left over from another mode.
+    """
+    ss = st.session_state
+    next_uid = ss.get(_NEXT_UID, 0)
+    for counter in ID_LISTS.values():
+        next_uid = max(next_uid, ss.get(counter, 0))
+
+    for i, item in enumerate(items):
+        item["id"] = next_uid + i
+    next_uid += len(items)
+
+    ss[list_key] = items
+    ss[ID_LISTS[list_key]] = next_uid
+    ss[_NEXT_UID] = next_uid
+
+
+def _evict(states):
+    while len(states) > MAX_RETAINED_BRANCHES:
+        states.popitem(last=False)
+
+
+def retained_keys():
+    """(branch, mode) pairs currently stashed, least recently used first."""
+    states = st.session_state.get(_STATES) or {}
+    return [(branch, mode) for branch, modes in states.items() for mode in modes]
@@ -0,0 +1,207 @@
+"""
+Typed, compressed columnar copies of the CSV data files.
+
+Every ``data/*.csv`` file can be converted into a Parquet file next to it
+(``courses_bce.csv`` -> ``courses_bce.parquet``) with integer columns
+narrowed and strings dictionary-encoded by Parquet. Readers ask for the
+columns they need, so the UI reads only the four catalog columns it uses
+and training only the grade history columns it trains on.
+
+Parquet is optional: without pyarrow, without a converted file, or when the
+CSV is newer than its Parquet copy, readers fall back to the CSV with the
+same column pruning. Convert after updating the CSVs with:
+
+    python -m storage convert
+"""
+import argparse
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_GLOB = os.path.join(ROOT_DIR, "data", "*.csv")
+CSV_ENCODING = "latin1"
+COMPRESSION = "zstd"
+
+# Catalog columns the app reads (``Display`` is derived from code and name).
+CATALOG_COLUMNS = ["Type", "Course Code", "Course Name", "Credits"]
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+def is_available():
+    return pq is not None
+
+
+def file_digest(path):
+    """SHA-256 of the file's content, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _use_columnar(path):
+    """The Parquet file to read for ``path``, or None to read the CSV."""
+    if path.endswith(".parquet"):
+        if not is_available():
+            raise ImportError(f"Reading {path} needs pyarrow (pip install pyarrow).")
+        return path
+    parquet_path = columnar_path(path)
+    if (
+        is_available()
+        and os.path.exists(parquet_path)
+        and os.path.getmtime(parquet_path) >= os.path.getmtime(path)
+    ):
+        return parquet_path
+    return None
+
+
+def _clean_header(columns):
+    # A UTF-8 byte order mark decoded as latin1 shows up as "ï»¿".
+    return columns.str.strip().str.removeprefix("ï»¿")
+
+
+def _csv_usecols(columns):
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda c: c.strip() in wanted
+
+
+def read_table(path, columns=None):
+    """
+    Reads a data file as a DataFrame with only ``columns`` (all when None),
+    from its Parquet copy when one is usable and from the CSV otherwise.
+    """
+    parquet_path = _use_columnar(path)
+    if parquet_path is not None:
+        df = pq.read_table(parquet_path, columns=columns).to_pandas()
+    else:
+        df = pd.read_csv(path, encoding=CSV_ENCODING, usecols=_csv_usecols(columns))
+        df.columns = _clean_header(df.columns)
+    return df if columns is None else df[columns]
+
+
+def iter_table(path, columns=None, chunk_rows=100_000):
+    """Like ``read_table`` but yields DataFrames of at most ``chunk_rows`` rows."""
+    parquet_path = _use_columnar(path)
+    if parquet_path is not None:
+        batches = pq.ParquetFile(parquet_path).iter_batches(batch_size=chunk_rows, columns=columns)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = pd.read_csv(path, encoding=CSV_ENCODING, usecols=_csv_usecols(columns), chunksize=chunk_rows)
+
+    for chunk in chunks:
+        chunk.columns = _clean_header(chunk.columns)
+        yield chunk if columns is None else chunk[columns]
+
+
+def _column_types(csv_path, chunk_rows):
+    """
+    Scans the CSV once and decides each column's Arrow type, so every chunk
+    is written with the same schema. Integer columns become int32 when all
+    their values fit (int64 otherwise), also when some values are missing;
+    other numbers are float64 and anything else strings. ``Unnamed:``
+    columns that are empty throughout (trailing commas) are dropped.
+    """
+    stats = {}
+    for chunk in pd.read_csv(csv_path, encoding=CSV_ENCODING, chunksize=chunk_rows):
+        chunk.columns = _clean_header(chunk.columns)
+        for column in chunk.columns:
+            values = chunk[column]
+            column_stats = stats.setdefault(column, {"empty": True, "kind": "i", "min": 0, "max": 0})
+            present = values.dropna()
+            if present.empty:
+                continue
+            column_stats["empty"] = False
+            if values.dtype.kind not in "iuf":
+                column_stats["kind"] = "s"
+                continue
+            # Pandas reads an integer column with missing values as float.
+            integral = values.dtype.kind in "iu" or (len(present) < len(values) and (present % 1 == 0).all())
+            if column_stats["kind"] == "i" and not integral:
+                column_stats["kind"] = "f"
+            column_stats["min"] = min(column_stats["min"], present.min())
+            column_stats["max"] = max(column_stats["max"], present.max())
+
+    types = {}
+    for column, column_stats in stats.items():
+        if column_stats["empty"]:
+            if not column.startswith("Unnamed:"):
+                types[column] = pa.float64()
+        elif column_stats["kind"] == "s":
+            types[column] = pa.large_string()
+        elif column_stats["kind"] == "f":
+            types[column] = pa.float64()
+        elif -2**31 <= column_stats["min"] and column_stats["max"] <= 2**31 - 1:
+            types[column] = pa.int32()
+        else:
+            types[column] = pa.int64()
+    return types
+
+
+def _cast_chunk(chunk, types):
+    """Brings a chunk to the dtypes of ``types``; missing integers become nulls."""
+    chunk.columns = _clean_header(chunk.columns)
+    chunk = chunk[list(types)]
+    for column, arrow_type in types.items():
+        if pa.types.is_int32(arrow_type):
+            chunk[column] = chunk[column].astype("Int32")
+        elif pa.types.is_int64(arrow_type):
+            chunk[column] = chunk[column].astype("Int64")
+        elif pa.types.is_large_string(arrow_type):
+            chunk[column] = chunk[column].astype("str")
+        else:
+            chunk[column] = chunk[column].astype("float64")
+    return chunk
+
+
+def convert(csv_path, chunk_rows=500_000):
+    """Writes the Parquet copy of ``csv_path`` and returns its path."""
+    if not is_available():
+        raise ImportError("Converting to Parquet needs pyarrow (pip install pyarrow).")
+    parquet_path = columnar_path(csv_path)
+    staging = parquet_path + ".tmp"
+
+    types = _column_types(csv_path, chunk_rows)
+    schema = pa.schema([pa.field(column, arrow_type) for column, arrow_type in types.items()])
+    try:
+        with pq.ParquetWriter(staging, schema, compression=COMPRESSION) as writer:
+            for chunk in pd.read_csv(csv_path, encoding=CSV_ENCODING, chunksize=chunk_rows):
+                chunk = _cast_chunk(chunk, types)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    except BaseException:
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+    # Readers never see a partially written file.
+    os.replace(staging, parquet_path)
+    return parquet_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the CSV data files to Parquet.")
+    parser.add_argument("command", choices=["convert"])
+    parser.add_argument("paths", nargs="*", help="CSV files (default: data/*.csv).")
+    args = parser.parse_args()
+
+    for csv_path in args.paths or sorted(glob.glob(DATA_GLOB)):
+        parquet_path = convert(csv_path)
+        print(f"{csv_path} -> {parquet_path} "
+              f"({os.path.getsize(csv_path) / 1024:.0f} KiB -> {os.path.getsize(parquet_path) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Precomputed lookup tables ("surrogates") for the class SD regressor and the
+grade classifier.
+
+Once the class mean is known, both models take only a few bounded inputs
+(scores and class mean 0-100, class SD 0-40, class strength 10-120). A tree
+ensemble is piecewise constant between the split thresholds it uses, so
+cutting each input axis at those thresholds gives cells on which the model
+output is constant. One prediction per cell, stored as an array, turns
+serving into a ``searchsorted`` per input plus an array index.
+
+When the exact grid has more cells than the model's budget in
+``SURROGATES``, each axis keeps only its most frequently used thresholds and
+the table becomes an approximation. Each table records its error against
+the real model, measured on random points of the domain and on the grade
+history. Inputs outside the domain fall back to the real model.
+
+Build the tables at training time (``python script.py --surrogates``) or
+for existing models with:
+
+    python -m surrogate build
+
+and serve them with ``GRADE_APP_SURROGATE=1``. Only exact tables are served
+unless ``GRADE_APP_SURROGATE_APPROX=1`` also allows approximate ones, which
+can change a prediction (the grade table disagrees with the classifier on a
+few percent of inputs); predictions made with one are labelled as such. A
+table is ignored when its model file has changed since it was built.
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+
+import storage
+
+ENABLED = os.environ.get("GRADE_APP_SURROGATE", "0") == "1"
+APPROXIMATE = os.environ.get("GRADE_APP_SURROGATE_APPROX", "0") == "1"
+
+# Input domains, as allowed by the Grade Prediction Mode widgets.
+DOMAINS = {
+    "Overall Score": (0.0, 100.0),
+    "Class Mean": (0.0, 100.0),
+    "Class SD": (0.0, 40.0),
+    "Class Strength": (10.0, 120.0),
+}
+# model name -> (input features, maximum number of table cells)
+SURROGATES = {
+    "class_sd_xgb": (["Overall Score", "Class Mean", "Class Strength"], 2_000_000),
+    "grade_xgb_classifier": (["Overall Score", "Class Mean", "Class SD", "Class Strength"], 2_000_000),
+}
+
+# Rows predicted per model call while building a table.
+BUILD_BLOCK = 200_000
+ERROR_SAMPLES = 100_000
+
+
+def table_path(model_path):
+    return os.path.splitext(model_path)[0] + ".surrogate.npz"
+
+
+def _is_classifier(model):
+    return hasattr(model, "n_classes_")
+
+
+class Surrogate:
+    """
+    Lookup table over ``axes`` (one sorted array of cut points per input).
+    Cell ``i`` of an axis covers [cuts[i-1], cuts[i]), matching XGBoost's
+    ``x < threshold`` goes-left rule.
+    """
+
+    def __init__(self, axes, table, lows, highs, meta=None):
+        self.axes = [np.asarray(a, dtype=np.float32) for a in axes]
+        self.table = table
+        self.lows = np.asarray(lows, dtype=np.float32)
+        self.highs = np.asarray(highs, dtype=np.float32)
+        self.meta = meta or {}
+        self.strides = np.cumprod([1] + [len(a) + 1 for a in self.axes[:0:-1]])[::-1]
+
+    def lookup(self, X):
+        """Returns (values, in_domain); values of rows outside the domain are meaningless."""
+        X = np.asarray(X, dtype=np.float32)
+        in_domain = ((X >= self.lows) & (X <= self.highs)).all(axis=1)
+        flat = np.zeros(len(X), dtype=np.int64)
+        for j, (cuts, stride) in enumerate(zip(self.axes, self.strides)):
+            flat += np.searchsorted(cuts, X[:, j], side="right") * stride
+        return self.table[flat], in_domain
+
+
+class SurrogateModel:
+    """``predict`` from a Surrogate, falling back to ``model`` outside its domain."""
+
+    def __init__(self, surrogate, model):
+        self.surrogate = surrogate
+        self.model = model
+
+    def predict(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        values, in_domain = self.surrogate.lookup(X)
+        if in_domain.all():
+            return values
+        out = values.astype(np.float64)
+        out[~in_domain] = self.model.predict(X[~in_domain])
+        return out
+
+
+def split_thresholds(model, features):
+    """Per feature: (thresholds, number of split nodes using each) inside its domain."""
+    trees = model.get_booster().trees_to_dataframe()
+    splits = trees[trees["Feature"] != "Leaf"]
+    result = []
+    for feature in features:
+        low, high = DOMAINS[feature]
+        values = splits.loc[splits["Feature"] == feature, "Split"].to_numpy(np.float32)
+        values = values[(values > low) & (values <= high)]
+        cuts, counts = np.unique(values, return_counts=True)
+        result.append((cuts, counts))
+    return result
+
+
+def choose_axes(thresholds, max_cells):
+    """
+    Every threshold when the exact grid fits in ``max_cells``; otherwise each
+    axis is thinned to its most used thresholds until it fits.
+    """
+    keep = [len(cuts) for cuts, _ in thresholds]
+    while np.prod([k + 1 for k in keep], dtype=np.float64) > max_cells:
+        widest = int(np.argmax(keep))
+        keep[widest] = max(keep[widest] * 3 // 4, 0)
+    axes = []
+    for (cuts, counts), k in zip(thresholds, keep):
+        most_used = np.sort(np.argsort(-counts, kind="stable")[:k])
+        axes.append(cuts[most_used])
+    return axes, keep == [len(cuts) for cuts, _ in thresholds]
+
+
+def _cell_points(axes, lows, start, stop):
+    """Representative inputs (each cell's lower corner) for flat cells [start, stop)."""
+    edges = [np.concatenate([[low], cuts]).astype(np.float32) for cuts, low in zip(axes, lows)]
+    flat = np.arange(start, stop, dtype=np.int64)
+    columns = []
+    for e in edges[::-1]:
+        columns.append(e[flat % len(e)])
+        flat //= len(e)
+    return np.column_stack(columns[::-1])
+
+
+def _predict_values(model, X):
+    values = model.predict(X)
+    return values.astype(np.int8) if _is_classifier(model) else values.astype(np.float32)
+
+
+def _measure_error(surrogate, model, X):
+    expected = _predict_values(model, X)
+    got, in_domain = surrogate.lookup(X)
+    got, expected = got[in_domain], expected[in_domain]
+    if _is_classifier(model):
+        return {"mismatch_rate": float(np.mean(got != expected)) if len(got) else 0.0}
+    return {"max_abs_error": float(np.max(np.abs(got - expected))) if len(got) else 0.0}
+
+
+def build(model, features, max_cells, history=None, seed=0):
+    """
+    Builds the Surrogate of ``model`` over ``features`` and measures its
+    error on random points of the domain and, when given, on ``history``
+    (rows of the same features, e.g. the training data).
+    """
+    start = time.perf_counter()
+    lows = [DOMAINS[f][0] for f in features]
+    highs = [DOMAINS[f][1] for f in features]
+    axes, exact = choose_axes(split_thresholds(model, features), max_cells)
+
+    n_cells = int(np.prod([len(a) + 1 for a in axes]))
+    table = np.empty(n_cells, dtype=np.int8 if _is_classifier(model) else np.float32)
+    for block in range(0, n_cells, BUILD_BLOCK):
+        stop = min(block + BUILD_BLOCK, n_cells)
+        table[block:stop] = _predict_values(model, _cell_points(axes, lows, block, stop))
+
+    surrogate = Surrogate(axes, table, lows, highs)
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(lows, highs, size=(ERROR_SAMPLES, len(features))).astype(np.float32)
+    strength = features.index("Class Strength")
+    X[:, strength] = np.round(X[:, strength])
+
+    surrogate.meta = {
+        "features": features,
+        "exact": exact,
+        "cells": n_cells,
+        "bytes": int(table.nbytes),
+        "error": _measure_error(surrogate, model, X),
+        "error_samples": ERROR_SAMPLES,
+        "build_seconds": round(time.perf_counter() - start, 2),
+    }
+    if history is not None and len(history):
+        surrogate.meta["history_error"] = _measure_error(surrogate, model, np.asarray(history, dtype=np.float32))
+        surrogate.meta["history_rows"] = len(history)
+    return surrogate
+
+
+def save(surrogate, model_path):
+    path = table_path(model_path)
+    meta = {**surrogate.meta, "model_sha256": storage.file_digest(model_path)}
+    arrays = {f"axis_{i}": axis for i, axis in enumerate(surrogate.axes)}
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, table=surrogate.table, lows=surrogate.lows, highs=surrogate.highs,
+             meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load(model_path):
+    """The Surrogate saved for ``model_path``, or None if missing or stale."""
+    path = table_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("model_sha256") != storage.file_digest(model_path):
+            return None
+        axes = [data[f"axis_{i}"] for i in range(len(meta["features"]))]
+        return Surrogate(axes, data["table"], data["lows"], data["highs"], meta)
+
+
+def wrap(model, model_path):
+    """
+    Wraps ``model`` with its surrogate table when one is usable: exact, or
+    approximate with ``GRADE_APP_SURROGATE_APPROX=1``.
+    """
+    surrogate = load(model_path)
+    if surrogate is None or not (surrogate.meta.get("exact") or APPROXIMATE):
+        return model
+    return SurrogateModel(surrogate, model)
+
+
+def is_approximate(model):
+    """True when ``model`` (possibly a TimedModel) predicts from an approximate table."""
+    if not isinstance(model, SurrogateModel):
+        model = getattr(model, "model", model)
+    return isinstance(model, SurrogateModel) and not model.surrogate.meta.get("exact")
+
+
+def build_for_dir(model_dir, history=None, max_cells=None, force=False, names=None):
+    """
+    Builds and saves the tables for the models in ``model_dir``; returns
+    their metadata. Tables still matching their model are kept unless
+    ``force``. ``history`` is a DataFrame with the model features (e.g.
+    ``script.load_data``) used to report the error on real data.
+    """
+    built = {}
+    for name in names or SURROGATES:
+        features, default_cells = SURROGATES[name]
+        model_path = os.path.join(model_dir, f"{name}.pkl")
+        existing = None if force else load(model_path)
+        if existing is not None:
+            built[name] = existing.meta
+            continue
+        rows = history[features].to_numpy() if history is not None else None
+        surrogate = build(joblib.load(model_path), features, max_cells or default_cells, rows)
+        save(surrogate, model_path)
+        built[name] = surrogate.meta
+    return built
+
+
+def describe(name, meta):
+    def errors(error):
+        return ", ".join(f"{k} {v:.6g}" for k, v in error.items())
+
+    kind = "exact" if meta["exact"] else "approximate"
+    text = (f"{name}: {meta['cells']:,} cells ({kind}), {meta['bytes'] / 2**20:.1f} MiB, built in "
+            f"{meta['build_seconds']} s\n  random domain points ({meta['error_samples']:,}): {errors(meta['error'])}")
+    if "history_error" in meta:
+        text += f"\n  grade history rows ({meta['history_rows']:,}): {errors(meta['history_error'])}"
+    return text
+
+
+def main():
+    import script
+
+    parser = argparse.ArgumentParser(description="Build surrogate lookup tables for the models.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--model-dir", default=script.MODEL_DIR)
+    parser.add_argument("--data", default=script.DEFAULT_DATA, help="Grade history the error is also reported on.")
+    parser.add_argument("--max-cells", type=int, help="Cell budget per table (default: per model).")
+    parser.add_argument("--force", action="store_true", help="Rebuild tables that still match their model.")
+    args = parser.parse_args()
+    built = build_for_dir(args.model_dir, script.load_data(args.data), args.max_cells, args.force)
+    for name, meta in built.items():
+        print(describe(name, meta))
+
+
+if __name__ == "__main__":
+    main()
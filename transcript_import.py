@@ -0,0 +1,122 @@
+import io
+import re
+
+import pandas as pd
+
+from utils import GRADE_POINTS
+
+NON_GRADED_TYPE = "Non-Graded Core Requirement"
+
+_CODE_RE = re.compile(r"[A-Za-z]{2,6}\d{2,4}[A-Za-z]?(?![A-Za-z0-9])")
+# Fields of a line: split on , ; | : tabs or runs of two or more spaces.
+_FIELD_SEP_RE = re.compile(r"\s*[,;|:\t]\s*|\s{2,}")
+_GRADES = set(GRADE_POINTS) | {"P"}
+
+
+def _parse_line(line):
+    """
+    ``(code, grade)`` for one transcript line, or None when it does not
+    start with a course code. The grade is the last field when that is a
+    grade on its own ("BCSE202L - Data Structures, B", "BCSE202L\tA"), or
+    the second of exactly two tokens ("BCSE202L A"); a trailing word of the
+    course name ("BCSE102L Programming in C") is not taken as a grade.
+    """
+    line = line.strip()
+    code = _CODE_RE.match(line)
+    if code is None:
+        return None
+    fields = [f for f in _FIELD_SEP_RE.split(line) if f]
+    tokens = line.split()
+    if len(fields) > 1 and fields[-1].upper() in _GRADES:
+        return code.group(), fields[-1]
+    if len(tokens) == 2 and tokens[1].upper() in _GRADES:
+        return code.group(), tokens[1]
+    return code.group(), None
+
+
+def parse_transcript(text):
+    """
+    Parses a pasted or uploaded transcript into a DataFrame with ``Code`` and
+    ``Grade`` columns.
+
+    Accepts a CSV with a course code column ("Course Code" or "Code") and an
+    optional "Grade" column, or plain text with one course per line where the
+    code comes first and the grade, if any, comes last (see ``_parse_line``).
+    Returns ``(entries, unparsed_lines)``.
+    """
+    text = text.lstrip("\ufeff")
+    first_line = text.strip().splitlines()[0] if text.strip() else ""
+    header = [h.strip().lower() for h in first_line.split(",")]
+
+    if "course code" in header or "code" in header:
+        df = pd.read_csv(io.StringIO(text), dtype=str)
+        df.columns = df.columns.str.strip().str.lower()
+        code_col = "course code" if "course code" in df.columns else "code"
+        grades = df["grade"] if "grade" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        entries = pd.DataFrame({"Code": df[code_col], "Grade": grades}).dropna(subset=["Code"])
+        unparsed = []
+    else:
+        lines = [line for line in text.splitlines() if line.strip()]
+        matches = [_parse_line(line) for line in lines]
+        entries = pd.DataFrame([m for m in matches if m], columns=["Code", "Grade"])
+        unparsed = [line.strip() for line, m in zip(lines, matches) if not m]
+
+    entries["Code"] = entries["Code"].str.strip().str.upper()
+    entries["Grade"] = entries["Grade"].str.strip().str.upper()
+    return entries.reset_index(drop=True), unparsed
+
+
+def resolve_transcript(entries, courses_df):
+    """
+    Resolves parsed entries against a branch catalog in one join.
+
+    Each course's L/P partner is appended right after it (the same pairing
+    ``on_course_change`` applies) unless it is already in the list. Missing
+    or invalid grades fall back to S, or P for non-graded courses.
+    Returns ``(resolved, unresolved_codes)`` where ``resolved`` has
+    ``Display``, ``Type``, ``Credits`` and ``Grade`` columns.
+    """
+    catalog = courses_df.drop_duplicates("Course Code").copy()
+    catalog["Code"] = catalog["Course Code"].astype(str).str.strip().str.upper()
+    catalog = catalog[["Code", "Display", "Type", "Credits"]]
+
+    entries = entries.drop_duplicates("Code").reset_index(drop=True)
+    entries["order"] = entries.index * 2
+    merged = entries.merge(catalog, on="Code", how="left")
+    unresolved = merged.loc[merged["Display"].isna(), "Code"].tolist()
+    merged = merged.dropna(subset=["Display"])
+    if merged.empty:
+        return pd.DataFrame(columns=["Display", "Type", "Credits", "Grade"]), unresolved
+
+    # Partner code: swap a trailing L for P and vice versa.
+    suffix = merged["Code"].str[-1]
+    partner = merged["Code"].str[:-1] + suffix.map({"L": "P", "P": "L"})
+    pairs = pd.DataFrame({"Code": partner, "order": merged["order"] + 1}).dropna()
+    pairs = pairs[~pairs["Code"].isin(merged["Code"])].drop_duplicates("Code")
+    pairs = pairs.merge(catalog, on="Code", how="inner")
+    pairs["Grade"] = None
+
+    resolved = pd.concat([merged, pairs], ignore_index=True).sort_values("order")
+
+    non_graded = resolved["Type"].str.contains(NON_GRADED_TYPE, regex=False)
+    grade = resolved["Grade"]
+    valid = (non_graded & grade.isin(["P", "F"])) | (~non_graded & grade.isin(list(GRADE_POINTS)))
+    resolved["Grade"] = grade.where(valid, non_graded.map({True: "P", False: "S"}))
+    resolved["Credits"] = resolved["Credits"].astype(float)
+
+    return resolved[["Display", "Type", "Credits", "Grade"]].reset_index(drop=True), unresolved
+
+
+def to_rows(resolved, next_id, existing=()):
+    """
+    Converts resolved courses into row dicts for ``st.session_state.rows``,
+    skipping any course already in ``existing``. Returns ``(rows, next_id)``.
+    """
+    existing = set(existing)
+    rows = []
+    for display, grade in zip(resolved["Display"], resolved["Grade"]):
+        if display in existing:
+            continue
+        rows.append({"id": next_id, "course_display": display, "grade": grade})
+        next_id += 1
+    return rows, next_id
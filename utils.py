@@ -1,28 +1,107 @@
-import pandas as pd
 import streamlit as st
 import os
+import threading
+
+import shared_cache
+import storage
 
 # Define grade points mapping
 GRADE_POINTS = {"S": 10, "A": 9, "B": 8, "C": 7, "D": 6, "E": 5, "F": 0}
+# Grade letter -> class id of the grade classifier ("Final Grade Encoded").
+GRADE_IDS = {"F": 0, "E": 1, "D": 2, "C": 3, "B": 4, "A": 5, "S": 6}
+
+# Branch name -> (course catalog file, maximum total credits for the program)
+BRANCH_CATALOGS = {
+    "CSE Core(BCE)": ("data/courses_bce.csv", 151.0),
+    "CSE with Specialization in Cyber Physical Systems(BPS)": ("data/courses_bps.csv", 151.0),
+    "CSE with Specialization in Artificial Intelligence and Machine Learning(BAI)": ("data/courses_bai.csv", 151.0),
+    "CSE with Specialization in Data Science(BDS)": ("data/courses_bds.csv", 151.0),
+    "CSE with Specialization in Artificial Intelligence and Robotics(BRS)": ("data/courses_brs.csv", 151.0),
+    "Mechatronics(BMH)": ("data/courses_bmh.csv", 154.0),
+    "Electronics and Communication(BEC)": ("data/courses_bec.csv", 151.0),
+    "Electronics and Computer Engineering(BLC)": ("data/courses_blc.csv", 153.0),
+    "Electrical and Computer Science(BEL)": ("data/courses_bel.csv", 151.0),
+}
+DEFAULT_BRANCH = "CSE Core(BCE)"
+
+# Parsed catalogs keyed by path, shared by every session in the process, and
+# the (mtime_ns, size) of the file each one was parsed from.
+_catalogs = {}
+_catalog_stamps = {}
+_catalogs_lock = threading.Lock()
+# Set by hot_reload while its watcher owns reloading; reruns then skip the stat.
+CATALOGS_WATCHED = False
+
+def file_stamp(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+def install_catalog(file_path, courses_df, stamp):
+    """Publishes a parsed catalog; sessions see it from their next get_course_data call."""
+    courses_df.attrs["catalog_path"] = file_path
+    with _catalogs_lock:
+        _catalogs[file_path] = courses_df
+        _catalog_stamps[file_path] = stamp
 
 def get_course_data(file_path):
     """
     Loads and returns the course DataFrame from a specified file path.
+    Catalogs are parsed once per process (again only if the file changes,
+    or, with hot_reload running, once its watcher has swapped in the new
+    version) and shared across sessions, so treat the result as read-only.
     """
     try:
         if not os.path.exists(file_path):
             st.error(f"Error: The file '{file_path}' was not found.")
             st.stop()
-        
-        courses_df = pd.read_csv(file_path, encoding="latin1")
-        courses_df.columns = courses_df.columns.str.strip()
-        courses_df["Display"] = courses_df["Course Code"].astype(str) + " - " + courses_df["Course Name"]
+
+        courses_df = _catalogs.get(file_path)
+        if courses_df is not None and CATALOGS_WATCHED:
+            return courses_df
+        stamp = file_stamp(file_path)
+        if courses_df is None or _catalog_stamps.get(file_path) != stamp:
+            courses_df = load_course_data(file_path)
+            install_catalog(file_path, courses_df, stamp)
         return courses_df
     except Exception as e:
         st.error(f"An error occurred while loading the course data: {e}")
         st.stop()
         return None
 
+def catalog_path(courses_df):
+    """
+    The file a get_course_data catalog was loaded from, also once a newer
+    version has replaced it. Sessions and fragments keep this path as a
+    handle and look the shared DataFrame up again when needed, instead of
+    holding the DataFrame in their state.
+    """
+    return courses_df.attrs.get("catalog_path")
+
+def load_course_data(file_path):
+    """
+    Reads the catalog columns the app uses (from the Parquet copy when there
+    is one), or maps them from the shared cache when that is enabled.
+    """
+    if shared_cache.is_enabled():
+        return shared_cache.load_catalog(file_path)
+
+    courses_df = storage.read_table(file_path, storage.CATALOG_COLUMNS)
+    courses_df["Display"] = courses_df["Course Code"].astype(str) + " - " + courses_df["Course Name"]
+    return courses_df
+
+def clear_missing_courses(rows, courses_df):
+    """
+    Unselects the course of every row whose course is not in ``courses_df``
+    (e.g. dropped from a reloaded catalog) and returns those courses.
+    """
+    known = set(courses_df["Display"])
+    missing = []
+    for row in rows:
+        if row["course_display"] is not None and row["course_display"] not in known:
+            missing.append(row["course_display"])
+            row["course_display"] = None
+    return missing
+
 def get_paired_course(course_code, courses_df):
     """
     Finds the paired theory/lab course based on the course code.
@@ -67,4 +146,24 @@ def calculate_gpa(subjects):
         return 0.0, 0.0
     
     gpa = total_grade_points / total_credits
-    return gpa, total_credits
\ No newline at end of file
+    return gpa, total_credits
+
+def calculate_cgpa(semesters):
+    """
+    Calculates the CGPA from a list of semesters with "gpa" and "credits".
+    Semesters missing either value are skipped.
+    Returns the CGPA, the total credits and the credit-weighted GPA sum.
+    """
+    total_weighted_sum = 0.0
+    total_credits = 0.0
+
+    for sem in semesters:
+        if sem.get("gpa") is None or sem.get("credits") is None:
+            continue
+        total_weighted_sum += sem["gpa"] * sem["credits"]
+        total_credits += sem["credits"]
+
+    if total_credits == 0:
+        return 0.0, 0.0, 0.0
+
+    return total_weighted_sum / total_credits, total_credits, total_weighted_sum